@@ -37,8 +37,42 @@ class Settings:
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     SMTP_FROM: str = os.getenv("SMTP_FROM", os.getenv("SMTP_USER", ""))
     
+    # Outbound mail queue: delivery attempts, backoff base, batch per connection, idle poll
+    MAIL_MAX_ATTEMPTS: int = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+    MAIL_RETRY_BASE_SECONDS: int = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+    MAIL_BATCH_SIZE: int = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+    MAIL_POLL_SECONDS: int = int(os.getenv("MAIL_POLL_SECONDS", "10"))
+    # Local in-process SMTP stand-in (development/tests): mail is captured, not sent
+    SMTP_STUB: bool = os.getenv("SMTP_STUB", "false").lower() in ("1", "true", "yes")
+    SMTP_STUB_PORT: int = int(os.getenv("SMTP_STUB_PORT", "8025"))
+
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+    # Real-time events: "memory" (single worker) or "mongo" (shared across workers)
+    EVENT_BROKER: str = os.getenv("EVENT_BROKER", "memory").lower()
+    SSE_HEARTBEAT_SECONDS: int = int(os.getenv("SSE_HEARTBEAT_SECONDS", "20"))
+
+    # Chat retention: older messages move to *_archive collections (0 disables)
+    MESSAGE_RETENTION_DAYS: int = int(os.getenv("MESSAGE_RETENTION_DAYS", "180"))
+    DELETED_MESSAGE_GRACE_DAYS: int = int(os.getenv("DELETED_MESSAGE_GRACE_DAYS", "30"))
+    RETENTION_INTERVAL_MINUTES: int = int(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+
+    # Direct-message unread counters are recounted this often to repair drift (0 disables)
+    UNREAD_RECONCILE_MINUTES: int = int(os.getenv("UNREAD_RECONCILE_MINUTES", "30"))
+
+    # Admin dashboard counters older than this are recounted in the background
+    ADMIN_STATS_REFRESH_MINUTES: int = int(os.getenv("ADMIN_STATS_REFRESH_MINUTES", "15"))
+
+    # Resumable uploads: largest accepted file, and how long an unfinished session lives
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+    UPLOAD_SESSION_HOURS: int = int(os.getenv("UPLOAD_SESSION_HOURS", "24"))
+
+    # Bulk onboarding: largest accepted import file, rows written per batch,
+    # and password-hashing processes (0 picks one per CPU, at most 4)
+    BULK_IMPORT_MAX_BYTES: int = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+    BULK_IMPORT_BATCH_SIZE: int = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "200"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+
 
 # Create global settings instance
 settings = Settings()
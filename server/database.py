@@ -2,8 +2,9 @@
 MongoDB Database Connection
 Handles database initialization and connection management
 """
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 from pymongo.database import Database
+from pymongo.errors import OperationFailure
 from config import settings
 
 
@@ -32,6 +33,124 @@ class DatabaseManager:
                 print(f"[ERROR] MongoDB connection error: {e}")
                 raise
     
+    def ensure_indexes(self):
+        """Create the indexes the hot query paths rely on (idempotent)"""
+        # Keyset pagination of community messages: newest first within a community
+        self.community_messages.create_index(
+            [("community_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="community_timestamp_id"
+        )
+        # Unread counts: equality on community/is_deleted, range on timestamp,
+        # sender_id filtered in-index so the count never fetches documents
+        self.community_messages.create_index(
+            [("community_id", ASCENDING), ("is_deleted", ASCENDING), ("timestamp", ASCENDING), ("sender_id", ASCENDING)],
+            name="community_unread"
+        )
+        self.community_read_cursors.create_index(
+            [("user_id", ASCENDING), ("community_id", ASCENDING)],
+            name="user_community_cursor",
+            unique=True
+        )
+        # Message search: the community text index is prefixed by community_id,
+        # so each search only touches that community's postings
+        self.community_messages.create_index(
+            [("community_id", ASCENDING), ("content", TEXT)],
+            name="community_content_text"
+        )
+        self.direct_messages.create_index([("content", TEXT)], name="direct_content_text")
+        # Hidden messages: a user's hidden IDs per scope are read index-only
+        self.hidden_messages.create_index(
+            [("user_id", ASCENDING), ("scope", ASCENDING), ("message_id", ASCENDING)],
+            name="user_scope_message_unique",
+            unique=True
+        )
+        # Direct-message inbox: each $or branch of "sent or received" has its
+        # own index, and thread pages walk (thread_id, timestamp, _id)
+        self.direct_messages.create_index([("sender_id", ASCENDING), ("timestamp", DESCENDING)], name="sender_timestamp")
+        self.direct_messages.create_index([("recipient_id", ASCENDING), ("timestamp", DESCENDING)], name="recipient_timestamp")
+        self.direct_messages.create_index(
+            [("thread_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="thread_timestamp_id"
+        )
+        # Retention sweeps: expired by age, or soft-deleted past the grace period
+        for messages in (self.community_messages, self.direct_messages):
+            messages.create_index([("timestamp", ASCENDING)], name="retention_timestamp")
+            messages.create_index(
+                [("deleted_at", ASCENDING)],
+                name="retention_deleted_at",
+                partialFilterExpression={"is_deleted": True}
+            )
+        self._ensure_archives()
+        # Children listings: caseload (multikey), per-parent and by status
+        self.children.create_index([("therapistIds", ASCENDING)], name="child_therapists")
+        self.children.create_index([("parent_id", ASCENDING)], name="child_parent")
+        self.children.create_index([("status", ASCENDING)], name="child_status")
+        # Document blobs are addressed by content hash (one copy per content)
+        self.get_database()["document_blobs.files"].create_index(
+            [("metadata.sha256", ASCENDING)],
+            name="blob_sha256_unique",
+            unique=True
+        )
+        # Resumable uploads write GridFS chunks directly, so make sure the
+        # bucket's chunk index exists before the first upload
+        self.get_database()["document_blobs.chunks"].create_index(
+            [("files_id", ASCENDING), ("n", ASCENDING)],
+            name="files_id_1_n_1",
+            unique=True
+        )
+        self.upload_sessions.create_index([("expires_at", ASCENDING)], name="upload_expiry")
+        # Mail queue: workers claim due messages; delivered ones expire after 30 days
+        self.mail_queue.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="mail_due")
+        self.mail_queue.create_index([("sent_at", ASCENDING)], name="mail_sent_ttl", expireAfterSeconds=30 * 24 * 3600)
+        # Forecast session stats: sessions per child (both legacy field names)
+        self.sessions.create_index([("childId", ASCENDING)], name="session_childId")
+        self.sessions.create_index([("child_id", ASCENDING)], name="session_child_id")
+        # Admin stats recount: pending appointments by status
+        self.appointments.create_index([("status", ASCENDING)], name="appointment_status")
+        # Membership: one row per (community, user); also serves "my communities"
+        self.community_members.create_index(
+            [("community_id", ASCENDING), ("user_id", ASCENDING)],
+            name="community_user_unique",
+            unique=True
+        )
+        self.community_members.create_index([("user_id", ASCENDING)], name="user_communities")
+        self.community_members.create_index(
+            [("community_id", ASCENDING), ("name_key", ASCENDING)],
+            name="community_member_name"
+        )
+        # Default community is looked up (and upserted) by name; unique so
+        # racing workers cannot create it twice. Replaces the plain index.
+        if "community_name" in self.communities.index_information():
+            try:
+                self.communities.drop_index("community_name")
+            except OperationFailure:
+                pass  # another worker dropped it first
+        self.communities.create_index([("name", ASCENDING)], name="community_name_unique", unique=True)
+        print("[OK] MongoDB indexes ensured")
+    
+    def _ensure_archives(self):
+        """Create the zstd-compressed archive tiers and their read indexes"""
+        db = self.get_database()
+        existing = set(db.list_collection_names())
+        for name in ("community_messages_archive", "direct_messages_archive"):
+            if name not in existing:
+                db.create_collection(name, storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}})
+        db["community_messages_archive"].create_index(
+            [("community_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="community_timestamp_id"
+        )
+        db["community_messages_archive"].create_index(
+            [("community_id", ASCENDING), ("content", TEXT)],
+            name="community_content_text"
+        )
+        db["direct_messages_archive"].create_index([("sender_id", ASCENDING), ("timestamp", DESCENDING)], name="sender_timestamp")
+        db["direct_messages_archive"].create_index([("recipient_id", ASCENDING), ("timestamp", DESCENDING)], name="recipient_timestamp")
+        db["direct_messages_archive"].create_index(
+            [("thread_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="thread_timestamp_id"
+        )
+        db["direct_messages_archive"].create_index([("content", TEXT)], name="direct_content_text")
+    
     def disconnect(self):
         """Close MongoDB connection"""
         if self._client:
@@ -81,6 +200,46 @@ class DatabaseManager:
         """Get communities collection"""
         return self.get_database()["communities"]
     
+    @property
+    def mail_queue(self):
+        """Get outbound mail queue collection"""
+        return self.get_database()["mail_queue"]
+
+    @property
+    def id_counters(self):
+        """Get sequential ID counters (one document per ID prefix)"""
+        return self.get_database()["id_counters"]
+
+    @property
+    def upload_sessions(self):
+        """Get resumable upload sessions collection"""
+        return self.get_database()["upload_sessions"]
+
+    @property
+    def community_members(self):
+        """Get community membership collection (one document per member)"""
+        return self.get_database()["community_members"]
+    
+    @property
+    def community_read_cursors(self):
+        """Get per-user community read cursors (last_read_at)"""
+        return self.get_database()["community_read_cursors"]
+    
+    @property
+    def hidden_messages(self):
+        """Get per-user hidden ("delete for me") message rows"""
+        return self.get_database()["hidden_messages"]
+    
+    @property
+    def dm_unread_counters(self):
+        """Get per-user direct-message unread counters"""
+        return self.get_database()["dm_unread_counters"]
+    
+    @property
+    def admin_stats(self):
+        """Get maintained admin dashboard counters"""
+        return self.get_database()["admin_stats"]
+    
     @property
     def community_messages(self):
         """Get community messages collection"""
@@ -7,6 +7,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from config import settings
 from database import db_manager
+from utils.events import event_broker
+from utils.membership import migrate_legacy_member_ids, backfill_member_names, resolve_default_community, merge_duplicate_communities
+from utils.hidden import migrate_deleted_for
+from utils.retention import start_retention, stop_retention
+from utils.unread import start_reconciliation, stop_reconciliation
+from utils.caseload import backfill_primary_therapist_ids, recount_caseloads
+from utils.blobs import migrate_embedded_documents
+from utils.uploads import purge_stale_uploads
+from utils.avatars import migrate_inline_avatars
+from utils.mail_queue import start_mail_worker, stop_mail_worker
+from utils.smtp_stub import start_smtp_stub, stop_smtp_stub
+from utils.onboarding import stop_hash_pool
 from routes.doctor_auth import router as doctor_auth_router
 from routes.parent_auth import router as parent_auth_router
 from routes.admin_auth import router as admin_auth_router
@@ -18,6 +30,10 @@ from routes.progress import router as progress_router
 from routes.user_management import router as user_management_router
 from routes.public_api import router as public_api_router
 from routes.roadmap import router as roadmap_router
+from routes.notifications import router as notifications_router
+from routes.documents import router as documents_router
+from routes.uploads import router as uploads_router
+from routes.avatars import router as avatars_router
 
 
 @asynccontextmanager
@@ -29,9 +45,32 @@ async def lifespan(app: FastAPI):
     # Startup: Connect to database
     print("[START] Starting Therapy Portal Backend...")
     db_manager.connect()
+    # Duplicate communities are merged (members first) before the unique name index is built
+    migrate_legacy_member_ids()
+    merge_duplicate_communities()
+    db_manager.ensure_indexes()
+    backfill_member_names()
+    migrate_deleted_for()
+    backfill_primary_therapist_ids()
+    recount_caseloads()
+    migrate_embedded_documents()
+    purge_stale_uploads()
+    migrate_inline_avatars()
+    resolve_default_community()
+    event_broker.start()
+    start_retention()
+    start_reconciliation()
+    await start_smtp_stub()
+    start_mail_worker()
     yield
     # Shutdown: Close database connection
     print("[STOP] Shutting down Therapy Portal Backend...")
+    stop_retention()
+    stop_reconciliation()
+    stop_mail_worker()
+    await stop_smtp_stub()
+    stop_hash_pool()
+    event_broker.stop()
     db_manager.disconnect()
 
 
@@ -67,6 +106,10 @@ app.include_router(progress_router)
 app.include_router(user_management_router)
 app.include_router(public_api_router)
 app.include_router(roadmap_router)
+app.include_router(notifications_router)
+app.include_router(documents_router)
+app.include_router(uploads_router)
+app.include_router(avatars_router)
 
 
 # Health check endpoint
@@ -254,13 +254,22 @@ async def get_current_user(
     Generic dependency that allows any authenticated user (Parent, Doctor, or Admin)
     Returns a unified user dict for easier access in routes
     """
+    return get_user_from_token(credentials.credentials)
+
+
+def get_user_from_token(token: str) -> dict:
+    """
+    Resolve a raw JWT into the unified user dict used by get_current_user
+
+    Used directly by streaming endpoints (SSE), where browsers cannot send an
+    Authorization header and the token arrives as a query parameter.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
     payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
@@ -1,5 +1,5 @@
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime, timezone
 
 class ChildCreate(BaseModel):
@@ -12,6 +12,31 @@ class ChildCreate(BaseModel):
     therapy_start_date: Optional[str] = None
     therapy_type: Optional[str] = None
 
+class BulkChildRow(ChildCreate):
+    """Child row of a bulk import: the parent is given by ID or by email"""
+    parent_id: Optional[str] = Field(None, description="ID of an existing parent")
+    parent_email: Optional[EmailStr] = Field(None, description="Email of an existing parent or one earlier in the import")
+
+    @model_validator(mode="after")
+    def require_parent(self):
+        if not self.parent_id and not self.parent_email:
+            raise ValueError("parent_id or parent_email is required")
+        return self
+
+class CaseloadReassign(BaseModel):
+    """Move children to another therapist in one operation"""
+    to_therapist_id: str
+    from_therapist_id: Optional[str] = Field(None, description="Replace this therapist on all their children (or only child_ids)")
+    child_ids: Optional[List[str]] = Field(None, description="Children to move; without from_therapist_id they are assigned to the new therapist")
+
+    @model_validator(mode="after")
+    def require_scope(self):
+        if not self.from_therapist_id and not self.child_ids:
+            raise ValueError("from_therapist_id or child_ids is required")
+        if self.from_therapist_id == self.to_therapist_id:
+            raise ValueError("from_therapist_id and to_therapist_id must differ")
+        return self
+
 class ChildResponse(BaseModel):
     id: str
     name: str
@@ -42,3 +67,10 @@ class ChildResponse(BaseModel):
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
+
+class ChildrenListResponse(BaseModel):
+    children: List[ChildResponse]
+    total: int
+    limit: int
+    offset: int
+    has_more: bool
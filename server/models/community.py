@@ -22,7 +22,7 @@ class CommunityInDB(CommunityBase):
     """Community model as stored in database"""
     id: str = Field(..., alias="_id")
     created_by: str
-    member_ids: List[str] = Field(default_factory=list, description="List of parent IDs")
+    member_count: int = Field(default=0, description="Maintained count of community_members rows")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
@@ -62,7 +62,7 @@ class CommunityMessageInDB(BaseModel):
     attachments: List[str] = Field(default_factory=list)
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     reactions: Dict[str, List[str]] = Field(default_factory=dict) # emoji -> list of user_ids
-    deleted_for: List[str] = Field(default_factory=list) # users who deleted this message for themselves
+    reaction_counts: Dict[str, int] = Field(default_factory=dict) # emoji -> number of reactions
     is_deleted: bool = False
     
     class Config:
@@ -80,6 +80,7 @@ class CommunityMessageResponse(BaseModel):
     attachments: List[str] = []
     timestamp: datetime
     reactions: Dict[str, List[str]] = {} # emoji -> list of user_ids
+    reaction_counts: Dict[str, int] = {} # emoji -> number of reactions
     
     class Config:
         json_encoders = {
@@ -87,6 +88,15 @@ class CommunityMessageResponse(BaseModel):
         }
 
 
+class ReactionUpdateResponse(BaseModel):
+    """Single reaction changed by a toggle (community and direct messages)"""
+    message_id: str
+    emoji: str
+    user_ids: List[str] = []
+    count: int = 0
+    reacted: bool  # True if the current user's reaction was added
+
+
 class CommunityMemberResponse(BaseModel):
     """Community member response model"""
     id: str
@@ -113,3 +123,57 @@ class MessagesListResponse(BaseModel):
     limit: int
     offset: int
     has_more: bool
+    next_before: Optional[str] = None  # cursor for the next older page
+    next_after: Optional[str] = None   # cursor for messages newer than this page
+
+
+class MembersListResponse(BaseModel):
+    """Paginated community members response"""
+    members: List[CommunityMemberResponse]
+    total: int
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class MessageSearchHit(BaseModel):
+    """One ranked search result (community or direct message)"""
+    id: str
+    content: str
+    sender_id: str
+    sender_name: str
+    timestamp: datetime
+    score: float
+    snippet: str
+    highlights: List[List[int]] = []  # [start, end] offsets of matched words in content
+    community_id: Optional[str] = None
+    thread_id: Optional[str] = None
+    recipient_id: Optional[str] = None
+
+
+class MessageSearchResponse(BaseModel):
+    """Search results page"""
+    query: str
+    results: List[MessageSearchHit]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class CommunityUnreadItem(BaseModel):
+    """Unread count for one community"""
+    community_id: str
+    unread: int
+    capped: bool = False  # True when unread reached the counting limit
+    last_read_at: Optional[datetime] = None
+
+
+class CommunityUnreadResponse(BaseModel):
+    """Unread counts across all of a user's communities"""
+    communities: List[CommunityUnreadItem]
+    total: int
+
+
+class MarkReadRequest(BaseModel):
+    """Advance a read cursor; defaults to now"""
+    up_to: Optional[datetime] = None
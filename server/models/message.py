@@ -26,3 +26,39 @@ class MessageCreate(BaseModel):
     content: str
     type: str = "message"
     attachments: Optional[List[str]] = []
+
+class ThreadSummary(BaseModel):
+    thread_id: str
+    participant_id: str
+    participant_name: Optional[str] = None
+    child_id: Optional[str] = None
+    last_message: dict
+    unread_count: int = 0
+    message_count: int = 0
+
+class ThreadsListResponse(BaseModel):
+    threads: List[ThreadSummary]
+    limit: int
+    offset: int
+    has_more: bool
+
+class ThreadMessagesResponse(BaseModel):
+    thread_id: str
+    messages: List[dict]  # oldest first
+    limit: int
+    has_more: bool
+    next_before: Optional[str] = None  # cursor for the next older page
+
+class UserMessagesResponse(BaseModel):
+    messages: List[dict]  # newest first
+    limit: int
+    has_more: bool
+    next_before: Optional[str] = None  # cursor for the next older page
+
+class ThreadReadRequest(BaseModel):
+    up_to: Optional[datetime] = None  # mark messages up to this time; defaults to now
+
+class ThreadReadResponse(BaseModel):
+    thread_id: str
+    marked: int
+    up_to: datetime
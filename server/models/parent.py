@@ -92,6 +92,7 @@ class ParentUpdate(BaseModel):
     relationship: Optional[str] = None
     document: Optional[str] = None
     documentName: Optional[str] = None
+    documentBlobId: Optional[str] = None
 
 
 class TokenResponse(BaseModel):
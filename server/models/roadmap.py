@@ -39,8 +39,32 @@ class RoadmapUpdate(BaseModel):
     aiPrediction: Optional[str] = None
     therapistNotes: Optional[str] = None
 
+class MilestoneCreate(BaseModel):
+    title: str = Field(..., min_length=1)
+    id: Optional[str] = None
+
+class MilestoneToggle(BaseModel):
+    completed: Optional[bool] = None  # None flips the current value
+
+class MilestoneReorder(BaseModel):
+    order: List[str] = Field(..., min_length=1, description="Milestone IDs in their new order")
+
+class MilestoneUpdateResponse(BaseModel):
+    """Compact result of a milestone-level update"""
+    id: str
+    progress: int
+    status: str
+    milestone: Optional[Milestone] = None
+    updated_at: datetime
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat() if v.tzinfo else v.isoformat() + "Z",
+        }
+
 class RoadmapResponse(RoadmapBase):
     id: str = Field(..., alias="_id")
+    forecast: Optional[Dict[str, Any]] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -0,0 +1,40 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class UploadCreate(BaseModel):
+    """Open a resumable upload session"""
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0, description="Total file size in bytes")
+    content_type: Optional[str] = Field(None, max_length=255)
+
+
+class DocumentRef(BaseModel):
+    """Metadata-only reference to a stored blob"""
+    name: str
+    blob_id: str = Field(..., description="sha256 of the content")
+    size: int
+    content_type: str
+    url: str = Field(..., description="Download path, relative to the API base URL")
+
+
+class UploadStatus(BaseModel):
+    """Progress of an upload session"""
+    upload_id: str
+    filename: str
+    size: int
+    received: int = Field(..., description="Bytes committed; resume the next part from here")
+    chunk_size: int
+    part_size: int = Field(..., description="Suggested bytes per PUT")
+    complete: bool
+    deduplicated: bool = Field(default=False, description="Identical content was already stored")
+    document: Optional[DocumentRef] = None
+
+
+class ChildDocumentAttach(BaseModel):
+    """Attach an uploaded blob to a child's documents"""
+    blob_id: str
+    title: Optional[str] = None
+    category: Optional[str] = None
+    type: Optional[str] = None
+    date: Optional[str] = None
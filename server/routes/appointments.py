@@ -5,6 +5,8 @@ from database import db_manager
 from models.appointment import AppointmentCreate, Appointment
 import traceback
 from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.admin_stats import adjust_stats
 
 router = APIRouter(prefix="/api/appointments", tags=["Appointments"])
 
@@ -25,6 +27,7 @@ async def create_appointment(appointment: AppointmentCreate):
         
         # Insert into database
         result = db_manager.appointments.insert_one(appointment_dict)
+        adjust_stats(pending_appointments=1)
         
         # Prepare the response data manually
         response_data = {
@@ -95,13 +98,18 @@ async def update_appointment_status(appointment_id: str, status_update: dict = B
         if acted_by:
             update_fields["acted_by"] = acted_by
             
-        result = db_manager.appointments.update_one(
+        previous = db_manager.appointments.find_one_and_update(
             query,
-            {"$set": update_fields}
+            {"$set": update_fields},
+            projection={"status": 1},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if previous is None:
             raise HTTPException(status_code=404, detail="Appointment not found")
+        
+        was_pending = previous.get("status") == "pending"
+        adjust_stats(pending_appointments=int(new_status == "pending") - int(was_pending))
             
         return {"status": "success", "message": f"Appointment {new_status}"}
     except Exception as e:
@@ -0,0 +1,47 @@
+"""
+Avatar Images
+Serves stored avatars and profile photos by content hash. Public (image
+tags cannot send tokens; hashes are unguessable and only blobs flagged as
+avatars are served) and immutable, so browsers and proxies cache them for
+a year and revalidate with a strong ETag.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+
+from utils.avatars import resolve_avatar
+from utils.blobs import DEFAULT_CONTENT_TYPE, iter_blob, open_blob
+
+
+router = APIRouter(prefix="/api/avatars", tags=["Avatars"])
+
+
+@router.get("/{blob_id}")
+async def get_avatar(
+    blob_id: str,
+    size: Optional[int] = Query(None, ge=1, le=4096, description="Smallest acceptable width/height in pixels"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    An avatar image, or its smallest stored thumbnail of at least size pixels
+    """
+    served_id = resolve_avatar(blob_id, size)
+    if served_id is None:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    # Strong validator: the hash of the exact bytes served
+    etag = f'"{served_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    grid_out = open_blob(served_id)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(
+        iter_blob(grid_out),
+        media_type=(grid_out.metadata or {}).get("content_type", DEFAULT_CONTENT_TYPE),
+        headers=headers
+    )
@@ -2,7 +2,8 @@
 Community API Routes
 Handles community creation, messaging, and member management
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Header
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from database import db_manager
 from models.community import (
@@ -12,15 +13,33 @@ from models.community import (
     CommunityMessageResponse,
     CommunityMemberResponse,
     MessagesListResponse,
-    JoinCommunityRequest
+    JoinCommunityRequest,
+    ReactionUpdateResponse,
+    MembersListResponse,
+    CommunityUnreadItem,
+    CommunityUnreadResponse,
+    MarkReadRequest,
+    MessageSearchHit,
+    MessageSearchResponse
 )
-from middleware.auth_middleware import get_current_parent, get_current_doctor, security, get_current_user
+from middleware.auth_middleware import get_current_parent, get_current_doctor, security, get_current_user, get_user_from_token
 from fastapi.security import HTTPAuthorizationCredentials
 from utils.auth import decode_access_token
 from models.parent import ParentResponse
 from models.doctor import DoctorResponse
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+import re
+from utils.events import event_broker, community_channel, sse_stream
+from utils.reactions import toggle_reaction, validate_emoji
+from utils.search import search_messages
+from utils.hidden import drop_hidden, hide_message, visible_find
+from utils.pagination import encode_cursor, keyset_filter
+from utils.membership import (
+    add_member, remove_member, load_parents, name_key,
+    get_default_community_id, resolve_default_community
+)
 
 
 router = APIRouter(prefix="/api/communities", tags=["Communities"])
@@ -32,6 +51,36 @@ router = APIRouter(prefix="/api/communities", tags=["Communities"])
 # Replacing get_current_community_user with the more robust get_current_user
 get_current_community_user = get_current_user
 
+# Unread counts stop here; the UI shows "99+" beyond it
+UNREAD_COUNT_LIMIT = 100
+
+
+def _adjust_message_count(community_id: str, delta: int):
+    """
+    Keep communities.message_count in step with visible messages.
+    Only touches communities whose counter is initialized; the others are
+    backfilled by _message_total on their next read.
+    """
+    db_manager.communities.update_one(
+        {"_id": community_id, "message_count": {"$exists": True}},
+        {"$inc": {"message_count": delta}}
+    )
+
+
+def _message_total(community: dict) -> int:
+    """Maintained message counter, initialized with a one-off count if missing"""
+    if "message_count" in community:
+        return community["message_count"]
+    total = db_manager.community_messages.count_documents({
+        "community_id": community["_id"],
+        "is_deleted": False
+    })
+    db_manager.communities.update_one(
+        {"_id": community["_id"], "message_count": {"$exists": False}},
+        {"$set": {"message_count": total}}
+    )
+    return total
+
 
 @router.get("/", response_model=List[CommunityResponse])
 async def get_communities(
@@ -49,7 +98,7 @@ async def get_communities(
                 id=str(community["_id"]),
                 name=community["name"],
                 description=community.get("description"),
-                member_count=len(community.get("member_ids", [])),
+                member_count=community.get("member_count", 0),
                 is_active=community.get("is_active", True),
                 created_at=community.get("created_at", datetime.now(timezone.utc))
             ))
@@ -69,48 +118,74 @@ async def get_default_community(
     """
     Get the default parent support community (Parent and Therapist)
     """
-    community = db_manager.communities.find_one({"name": "Parent Support Community"})
+    community = db_manager.communities.find_one({"_id": get_default_community_id()})
     
     if not community:
-        # Create it if it doesn't exist
-        community_id = str(ObjectId())
-        community_data = {
-            "_id": community_id,
-            "name": "Parent Support Community",
-            "description": "A safe space for parents to connect, share experiences, and support each other.",
-            "created_by": "system",
-            "member_ids": [],
-            "is_active": True,
-            "created_at": datetime.now(timezone.utc),
-            "updated_at": datetime.now(timezone.utc)
-        }
-        db_manager.communities.insert_one(community_data)
-        community = community_data
-        
-        # Add welcome message
-        welcome_message = {
-            "_id": str(ObjectId()),
-            "community_id": community_id,
-            "sender_id": "system",
-            "sender_name": "NeuroBridge Team",
-            "sender_role": "system",
-            "content": "Welcome to the Parent Support Community! 🎉 This is a safe space for you to connect with other parents.",
-            "attachments": [],
-            "timestamp": datetime.now(timezone.utc),
-            "is_deleted": False
-        }
-        db_manager.community_messages.insert_one(welcome_message)
+        # Cached ID went stale (community removed): resolve/create it again
+        community = db_manager.communities.find_one({"_id": resolve_default_community()})
     
     return CommunityResponse(
         id=str(community["_id"]),
         name=community["name"],
         description=community.get("description"),
-        member_count=len(community.get("member_ids", [])),
+        member_count=community.get("member_count", 0),
         is_active=community.get("is_active", True),
         created_at=community.get("created_at", datetime.now(timezone.utc))
     )
 
 
+@router.get("/unread", response_model=CommunityUnreadResponse)
+async def get_community_unread_counts(
+    current_user = Depends(get_current_community_user)
+):
+    """
+    Unread message counts for every community the user belongs to
+    
+    Parents get their joined communities; staff get all active ones. Each
+    count runs on the community_unread index and stops at UNREAD_COUNT_LIMIT.
+    """
+    user_id = current_user["id"]
+    
+    if current_user["role"] == "parent":
+        memberships = {
+            m["community_id"]: m.get("joined_at")
+            for m in db_manager.community_members.find({"user_id": user_id}, {"community_id": 1, "joined_at": 1})
+        }
+    else:
+        memberships = {c["_id"]: None for c in db_manager.communities.find({"is_active": True}, {"_id": 1})}
+    
+    cursors = {
+        c["community_id"]: c["last_read_at"]
+        for c in db_manager.community_read_cursors.find(
+            {"user_id": user_id, "community_id": {"$in": list(memberships)}},
+            {"community_id": 1, "last_read_at": 1}
+        )
+    }
+    
+    items = []
+    for community_id, joined_at in memberships.items():
+        # No cursor yet: count from when the user joined (or everything, capped)
+        since = cursors.get(community_id) or joined_at or datetime.fromtimestamp(0, tz=timezone.utc)
+        unread = db_manager.community_messages.count_documents(
+            {
+                "community_id": community_id,
+                "is_deleted": False,
+                "timestamp": {"$gt": since},
+                "sender_id": {"$ne": user_id}
+            },
+            limit=UNREAD_COUNT_LIMIT,
+            hint="community_unread"
+        )
+        items.append(CommunityUnreadItem(
+            community_id=community_id,
+            unread=unread,
+            capped=unread >= UNREAD_COUNT_LIMIT,
+            last_read_at=cursors.get(community_id)
+        ))
+    
+    return CommunityUnreadResponse(communities=items, total=sum(i.unread for i in items))
+
+
 @router.get("/{community_id}", response_model=CommunityResponse)
 async def get_community(
     community_id: str,
@@ -131,7 +206,7 @@ async def get_community(
         id=str(community["_id"]),
         name=community["name"],
         description=community.get("description"),
-        member_count=len(community.get("member_ids", [])),
+        member_count=community.get("member_count", 0),
         is_active=community.get("is_active", True),
         created_at=community.get("created_at", datetime.now(timezone.utc))
     )
@@ -155,22 +230,10 @@ async def join_community(
             detail="Community not found"
         )
     
-    parent_id = current_parent.id
-    member_ids = community.get("member_ids", [])
-    
-    # Check if already a member
-    if parent_id in member_ids:
+    # Indexed upsert; False means the membership row already existed
+    if not add_member(community_id, current_parent.id, "parent", current_parent.name):
         return {"message": "Already a member of this community", "already_member": True}
     
-    # Add parent to community
-    db_manager.communities.update_one(
-        {"_id": community_id},
-        {
-            "$push": {"member_ids": parent_id},
-            "$set": {"updated_at": datetime.now(timezone.utc)}
-        }
-    )
-    
     # Add welcome message
     welcome_message = {
         "_id": str(ObjectId()),
@@ -184,6 +247,7 @@ async def join_community(
         "is_deleted": False
     }
     db_manager.community_messages.insert_one(welcome_message)
+    _adjust_message_count(community_id, 1)
     
     return {
         "message": "Successfully joined community",
@@ -210,36 +274,116 @@ async def leave_community(
             detail="Community not found"
         )
     
-    parent_id = current_parent.id
+    if not remove_member(community_id, current_parent.id):
+        return {"message": "Not a member of this community"}
     
-    # Remove parent from community
-    result = db_manager.communities.update_one(
-        {"_id": community_id},
-        {
-            "$pull": {"member_ids": parent_id},
-            "$set": {"updated_at": datetime.now(timezone.utc)}
-        }
+    return {"message": "Successfully left community"}
+
+
+@router.get("/{community_id}/stream")
+async def stream_community_events(
+    community_id: str,
+    request: Request,
+    token: str = Query(..., description="JWT access token (EventSource cannot send headers)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    resume_from: Optional[str] = Query(None, description="Event ID to resume after (when Last-Event-ID cannot be sent)")
+):
+    """
+    Server-Sent Events stream of community activity
+
+    Pushes message.created, message.reaction and message.deleted events as
+    they happen, replacing client-side polling of the messages endpoint.
+    Reconnecting clients get the events they missed replayed (or a
+    "resync" event when those are no longer held).
+    """
+    get_user_from_token(token)
+
+    if not db_manager.communities.find_one({"_id": community_id}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Community not found"
+        )
+
+    return StreamingResponse(
+        sse_stream(request, [community_channel(community_id)], last_event_id=last_event_id or resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+@router.post("/{community_id}/read", response_model=CommunityUnreadItem)
+async def mark_community_read(
+    community_id: str,
+    body: Optional[MarkReadRequest] = None,
+    current_user = Depends(get_current_community_user)
+):
+    """
+    Advance the user's read cursor for a community
     
-    if result.modified_count == 0:
-        return {"message": "Not a member of this community"}
+    Uses $max so an older timestamp (e.g. from a stale tab) never moves
+    the cursor backwards; a future timestamp is clamped to now so it
+    cannot hide messages that have not been sent yet.
+    """
+    if not db_manager.communities.find_one({"_id": community_id}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Community not found"
+        )
+
+    now = datetime.now(timezone.utc)
+    up_to = (body.up_to if body and body.up_to else None) or now
+    if up_to.tzinfo is None:
+        up_to = up_to.replace(tzinfo=timezone.utc)
+    up_to = min(up_to, now)
+    
+    cursor = db_manager.community_read_cursors.find_one_and_update(
+        {"user_id": current_user["id"], "community_id": community_id},
+        {"$max": {"last_read_at": up_to}},
+        projection={"last_read_at": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
-    return {"message": "Successfully left community"}
+    unread = db_manager.community_messages.count_documents(
+        {
+            "community_id": community_id,
+            "is_deleted": False,
+            "timestamp": {"$gt": cursor["last_read_at"]},
+            "sender_id": {"$ne": current_user["id"]}
+        },
+        limit=UNREAD_COUNT_LIMIT,
+        hint="community_unread"
+    )
+    return CommunityUnreadItem(
+        community_id=community_id,
+        unread=unread,
+        capped=unread >= UNREAD_COUNT_LIMIT,
+        last_read_at=cursor["last_read_at"]
+    )
 
 
 @router.get("/{community_id}/messages", response_model=MessagesListResponse)
 async def get_community_messages(
     community_id: str,
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    offset: int = Query(0, ge=0, description="Deprecated: use before/after cursors"),
     current_user = Depends(get_current_community_user)
 ):
     """
-    Get community messages with pagination
+    Get community messages with keyset pagination
     
-    Returns messages in reverse chronological order (newest first)
+    Pages are ordered by (timestamp, _id) and served from the
+    (community_id, timestamp, _id) index. Pass `before` with the returned
+    `next_before` cursor to scroll back, or `after` with `next_after` to
+    fetch newer messages. Messages in each page are oldest first. Archived
+    messages are served transparently once the hot collection is exhausted.
     """
-    community = db_manager.communities.find_one({"_id": community_id})
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+    community = db_manager.communities.find_one({"_id": community_id}, {"message_count": 1})
     
     if not community:
         raise HTTPException(
@@ -247,22 +391,34 @@ async def get_community_messages(
             detail="Community not found"
         )
     
-    # Get total count
-    total = db_manager.community_messages.count_documents({
-        "community_id": community_id,
-        "is_deleted": False
-    })
+    query = {"community_id": community_id, "is_deleted": False}
+    # Newest-first unless paging forward from an `after` cursor
+    direction = -1
+    if before:
+        query.update(keyset_filter(before, -1))
+    elif after:
+        direction = 1
+        query.update(keyset_filter(after, 1))
+    
+    # Fetch one extra row to learn whether another page exists; cursor pages
+    # continue into the archive tier once the hot collection runs out
+    sort = [("timestamp", direction), ("_id", direction)]
+    if offset and not (before or after):
+        # Offsets count raw rows, so hidden ones are only dropped from the page
+        docs = list(db_manager.community_messages.find(query).sort(sort).skip(offset).limit(limit + 1))
+        has_more = len(docs) > limit
+        docs = drop_hidden(current_user["id"], community_id, docs[:limit])
+    else:
+        docs = visible_find(db_manager.community_messages, query, sort, limit + 1, current_user["id"], community_id)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
     
-    # Get messages with pagination
-    messages_cursor = db_manager.community_messages.find({
-        "community_id": community_id,
-        "is_deleted": False,
-        "deleted_for": {"$ne": current_user["id"]}
-    }).sort("timestamp", -1).skip(offset).limit(limit)
+    # Oldest first in the returned list
+    if direction == -1:
+        docs.reverse()
     
-    messages = []
-    for msg in messages_cursor:
-        messages.append(CommunityMessageResponse(
+    messages = [
+        CommunityMessageResponse(
             id=str(msg["_id"]),
             community_id=msg["community_id"],
             sender_id=msg["sender_id"],
@@ -271,18 +427,74 @@ async def get_community_messages(
             content=msg["content"],
             attachments=msg.get("attachments", []),
             timestamp=msg["timestamp"],
-            reactions=msg.get("reactions", {})
-        ))
-    
-    # Reverse to show oldest first in the list
-    messages.reverse()
+            reactions=msg.get("reactions", {}),
+            reaction_counts=msg.get("reaction_counts", {})
+        )
+        for msg in docs
+    ]
     
     return MessagesListResponse(
         messages=messages,
-        total=total,
+        total=_message_total(community),
         limit=limit,
         offset=offset,
-        has_more=(offset + limit) < total
+        has_more=has_more,
+        next_before=encode_cursor(docs[0]) if docs else before,
+        next_after=encode_cursor(docs[-1]) if docs else after
+    )
+
+
+@router.get("/{community_id}/search", response_model=MessageSearchResponse)
+async def search_community_messages(
+    community_id: str,
+    q: str = Query(..., min_length=2, max_length=200, description='Words, "phrases" or -excluded terms'),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=500),
+    current_user = Depends(get_current_community_user)
+):
+    """
+    Search a community's message history
+    
+    Ranked by text relevance (newest first on ties) using the
+    (community_id, content) text index; hidden and deleted messages are
+    excluded.
+    """
+    if not db_manager.communities.find_one({"_id": community_id}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Community not found"
+        )
+    
+    docs = search_messages(
+        db_manager.community_messages,
+        q,
+        {"community_id": community_id, "is_deleted": False},
+        limit + 1,
+        offset
+    )
+    # Offsets count raw matches, so hidden hits are only dropped from the page
+    has_more = len(docs) > limit
+    docs = drop_hidden(current_user["id"], community_id, docs[:limit])
+    
+    return MessageSearchResponse(
+        query=q,
+        results=[
+            MessageSearchHit(
+                id=str(doc["_id"]),
+                community_id=doc["community_id"],
+                content=doc["content"],
+                sender_id=doc["sender_id"],
+                sender_name=doc["sender_name"],
+                timestamp=doc["timestamp"],
+                score=doc["score"],
+                snippet=doc["snippet"],
+                highlights=doc["highlights"]
+            )
+            for doc in docs
+        ],
+        limit=limit,
+        offset=offset,
+        has_more=has_more
     )
 
 
@@ -306,14 +518,8 @@ async def send_community_message(
         )
     
     # If parent is not a member, auto-join them
-    if current_user["role"] == "parent" and current_user["id"] not in community.get("member_ids", []):
-        db_manager.communities.update_one(
-            {"_id": community_id},
-            {
-                "$push": {"member_ids": current_user["id"]},
-                "$set": {"updated_at": datetime.now(timezone.utc)}
-            }
-        )
+    if current_user["role"] == "parent":
+        add_member(community_id, current_user["id"], "parent", current_user["name"])
     
     # [RESTRICTION] Only therapists/staff can broadcast in official Support/Parent communities
     is_support_comm = "parent" in community["name"].lower() or "support" in community["name"].lower()
@@ -334,13 +540,14 @@ async def send_community_message(
         "attachments": message_data.attachments or [],
         "timestamp": datetime.now(timezone.utc),
         "reactions": {},
-        "deleted_for": [],
+        "reaction_counts": {},
         "is_deleted": False
     }
     
     db_manager.community_messages.insert_one(new_message)
+    _adjust_message_count(community_id, 1)
     
-    return CommunityMessageResponse(
+    response = CommunityMessageResponse(
         id=new_message["_id"],
         community_id=new_message["community_id"],
         sender_id=new_message["sender_id"],
@@ -349,11 +556,14 @@ async def send_community_message(
         content=new_message["content"],
         attachments=new_message["attachments"],
         timestamp=new_message["timestamp"],
-        reactions=new_message["reactions"]
+        reactions=new_message["reactions"],
+        reaction_counts=new_message["reaction_counts"]
     )
+    event_broker.publish(community_channel(community_id), "message.created", response.model_dump(mode="json"))
+    return response
 
 
-@router.patch("/{community_id}/messages/{message_id}/react", response_model=CommunityMessageResponse)
+@router.patch("/{community_id}/messages/{message_id}/react", response_model=ReactionUpdateResponse)
 async def react_to_community_message(
     community_id: str,
     message_id: str,
@@ -362,71 +572,44 @@ async def react_to_community_message(
 ):
     """
     Add or remove a reaction to/from a community message
-    """
-    message = db_manager.community_messages.find_one({
-        "_id": message_id,
-        "community_id": community_id
-    })
     
-    if not message:
-        raise HTTPException(status_code=404, detail="Message not found")
+    Returns only the toggled emoji's reactors and count.
+    """
+    emoji = validate_emoji(emoji)
     
     # Auto-join parent to community if they react for the first time
-    if current_user["role"] == "parent":
-        community = db_manager.communities.find_one({"_id": community_id})
-        if community and current_user["id"] not in community.get("member_ids", []):
-            db_manager.communities.update_one(
-                {"_id": community_id},
-                {
-                    "$push": {"member_ids": current_user["id"]},
-                    "$set": {"updated_at": datetime.now(timezone.utc)}
-                }
-            )
-        
-    reactions = message.get("reactions", {})
-    user_id = current_user["id"]
-    
-    if emoji not in reactions:
-        reactions[emoji] = []
-        
-    if user_id in reactions[emoji]:
-        # Remove reaction (toggle)
-        reactions[emoji].remove(user_id)
-        if not reactions[emoji]:
-            del reactions[emoji]
-    else:
-        # Add reaction
-        reactions[emoji].append(user_id)
-        
-    db_manager.community_messages.update_one(
-        {"_id": message_id},
-        {"$set": {"reactions": reactions}}
+    if current_user["role"] == "parent" and db_manager.communities.find_one({"_id": community_id}, {"_id": 1}):
+        add_member(community_id, current_user["id"], "parent", current_user["name"])
+    
+    change = toggle_reaction(
+        db_manager.community_messages,
+        {"_id": message_id, "community_id": community_id, "is_deleted": False},
+        emoji,
+        current_user["id"]
     )
+    if change is None:
+        raise HTTPException(status_code=404, detail="Message not found")
     
-    return CommunityMessageResponse(
-        id=str(message["_id"]),
-        community_id=message["community_id"],
-        sender_id=message["sender_id"],
-        sender_name=message["sender_name"],
-        sender_role=message["sender_role"],
-        content=message["content"],
-        attachments=message.get("attachments", []),
-        timestamp=message["timestamp"],
-        reactions=reactions
-    )
+    response = ReactionUpdateResponse(message_id=message_id, **change)
+    event_broker.publish(community_channel(community_id), "message.reaction", response.model_dump(mode="json"))
+    return response
 
 
-@router.get("/{community_id}/members", response_model=List[CommunityMemberResponse])
+@router.get("/{community_id}/members", response_model=MembersListResponse)
 async def get_community_members(
     community_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    q: Optional[str] = Query(None, max_length=100, description="Case-insensitive name prefix"),
     current_user = Depends(get_current_community_user)
 ):
     """
     Get list of community members
     
-    Returns all parents who are members of this community
+    Pages through community_members (optionally filtered by name prefix on
+    the indexed name_key) and hydrates the page with one batched query.
     """
-    community = db_manager.communities.find_one({"_id": community_id})
+    community = db_manager.communities.find_one({"_id": community_id}, {"member_count": 1})
     
     if not community:
         raise HTTPException(
@@ -434,25 +617,45 @@ async def get_community_members(
             detail="Community not found"
         )
     
-    member_ids = community.get("member_ids", [])
+    query = {"community_id": community_id}
+    if q and q.strip():
+        query["name_key"] = {"$regex": f"^{re.escape(name_key(q))}"}
+        total = db_manager.community_members.count_documents(query)
+        sort = [("name_key", 1), ("user_id", 1)]
+    else:
+        total = community.get("member_count", 0)
+        sort = [("joined_at", 1), ("user_id", 1)]
+    
+    memberships = list(
+        db_manager.community_members.find(query, {"user_id": 1, "role": 1, "joined_at": 1})
+        .sort(sort).skip(offset).limit(limit)
+    )
+    
+    # Single $in lookup; the projection keeps passwords and documents out
+    parents = load_parents(
+        [m["user_id"] for m in memberships],
+        {"name": 1, "email": 1, "created_at": 1}
+    )
     
-    # Get parent details for all members
     members = []
-    for parent_id in member_ids:
-        parent = db_manager.parents.find_one({"_id": parent_id})
-        if not parent and ObjectId.is_valid(parent_id):
-            parent = db_manager.parents.find_one({"_id": ObjectId(parent_id)})
-            
+    for membership in memberships:
+        parent = parents.get(membership["user_id"])
         if parent:
             members.append(CommunityMemberResponse(
                 id=str(parent["_id"]),
                 name=parent["name"],
                 email=parent["email"],
-                joined_at=parent.get("created_at", datetime.now(timezone.utc)),
-                role="parent"
+                joined_at=membership.get("joined_at") or parent.get("created_at", datetime.now(timezone.utc)),
+                role=membership.get("role", "parent")
             ))
     
-    return members
+    return MembersListResponse(
+        members=members,
+        total=total,
+        limit=limit,
+        offset=offset,
+        has_more=(offset + len(memberships)) < total
+    )
 
 
 @router.delete("/{community_id}/messages/{message_id}", response_model=dict)
@@ -484,18 +687,18 @@ async def delete_community_message(
                 detail="Only therapists can delete messages for everyone."
             )
         
-        db_manager.community_messages.update_one(
-            {"_id": message_id},
+        result = db_manager.community_messages.update_one(
+            {"_id": message_id, "is_deleted": False},
             {"$set": {"is_deleted": True, "deleted_at": datetime.now(timezone.utc)}}
         )
+        if result.modified_count:
+            _adjust_message_count(community_id, -1)
+        event_broker.publish(community_channel(community_id), "message.deleted", {"message_id": message_id})
         return {"status": "deleted_for_everyone", "message_id": message_id}
 
     elif mode == "for_me":
         # Anyone can delete for themselves
-        db_manager.community_messages.update_one(
-            {"_id": message_id},
-            {"$addToSet": {"deleted_for": current_user["id"]}}
-        )
+        hide_message(current_user["id"], community_id, message_id)
         return {"status": "deleted_for_me", "message_id": message_id}
     
     else:
@@ -9,6 +9,7 @@ from utils.auth import verify_password, create_access_token
 from middleware.auth_middleware import get_current_doctor
 from datetime import datetime, timezone
 from bson import ObjectId
+from utils.avatars import store_avatar
 
 
 router = APIRouter(prefix="/api/doctor", tags=["Doctor Authentication"])
@@ -165,7 +166,11 @@ async def update_profile(
         if update_data.address is not None:
             update_fields["address"] = update_data.address
         if update_data.avatar is not None:
-            update_fields["avatar"] = update_data.avatar
+            # Inline images are stored once; the record keeps the hash URL
+            try:
+                update_fields["avatar"] = store_avatar(update_data.avatar)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid avatar image")
 
         update_fields["updated_at"] = datetime.now(timezone.utc)
 
@@ -0,0 +1,105 @@
+"""
+Document Downloads
+Streams blobs from the document store. Supports single-range requests
+(Range: bytes=...) so viewers can seek and interrupted downloads resume;
+blobs are content-addressed and immutable, so responses are cacheable.
+"""
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+
+from middleware.auth_middleware import get_user_from_token
+from utils.blobs import DEFAULT_CONTENT_TYPE, iter_blob, open_blob
+
+
+router = APIRouter(prefix="/api/documents", tags=["Documents"])
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) for a single byte range, None to send the whole blob
+
+    Raises:
+        HTTPException: 416 if the range lies outside the blob
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        # Multi-range or malformed: ignoring Range and sending 200 is allowed
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+@router.get("/{blob_id}")
+async def download_document(
+    blob_id: str,
+    token: Optional[str] = Query(None, description="JWT access token (for links opened outside the app)"),
+    authorization: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    download: bool = Query(False, description="Send as an attachment instead of inline")
+):
+    """
+    Stream a stored document
+
+    Accepts the usual Bearer header or a token query parameter, since
+    browsers open document links without custom headers.
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    get_user_from_token(token)
+
+    etag = f'"{blob_id}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    grid_out = open_blob(blob_id)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    size = grid_out.length
+    try:
+        byte_range = _parse_range(range_header, size)
+    except HTTPException:
+        grid_out.close()
+        raise
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+
+    metadata = grid_out.metadata or {}
+    disposition = "attachment" if download else "inline"
+    headers = {
+        **cache_headers,
+        "Content-Length": str(length),
+        "Content-Disposition": f"{disposition}; filename*=UTF-8''{quote(grid_out.filename or 'document')}"
+    }
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        iter_blob(grid_out, start, length),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type=metadata.get("content_type", DEFAULT_CONTENT_TYPE),
+        headers=headers
+    )
@@ -5,20 +5,46 @@ All messages persist permanently in MongoDB until explicitly deleted.
 
 Deletion modes:
   - delete_for_me:       Soft-delete for the requesting user only
-                         (adds user_id to deleted_for list)
+                         (adds a row to hidden_messages, see utils/hidden.py)
   - delete_for_everyone: Hard soft-delete visible to nobody
                          (sets is_deleted=True for all)
 
 Reactions:
   Each message stores a "reactions" dict: { "emoji": [user_id, ...] }
-  PATCH /{message_id}/react?emoji=👍  toggles the reaction for the current user.
+  and a maintained "reaction_counts" dict: { "emoji": count }
+  PATCH /{message_id}/react?emoji=👍  toggles the reaction for the current user
+  and returns only the changed emoji.
+
+Search:
+  GET /search?q=...  ranked full-text search over the user's visible messages
+
+Inbox:
+  GET /user/{user_id}        keyset-paginated messages of one user, newest first
+  GET /threads               one summary row per conversation, newest first
+  GET /threads/{thread_id}   keyset-paginated messages of one conversation
+  PATCH /threads/{thread_id}/read  marks the whole conversation read at once
+
+Unread counts:
+  Kept per user (and per thread) in dm_unread_counters by send, read and
+  delete; see utils/unread.py.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import List, Optional
+from typing import Optional
 from datetime import datetime, timezone
 from database import db_manager
-from models.message import DirectMessage, MessageCreate
+from models.message import (
+    DirectMessage, MessageCreate, ThreadSummary, ThreadsListResponse, ThreadMessagesResponse,
+    ThreadReadRequest, ThreadReadResponse, UserMessagesResponse
+)
+from models.community import ReactionUpdateResponse, MessageSearchHit, MessageSearchResponse
 from routes.communities import get_current_community_user
+from utils.reactions import toggle_reaction, validate_emoji
+from utils.search import search_messages
+from utils.hidden import DIRECT_SCOPE, drop_hidden, hide_message, is_hidden, unhidden_stages, visible_find
+from utils.pagination import encode_cursor, keyset_filter
+from utils.unread import adjust_unread, get_unread
+from pymongo import ReturnDocument
+from utils.events import event_broker, user_channel
 from bson import ObjectId
 
 router = APIRouter(prefix="/api/messages", tags=["Messages"])
@@ -35,24 +61,26 @@ def _build_query(message_id: str) -> dict:
     return {"_id": message_id}
 
 
+def _visible_to(user_id: str) -> dict:
+    """
+    Messages the user sent or received that were not deleted for everyone
+    (hidden ones are dropped by visible_find / unhidden_stages)
+    """
+    return {
+        "$or": [{"sender_id": user_id}, {"recipient_id": user_id}],
+        "is_deleted": {"$ne": True}
+    }
+
+
 def _serialize_message(doc: dict) -> dict:
     """Normalize a MongoDB message document for API response."""
     doc["_id"] = str(doc["_id"]) if isinstance(doc.get("_id"), ObjectId) else doc.get("_id", "")
     doc["id"] = doc["_id"]
     doc.setdefault("reactions", {})
-    doc.setdefault("deleted_for", [])
+    doc.setdefault("reaction_counts", {})
     return doc
 
 
-def _is_visible_for(doc: dict, user_id: str) -> bool:
-    """Return True if the message should be visible for this user."""
-    if doc.get("is_deleted"):
-        return False
-    if user_id in doc.get("deleted_for", []):
-        return False
-    return True
-
-
 # ─────────────────────────────────────────────────────────────────────
 # Routes
 # ─────────────────────────────────────────────────────────────────────
@@ -70,39 +98,240 @@ async def send_message(
     message_dict["timestamp"] = datetime.now(timezone.utc)
     message_dict["read"] = False
     message_dict["is_deleted"] = False      # deleted for everyone
-    message_dict["deleted_for"] = []        # list of user_ids for "delete for me"
     message_dict["reactions"] = {}          # { "emoji": [user_id, ...] }
+    message_dict["reaction_counts"] = {}    # { "emoji": count }
 
     result = db_manager.direct_messages.insert_one(message_dict)
     message_dict["_id"] = str(result.inserted_id)
     message_dict["id"] = message_dict["_id"]
+    event_broker.publish(user_channel(message_dict["recipient_id"]), "message.received", {
+        "id": message_dict["id"],
+        "thread_id": message_dict["thread_id"],
+        "sender_id": message_dict["sender_id"],
+        "sender_name": message_dict["sender_name"],
+        "content": message_dict["content"],
+        "timestamp": message_dict["timestamp"].isoformat()
+    })
+    adjust_unread(message_dict["recipient_id"], message_dict["thread_id"], 1)
 
     return message_dict
 
 
-@router.get("/user/{user_id}", response_model=List[dict])
+@router.get("/user/{user_id}", response_model=UserMessagesResponse)
 async def get_user_messages(
     user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
     current_user: dict = Depends(get_current_community_user)
 ):
     """
-    Get all direct messages visible to the requesting user.
+    Direct messages visible to a user, newest first, one page at a time.
     Excludes messages deleted for everyone and messages the user deleted for themselves.
+    Pass the returned next_before to scroll back; the archive tier is only
+    read once the hot tier runs out.
     """
     if str(current_user.get("id")) != user_id and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view these messages")
 
-    cursor = db_manager.direct_messages.find({
-        "$or": [
-            {"sender_id": user_id},
-            {"recipient_id": user_id}
-        ],
-        "is_deleted": {"$ne": True},
-        "deleted_for": {"$nin": [user_id]}  # exclude "delete for me"
-    }).sort("timestamp", -1)
+    query = _visible_to(user_id)
+    if before:
+        query = {"$and": [query, keyset_filter(before, -1, object_ids=True)]}
+
+    docs = visible_find(
+        db_manager.direct_messages, query, [("timestamp", -1), ("_id", -1)], limit + 1, user_id, DIRECT_SCOPE
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    return UserMessagesResponse(
+        messages=[_serialize_message(doc) for doc in docs],
+        limit=limit,
+        has_more=has_more,
+        next_before=encode_cursor(docs[-1]) if docs else before
+    )
+
+
+@router.get("/threads", response_model=ThreadsListResponse)
+async def get_threads(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_community_user)
+):
+    """
+    Inbox: one row per conversation, most recently active first.
+    A single aggregation over the (sender_id, timestamp) and
+    (recipient_id, timestamp) indexes of the hot tier; unread counts come
+    from the maintained counters, the same source as the badge.
+    """
+    user_id = str(current_user.get("id"))
+    unread = get_unread(user_id)["threads"]
+
+    pipeline = [
+        {"$match": _visible_to(user_id)},
+        *unhidden_stages({"$literal": user_id}, DIRECT_SCOPE),
+        {"$sort": {"timestamp": -1}},
+        {"$group": {
+            "_id": "$thread_id",
+            "last_message": {"$first": "$$ROOT"},
+            "message_count": {"$sum": 1},
+            # Only the other participant's messages carry their name
+            "participant_name": {"$max": {"$cond": [
+                {"$ne": ["$sender_id", user_id]}, "$sender_name", None
+            ]}}
+        }},
+        {"$sort": {"last_message.timestamp": -1}},
+        {"$skip": offset},
+        {"$limit": limit + 1},
+        {"$project": {"last_message.reactions": 0}}
+    ]
+    rows = list(db_manager.direct_messages.aggregate(pipeline))
+
+    threads = []
+    for row in rows[:limit]:
+        last = _serialize_message(row["last_message"])
+        threads.append(ThreadSummary(
+            thread_id=str(row["_id"]),
+            participant_id=str(last["recipient_id"] if str(last["sender_id"]) == user_id else last["sender_id"]),
+            participant_name=row.get("participant_name"),
+            child_id=last.get("child_id"),
+            last_message=last,
+            unread_count=unread.get(str(row["_id"]), 0),
+            message_count=row["message_count"]
+        ))
+
+    return ThreadsListResponse(threads=threads, limit=limit, offset=offset, has_more=len(rows) > limit)
+
+
+@router.get("/threads/{thread_id}", response_model=ThreadMessagesResponse)
+async def get_thread_messages(
+    thread_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    current_user: dict = Depends(get_current_community_user)
+):
+    """
+    Messages of one conversation, newest page first, oldest first within a page.
+    Pass the returned next_before to scroll back; older pages continue into
+    the archive tier.
+    """
+    user_id = str(current_user.get("id"))
+    query = {"thread_id": thread_id, **_visible_to(user_id)}
+    if before:
+        query = {"$and": [query, keyset_filter(before, -1, object_ids=True)]}
+
+    docs = visible_find(
+        db_manager.direct_messages, query, [("timestamp", -1), ("_id", -1)], limit + 1, user_id, DIRECT_SCOPE
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    docs.reverse()
+
+    return ThreadMessagesResponse(
+        thread_id=thread_id,
+        messages=[_serialize_message(doc) for doc in docs],
+        limit=limit,
+        has_more=has_more,
+        next_before=encode_cursor(docs[0]) if docs else before
+    )
 
-    messages = [_serialize_message(doc) for doc in cursor]
-    return messages
+
+@router.patch("/threads/{thread_id}/read", response_model=ThreadReadResponse)
+async def mark_thread_read(
+    thread_id: str,
+    body: Optional[ThreadReadRequest] = None,
+    current_user: dict = Depends(get_current_community_user)
+):
+    """
+    Mark every unread message in a conversation as read (optionally only
+    those sent up to a timestamp) with one update_many. Adjusts the unread
+    counters and sends a single read receipt to the other participant.
+    """
+    user_id = str(current_user.get("id"))
+    up_to = (body.up_to if body and body.up_to else None) or datetime.now(timezone.utc)
+    if up_to.tzinfo is None:
+        up_to = up_to.replace(tzinfo=timezone.utc)
+
+    # Hidden messages were already taken off the counters when they were hidden
+    unread = drop_hidden(user_id, DIRECT_SCOPE, list(db_manager.direct_messages.find(
+        {
+            "thread_id": thread_id,
+            "recipient_id": user_id,
+            "read": False,
+            "is_deleted": {"$ne": True},
+            "timestamp": {"$lte": up_to}
+        },
+        {"sender_id": 1}
+    )))
+    senders = {str(doc["sender_id"]) for doc in unread}
+    result = db_manager.direct_messages.update_many(
+        {"_id": {"$in": [doc["_id"] for doc in unread]}, "read": False},
+        {"$set": {"read": True, "read_at": datetime.now(timezone.utc)}}
+    )
+
+    if result.modified_count:
+        adjust_unread(user_id, thread_id, -result.modified_count)
+        receipt = {"thread_id": thread_id, "reader_id": user_id, "up_to": up_to.isoformat(), "count": result.modified_count}
+        for sender_id in senders:
+            event_broker.publish(user_channel(str(sender_id)), "message.read", receipt)
+
+    return ThreadReadResponse(thread_id=thread_id, marked=result.modified_count, up_to=up_to)
+
+
+@router.get("/search", response_model=MessageSearchResponse)
+async def search_direct_messages(
+    q: str = Query(..., min_length=2, max_length=200, description='Words, "phrases" or -excluded terms'),
+    with_user: Optional[str] = Query(None, description="Only the conversation with this user"),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=500),
+    current_user: dict = Depends(get_current_community_user)
+):
+    """
+    Search the current user's direct messages.
+    Ranked by text relevance; excludes messages deleted for everyone
+    and messages the user deleted for themselves.
+    """
+    user_id = str(current_user.get("id"))
+
+    if with_user:
+        participants = {"$or": [
+            {"sender_id": user_id, "recipient_id": with_user},
+            {"sender_id": with_user, "recipient_id": user_id}
+        ]}
+    else:
+        participants = {"$or": [{"sender_id": user_id}, {"recipient_id": user_id}]}
+
+    docs = search_messages(
+        db_manager.direct_messages,
+        q,
+        {**participants, "is_deleted": {"$ne": True}},
+        limit + 1,
+        offset
+    )
+    # Offsets count raw matches, so hidden hits are only dropped from the page
+    has_more = len(docs) > limit
+    docs = drop_hidden(user_id, DIRECT_SCOPE, docs[:limit])
+
+    return MessageSearchResponse(
+        query=q,
+        results=[
+            MessageSearchHit(
+                id=str(doc["_id"]),
+                thread_id=doc.get("thread_id"),
+                recipient_id=doc.get("recipient_id"),
+                content=doc["content"],
+                sender_id=doc["sender_id"],
+                sender_name=doc.get("sender_name", ""),
+                timestamp=doc["timestamp"],
+                score=doc["score"],
+                snippet=doc["snippet"],
+                highlights=doc["highlights"]
+            )
+            for doc in docs
+        ],
+        limit=limit,
+        offset=offset,
+        has_more=has_more
+    )
 
 
 @router.patch("/{message_id}/read", response_model=dict)
@@ -116,14 +345,21 @@ async def mark_as_read(
     query = {"recipient_id": str(current_user.get("id")), "is_deleted": {"$ne": True}}
     query.update(_build_query(message_id))
 
-    result = db_manager.direct_messages.update_one(
+    # The pre-update document tells us whether this call flipped it to read
+    previous = db_manager.direct_messages.find_one_and_update(
         query,
-        {"$set": {"read": True}}
+        {"$set": {"read": True}},
+        projection={"read": 1, "thread_id": 1},
+        return_document=ReturnDocument.BEFORE
     )
 
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Message not found or already read")
 
+    # Hidden messages were already taken off the counters when they were hidden
+    if previous.get("read") is False and not is_hidden(query["recipient_id"], DIRECT_SCOPE, previous["_id"]):
+        adjust_unread(query["recipient_id"], previous.get("thread_id"), -1)
+
     return {"status": "success"}
 
 
@@ -158,14 +394,18 @@ async def delete_message(
                 status_code=403,
                 detail="Only the sender can delete a message for everyone"
             )
-        db_manager.direct_messages.update_one(
-            base_query,
+        previous = db_manager.direct_messages.find_one_and_update(
+            {**base_query, "is_deleted": {"$ne": True}},
             {"$set": {
                 "is_deleted": True,
                 "deleted_at": datetime.now(timezone.utc),
                 "content": "🚫 This message was deleted"   # WhatsApp-style placeholder
-            }}
+            }},
+            projection={"read": 1, "recipient_id": 1, "thread_id": 1},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous is not None and previous.get("read") is False:
+            adjust_unread(str(previous["recipient_id"]), previous.get("thread_id"), -1)
         return {"status": "deleted_for_everyone", "message_id": message_id}
 
     else:  # for_me
@@ -173,14 +413,13 @@ async def delete_message(
         if user_id not in [str(message.get("sender_id")), str(message.get("recipient_id"))]:
             raise HTTPException(status_code=403, detail="You are not part of this conversation")
 
-        db_manager.direct_messages.update_one(
-            base_query,
-            {"$addToSet": {"deleted_for": user_id}}
-        )
+        newly_hidden = hide_message(user_id, DIRECT_SCOPE, message["_id"])
+        if newly_hidden and str(message.get("recipient_id")) == user_id and message.get("read") is False:
+            adjust_unread(user_id, message.get("thread_id"), -1)
         return {"status": "deleted_for_me", "message_id": message_id}
 
 
-@router.patch("/{message_id}/react", response_model=dict)
+@router.patch("/{message_id}/react", response_model=ReactionUpdateResponse)
 async def react_to_message(
     message_id: str,
     emoji: str = Query(..., min_length=1, description="Emoji to react with"),
@@ -189,35 +428,27 @@ async def react_to_message(
     """
     Toggle an emoji reaction on a private message.
     If the user already reacted with this emoji it is removed (toggle off).
-    Returns the updated reactions dict.
+    Returns only the changed reaction.
     """
     user_id = str(current_user.get("id"))
+    emoji = validate_emoji(emoji)
     base_query = _build_query(message_id)
 
-    message = db_manager.direct_messages.find_one(base_query)
-    if not message:
+    # Deleted-for-everyone is part of the update filter; "delete for me" is a keyed lookup
+    change = None
+    if not is_hidden(user_id, DIRECT_SCOPE, base_query["_id"]):
+        change = toggle_reaction(
+            db_manager.direct_messages,
+            {**base_query, "is_deleted": {"$ne": True}},
+            emoji,
+            user_id
+        )
+    if change is None:
+        if db_manager.direct_messages.find_one(base_query, {"_id": 1}):
+            raise HTTPException(status_code=403, detail="Message not accessible")
         raise HTTPException(status_code=404, detail="Message not found")
 
-    if not _is_visible_for(message, user_id):
-        raise HTTPException(status_code=403, detail="Message not accessible")
-
-    reactions = message.get("reactions", {})
-    if emoji not in reactions:
-        reactions[emoji] = []
-
-    if user_id in reactions[emoji]:
-        reactions[emoji].remove(user_id)
-        if not reactions[emoji]:
-            del reactions[emoji]
-    else:
-        reactions[emoji].append(user_id)
-
-    db_manager.direct_messages.update_one(
-        base_query,
-        {"$set": {"reactions": reactions}}
-    )
-
-    return {"reactions": reactions}
+    return ReactionUpdateResponse(message_id=message_id, **change)
 
 
 @router.get("/unread/count", response_model=dict)
@@ -226,14 +457,7 @@ async def get_unread_count(
 ):
     """
     Get count of unread messages for the current user.
+    Served from the maintained counter document (one primary-key read).
     """
-    user_id = str(current_user.get("id"))
-
-    count = db_manager.direct_messages.count_documents({
-        "recipient_id": user_id,
-        "read": False,
-        "is_deleted": {"$ne": True},
-        "deleted_for": {"$nin": [user_id]}
-    })
-
-    return {"count": count}
+    unread = get_unread(str(current_user.get("id")))
+    return {"count": unread["total"], "threads": unread["threads"]}
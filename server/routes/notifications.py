@@ -0,0 +1,54 @@
+"""
+Notification Stream
+One Server-Sent Events connection per signed-in user carrying everything the
+unread badges and toasts need, pushed by the write paths:
+  - unread.changed     direct-message unread counter moved (with new total)
+  - message.received   a direct message arrived for the user
+  - message.read       the other participant read the user's messages
+  - message.created    a post in one of the user's communities
+  - membership.changed the user joined or left a community (the stream
+                       re-subscribes to match)
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from middleware.auth_middleware import get_user_from_token
+from utils.events import community_channel, sse_stream, user_channel
+from utils.membership import community_ids_for
+
+
+router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
+
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: str = Query(..., description="JWT access token (EventSource cannot send headers)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    resume_from: Optional[str] = Query(None, description="Event ID to resume after (when Last-Event-ID cannot be sent)")
+):
+    """
+    Server-Sent Events stream of the current user's notifications
+
+    Browsers reconnect automatically and send Last-Event-ID, so missed
+    events are replayed instead of re-fetching counts; a "resync" event
+    tells the client its position is too old and it should refresh.
+    """
+    user = get_user_from_token(token)
+
+    def _channels():
+        channels = [user_channel(user["id"])]
+        return channels + [community_channel(cid) for cid in community_ids_for(user["id"], user["role"])]
+
+    return StreamingResponse(
+        sse_stream(
+            request,
+            _channels(),
+            last_event_id=last_event_id or resume_from,
+            refresh_channels=_channels
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
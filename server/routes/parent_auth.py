@@ -2,20 +2,23 @@
 Parent Authentication API Routes
 Handles login, logout, and profile endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from database import db_manager
 from models.parent import ParentLogin, ParentResponse, TokenResponse, ParentUpdate
 from utils.auth import verify_password, create_access_token
 from middleware.auth_middleware import get_current_parent
 from datetime import datetime, timezone
 from bson import ObjectId
+from utils.membership import join_default_community, sync_member_name
+from utils.blobs import decode_upload, document_ref, stored_ref
+from utils.avatars import store_avatar
 
 
 router = APIRouter(prefix="/api/parent", tags=["Parent Authentication"])
 
 
 @router.post("/login", response_model=TokenResponse, status_code=status.HTTP_200_OK)
-async def login(credentials: ParentLogin):
+async def login(credentials: ParentLogin, background_tasks: BackgroundTasks):
     """
     Parent login endpoint
     
@@ -105,40 +108,8 @@ async def login(credentials: ParentLogin):
         role="parent"
     )
     
-    # Auto-join parent to default community
-    try:
-        # Get or create default community
-        default_community = db_manager.communities.find_one({"name": "Parent Support Community"})
-        
-        if not default_community:
-            # Create default community
-            default_community = {
-                "_id": str(ObjectId()),
-                "name": "Parent Support Community",
-                "description": "A safe space for parents to connect, share experiences, and support each other on their journey.",
-                "created_by": "system",
-                "member_ids": [],
-                "is_active": True,
-                "created_at": datetime.now(timezone.utc),
-                "updated_at": datetime.now(timezone.utc)
-            }
-            db_manager.communities.insert_one(default_community)
-        
-        community_id = str(default_community["_id"])
-        member_ids = default_community.get("member_ids", [])
-        
-        # Add parent to community if not already a member
-        if parent_id not in member_ids:
-            db_manager.communities.update_one(
-                {"_id": community_id},
-                {
-                    "$push": {"member_ids": parent_id},
-                    "$set": {"updated_at": datetime.now(timezone.utc)}
-                }
-            )
-    except Exception as e:
-        # Log error but don't fail login
-        print(f"Warning: Failed to auto-join community: {str(e)}")
+    # Auto-join parent to default community off the login critical path
+    background_tasks.add_task(join_default_community, parent_id, parent_data.get("name"))
     
     return TokenResponse(
         access_token=access_token,
@@ -194,7 +165,11 @@ async def update_profile(
         if update_data.address:
             update_fields["address"] = update_data.address
         if update_data.avatar:
-            update_fields["avatar"] = update_data.avatar
+            # Inline images are stored once; the record keeps the hash URL
+            try:
+                update_fields["avatar"] = store_avatar(update_data.avatar)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid avatar image")
         if update_data.relationship:
             update_fields["relationship"] = update_data.relationship
             
@@ -205,18 +180,25 @@ async def update_profile(
         db_set = update_fields 
         db_push = {}
         
-        # Handle document upload if present
-        if update_data.document and update_data.documentName:
+        # Handle document upload if present: preferably a finished resumable
+        # upload (documentBlobId), else legacy inline base64
+        if update_data.documentBlobId or (update_data.document and update_data.documentName):
             print("[PROFILE] Processing document upload...")
             try:
-                new_doc = {
+                # Bytes go to the blob store; records keep only the reference
+                doc_fields = {
                     "id": str(ObjectId()),
-                    "name": update_data.documentName,
-                    "content": update_data.document, # Store base64 content
                     "uploaded_at": datetime.now(timezone.utc),
                     "uploaded_by": current_parent.name,
                     "child_id": current_parent.childId
                 }
+                if update_data.documentBlobId:
+                    new_doc = stored_ref(update_data.documentBlobId, update_data.documentName, **doc_fields)
+                    if new_doc is None:
+                        raise ValueError(f"Unknown blob {update_data.documentBlobId}")
+                else:
+                    data, content_type = decode_upload(update_data.document)
+                    new_doc = document_ref(data, update_data.documentName, content_type, **doc_fields)
                 
                 db_push["documents"] = new_doc
                 print("[PROFILE] Document processed successfully")
@@ -228,13 +210,13 @@ async def update_profile(
                         {"_id": current_parent.childId},
                         {"$push": {"documents": {
                             **new_doc,
-                            "title": update_data.documentName,
+                            "title": new_doc["name"],
                             "type": "Parent Upload",
                             "category": "Parent Documents",
                             "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
                         }}}
                     )
-            except Exception as doc_error:
+            except ValueError as doc_error:
                 print(f"[ERROR] Document processing failed: {str(doc_error)}")
                 raise HTTPException(status_code=400, detail="Invalid document format")
         
@@ -269,6 +251,9 @@ async def update_profile(
                 detail="Parent not found"
             )
             
+        if "name" in update_fields:
+            sync_member_name(parent_id, update_fields["name"])
+            
         # Fetch updated parent using the successful filter_query
         updated_parent_data = db_manager.parents.find_one(filter_query)
         
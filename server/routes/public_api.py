@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from database import db_manager
+from utils.admin_stats import adjust_stats
 from typing import List
 from datetime import datetime, timezone
 from models.parent import ParentCreate, ParentResponse
@@ -124,6 +125,7 @@ async def signup(parent: ParentCreate):
     
     # Save to database
     db_manager.parents.insert_one(parent_data)
+    adjust_stats(parent_count=1)
     print(f"[PUBLIC-SIGNUP SUCCESS] Created parent: {parent.email} (ID: {parent_id})")
     
     return ParentResponse(
@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from database import db_manager
-from models.roadmap import RoadmapCreate, RoadmapUpdate, RoadmapResponse
+from models.roadmap import (
+    RoadmapCreate, RoadmapUpdate, RoadmapResponse,
+    MilestoneCreate, MilestoneToggle, MilestoneReorder, MilestoneUpdateResponse
+)
 from middleware.auth_middleware import get_current_user
+from utils.forecast import refresh_forecasts, refresh_child_forecasts
 
 router = APIRouter(prefix="/api/roadmap", tags=["Roadmap Editor"])
 
 @router.post("", response_model=RoadmapResponse)
-async def create_roadmap_goal(roadmap: RoadmapCreate, current_user: dict = Depends(get_current_user)):
+async def create_roadmap_goal(
+    roadmap: RoadmapCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
     """Create a new roadmap goal with milestones"""
     db = db_manager.get_database()
     roadmap_data = roadmap.dict()
@@ -33,6 +42,7 @@ async def create_roadmap_goal(roadmap: RoadmapCreate, current_user: dict = Depen
     
     if created:
         created["_id"] = str(created["_id"])
+        background_tasks.add_task(refresh_child_forecasts, created["childId"])
     return created
 
 @router.get("/child/{child_id}", response_model=List[RoadmapResponse])
@@ -45,7 +55,12 @@ async def get_child_roadmap(child_id: str, current_user: dict = Depends(get_curr
     return items
 
 @router.put("/{roadmap_id}", response_model=RoadmapResponse)
-async def update_roadmap_goal(roadmap_id: str, updates: RoadmapUpdate, current_user: dict = Depends(get_current_user)):
+async def update_roadmap_goal(
+    roadmap_id: str,
+    updates: RoadmapUpdate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
     """Update a roadmap goal or milestone"""
     db = db_manager.get_database()
     if not ObjectId.is_valid(roadmap_id):
@@ -70,8 +85,216 @@ async def update_roadmap_goal(roadmap_id: str, updates: RoadmapUpdate, current_u
     updated = db.roadmaps.find_one({"_id": ObjectId(roadmap_id)})
     if updated:
         updated["_id"] = str(updated["_id"])
+        background_tasks.add_task(refresh_child_forecasts, updated["childId"])
     return updated
 
+@router.post("/forecast/refresh")
+async def refresh_roadmap_forecasts(
+    child_id: Optional[str] = Query(None, description="Limit to one child's roadmap"),
+    force: bool = Query(False, description="Recompute even if inputs are unchanged"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Recompute outcome forecasts for goals whose milestones or sessions changed"""
+    if current_user["role"] not in ["admin", "therapist"]:
+        raise HTTPException(status_code=403, detail="Not authorized to refresh forecasts")
+    return refresh_forecasts(child_id, force=force)
+
+# =======================
+# Milestone sub-resources
+# =======================
+# Each endpoint below is a single pipeline update: the milestone change and the
+# recomputed progress/status are applied in one atomic statement, so concurrent
+# checkbox clicks on the same goal never overwrite each other's milestones.
+
+def _roadmap_oid(roadmap_id: str) -> ObjectId:
+    if not ObjectId.is_valid(roadmap_id):
+        raise HTTPException(status_code=400, detail="Invalid roadmap ID")
+    return ObjectId(roadmap_id)
+
+
+def _progress_stages(now: datetime) -> list:
+    """
+    Pipeline stages deriving progress and status from the milestones array
+
+    A goal left with no milestones (the last one was removed) drops back
+    to 0% rather than keeping the progress of the milestones it had.
+    """
+    milestones = {"$ifNull": ["$milestones", []]}
+    total = {"$size": milestones}
+    done = {"$size": {"$filter": {"input": milestones, "as": "m", "cond": {"$eq": ["$$m.completed", True]}}}}
+    return [
+        {"$set": {
+            "progress": {"$cond": [
+                {"$gt": [total, 0]},
+                {"$toInt": {"$round": [{"$multiply": [{"$divide": [done, total]}, 100]}, 0]}},
+                0
+            ]},
+            "updated_at": now
+        }},
+        {"$set": {
+            "status": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$progress", 100]}, "then": "completed"},
+                    {"case": {"$eq": ["$status", "completed"]}, "then": "in-progress"}
+                ],
+                "default": {"$ifNull": ["$status", "in-progress"]}
+            }}
+        }}
+    ]
+
+
+def _apply_milestone_update(
+    filter_query: dict,
+    pipeline: list,
+    background_tasks: BackgroundTasks,
+    milestone_id: Optional[str] = None
+) -> MilestoneUpdateResponse:
+    """Run a milestone pipeline update and return only the fields that changed"""
+    projection = {"childId": 1, "progress": 1, "status": 1, "updated_at": 1}
+    if milestone_id:
+        projection["milestones"] = {"$elemMatch": {"id": milestone_id}}
+
+    updated = db_manager.roadmaps.find_one_and_update(
+        filter_query,
+        pipeline,
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Roadmap goal or milestone not found")
+
+    background_tasks.add_task(refresh_child_forecasts, updated["childId"])
+    milestone = (updated.get("milestones") or [None])[0] if milestone_id else None
+    return MilestoneUpdateResponse(
+        id=str(updated["_id"]),
+        progress=updated.get("progress", 0),
+        status=updated.get("status", "in-progress"),
+        milestone=milestone,
+        updated_at=updated["updated_at"]
+    )
+
+
+@router.post("/{roadmap_id}/milestones", response_model=MilestoneUpdateResponse, status_code=status.HTTP_201_CREATED)
+async def add_milestone(
+    roadmap_id: str,
+    milestone: MilestoneCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Append a milestone to a goal"""
+    oid = _roadmap_oid(roadmap_id)
+    now = datetime.now(timezone.utc)
+    new_milestone = {
+        "id": milestone.id or str(ObjectId()),
+        "title": milestone.title,
+        "completed": False,
+        "date": None
+    }
+
+    pipeline = [
+        {"$set": {"milestones": {"$concatArrays": [
+            {"$ifNull": ["$milestones", []]},
+            [{"$literal": new_milestone}]
+        ]}}},
+        *_progress_stages(now)
+    ]
+    # Reject duplicate IDs in the filter so the append stays a single statement
+    return _apply_milestone_update(
+        {"_id": oid, "milestones.id": {"$ne": new_milestone["id"]}},
+        pipeline,
+        background_tasks,
+        new_milestone["id"]
+    )
+
+
+@router.patch("/{roadmap_id}/milestones/{milestone_id}/toggle", response_model=MilestoneUpdateResponse)
+async def toggle_milestone(
+    roadmap_id: str,
+    milestone_id: str,
+    background_tasks: BackgroundTasks,
+    toggle: Optional[MilestoneToggle] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Mark a milestone complete/incomplete (flips it when no value is given)"""
+    oid = _roadmap_oid(roadmap_id)
+    now = datetime.now(timezone.utc)
+    today = now.strftime("%Y-%m-%d")
+
+    if toggle is None or toggle.completed is None:
+        completed_expr = {"$not": [{"$eq": ["$$m.completed", True]}]}
+    else:
+        completed_expr = {"$literal": toggle.completed}
+
+    pipeline = [
+        {"$set": {"milestones": {"$map": {
+            "input": "$milestones",
+            "as": "m",
+            "in": {"$cond": [
+                {"$eq": ["$$m.id", {"$literal": milestone_id}]},
+                {"$mergeObjects": ["$$m", {
+                    "completed": completed_expr,
+                    "date": {"$cond": [completed_expr, {"$literal": today}, None]}
+                }]},
+                "$$m"
+            ]}
+        }}}},
+        *_progress_stages(now)
+    ]
+    return _apply_milestone_update({"_id": oid, "milestones.id": milestone_id}, pipeline, background_tasks, milestone_id)
+
+
+@router.delete("/{roadmap_id}/milestones/{milestone_id}", response_model=MilestoneUpdateResponse)
+async def remove_milestone(
+    roadmap_id: str,
+    milestone_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Remove a single milestone from a goal"""
+    oid = _roadmap_oid(roadmap_id)
+    pipeline = [
+        {"$set": {"milestones": {"$filter": {
+            "input": "$milestones",
+            "as": "m",
+            "cond": {"$ne": ["$$m.id", {"$literal": milestone_id}]}
+        }}}},
+        *_progress_stages(datetime.now(timezone.utc))
+    ]
+    return _apply_milestone_update({"_id": oid, "milestones.id": milestone_id}, pipeline, background_tasks)
+
+
+@router.put("/{roadmap_id}/milestones/order", response_model=MilestoneUpdateResponse)
+async def reorder_milestones(
+    roadmap_id: str,
+    reorder: MilestoneReorder,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Reorder milestones; the order must list every existing milestone ID exactly once"""
+    oid = _roadmap_oid(roadmap_id)
+    if len(set(reorder.order)) != len(reorder.order):
+        raise HTTPException(status_code=400, detail="Duplicate milestone IDs in order")
+
+    pipeline = [
+        {"$set": {"milestones": {"$map": {
+            "input": {"$literal": reorder.order},
+            "as": "mid",
+            "in": {"$arrayElemAt": [
+                {"$filter": {"input": "$milestones", "as": "m", "cond": {"$eq": ["$$m.id", "$$mid"]}}},
+                0
+            ]}
+        }}}},
+        *_progress_stages(datetime.now(timezone.utc))
+    ]
+    # Only match when the submitted IDs are exactly the stored set
+    filter_query = {
+        "_id": oid,
+        "milestones": {"$size": len(reorder.order)},
+        "milestones.id": {"$all": reorder.order}
+    }
+    return _apply_milestone_update(filter_query, pipeline, background_tasks)
+
+
 @router.delete("/{roadmap_id}")
 async def delete_roadmap_goal(roadmap_id: str, current_user: dict = Depends(get_current_user)):
     """Remove a goal from the roadmap"""
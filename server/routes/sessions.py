@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from database import db_manager
 from models.session import SessionCreate
 from middleware.auth_middleware import get_current_active_doctor, get_current_user
 from models.doctor import DoctorResponse
 from datetime import datetime, timezone
 from bson import ObjectId
+from utils.forecast import refresh_child_forecasts
 
 router = APIRouter(prefix="/api/sessions", tags=["Therapy Sessions"])
 
@@ -37,6 +38,7 @@ async def list_all_sessions(current_user: dict = Depends(get_current_user)):
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_session(
     session: SessionCreate,
+    background_tasks: BackgroundTasks,
     current_doctor: DoctorResponse = Depends(get_current_active_doctor)
 ):
     """
@@ -63,6 +65,9 @@ async def create_session(
         # Prepare response
         session_data["_id"] = str(result.inserted_id)
         session_data["id"] = session_data["_id"]
+
+        # New engagement data feeds the child's roadmap forecasts
+        background_tasks.add_task(refresh_child_forecasts, session_data["childId"])
         return session_data
         
     except Exception as e:
@@ -0,0 +1,147 @@
+"""
+Resumable Upload API
+  POST /api/uploads              open a session (filename, size, content_type)
+  PUT  /api/uploads/{id}         send bytes; Content-Range: bytes <start>-<end>/<size>
+  GET  /api/uploads/{id}         how many bytes were committed (resume point)
+The PUT body is raw bytes (no base64, no JSON) and is streamed into the
+document store chunk by chunk. The response to the part carrying the last
+byte includes the stored document reference, ready to attach to a record.
+"""
+import asyncio
+import re
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
+
+from config import settings
+from middleware.auth_middleware import get_current_user
+from models.upload import UploadCreate, UploadStatus
+from utils.uploads import CHUNK_SIZE, PART_SIZE, commit_chunk, create_session, finalize, get_session, purge_stale_uploads
+
+
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+# How long a request waits for a finalize running in another request
+FINALIZE_WAIT_SECONDS = 30
+
+
+def _status(session: dict) -> UploadStatus:
+    return UploadStatus(
+        upload_id=str(session["_id"]),
+        filename=session["filename"],
+        size=session["size"],
+        received=session["received"],
+        chunk_size=CHUNK_SIZE,
+        part_size=PART_SIZE,
+        complete=session["status"] == "complete",
+        deduplicated=session.get("deduplicated", False),
+        document=session.get("document")
+    )
+
+
+def _session_or_404(upload_id: str, current_user: dict) -> dict:
+    session = get_session(upload_id, current_user["id"])
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+async def _finalize(session_id) -> dict:
+    """Finalize off the event loop (it hashes the whole file)"""
+    session = await asyncio.to_thread(finalize, session_id)
+    # Another request holds the claim: wait for it so the client does not spin
+    waited = 0.0
+    while session["status"] != "complete" and waited < FINALIZE_WAIT_SECONDS:
+        await asyncio.sleep(0.5)
+        waited += 0.5
+        session = await asyncio.to_thread(finalize, session_id)
+    return session
+
+
+@router.post("", response_model=UploadStatus, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    body: UploadCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Open a resumable upload session"""
+    if body.size > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB upload limit"
+        )
+    session = create_session(current_user["id"], body.filename, body.size, body.content_type)
+    background_tasks.add_task(purge_stale_uploads)
+    print(f"[UPLOADS] {current_user['id']} opened upload {session['_id']} ({body.size} bytes)")
+    return _status(session)
+
+
+@router.get("/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Upload progress; an interrupted client resumes from "received" """
+    return _status(_session_or_404(upload_id, current_user))
+
+
+@router.put("/{upload_id}", response_model=UploadStatus)
+async def upload_part(
+    upload_id: str,
+    request: Request,
+    content_range: Optional[str] = Header(None, alias="Content-Range"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Append bytes to an upload
+
+    The part may start at or before the committed offset (bytes already
+    held are skipped, so retries are safe) but not after it. Whole chunks
+    are committed as they stream in; a trailing partial chunk is only kept
+    if it ends the file, so the client resumes from "received".
+    """
+    session = _session_or_404(upload_id, current_user)
+    size = session["size"]
+    if session["status"] == "complete":
+        return _status(session)
+    if session["received"] == size:
+        # Every byte arrived; finalizing is running elsewhere or was interrupted
+        return _status(await _finalize(session["_id"]))
+
+    match = _CONTENT_RANGE.match((content_range or "").strip())
+    if not match or int(match.group(3)) != size or int(match.group(1)) > int(match.group(2)):
+        raise HTTPException(status_code=400, detail=f"Content-Range must be 'bytes <start>-<end>/{size}'")
+    start, end = int(match.group(1)), int(match.group(2))
+    if end >= size:
+        raise HTTPException(status_code=400, detail="Content-Range extends past the declared size")
+
+    offset = session["received"]
+    if start > offset:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Upload resumes at byte {offset}")
+
+    skip = offset - start
+    buffer = bytearray()
+    async for piece in request.stream():
+        if skip:
+            dropped = min(skip, len(piece))
+            piece, skip = piece[dropped:], skip - dropped
+        buffer += piece
+        if offset + len(buffer) > size:
+            raise HTTPException(status_code=400, detail="Body is larger than the declared size")
+        while len(buffer) >= CHUNK_SIZE:
+            if not commit_chunk(session, offset, bytes(buffer[:CHUNK_SIZE])):
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload was advanced by another request")
+            del buffer[:CHUNK_SIZE]
+            offset += CHUNK_SIZE
+    if buffer and offset + len(buffer) == size:
+        if not commit_chunk(session, offset, bytes(buffer)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload was advanced by another request")
+        offset = size
+
+    if offset == size:
+        session = await _finalize(session["_id"])
+        if session["status"] != "complete":
+            return _status(session)
+        print(f"[UPLOADS] Upload {upload_id} complete: {session['document']['blob_id'][:12]}"
+              f"{' (deduplicated)' if session.get('deduplicated') else ''}")
+    else:
+        session["received"] = offset
+    return _status(session)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from typing import List, Optional
 from database import db_manager
 from models.doctor import DoctorCreate, DoctorResponse
@@ -11,64 +11,50 @@ import uuid
 from bson import ObjectId
 import re
 from utils.email import send_invitation_email
+from utils.membership import sync_member_name
+from utils.admin_stats import get_stats, refresh_stats_in_background, adjust_stats, is_assigned
+from utils.avatars import store_avatar, listing_avatar
+from utils.ids import allocate_ids
+from utils.caseload import assign_therapist, unassign_therapist, adjust_caseloads, reassign_caseload
+from utils.events import event_broker, user_channel
+from utils.onboarding import BulkImport, detect_format, parse_rows
 from fastapi import BackgroundTasks
+from fastapi.responses import StreamingResponse
+import json
 from config import settings
 
 router = APIRouter(prefix="/api/admin/users", tags=["Admin User Management"])
 
 def get_next_id(collection, prefix: str) -> str:
     """
-    Find the next available ID for a given prefix (e.g., TH-1001)
+    Reserve the next ID for a given prefix (e.g., TH-1001)
     """
-    # Regex to find IDs starting with PREFIX-
-    pattern = f"^{prefix}-\d+$"
-    docs = list(collection.find({"_id": {"$regex": pattern}}))
-    
-    max_num = 1000
-    for doc in docs:
-        try:
-            num = int(doc["_id"].split("-")[1])
-            if num > max_num:
-                max_num = num
-        except (ValueError, IndexError):
-            continue
-            
-    return f"{prefix}-{max_num + 1}"
+    return allocate_ids(collection, prefix, 1)[0]
 
 @router.get("/stats")
-async def get_admin_stats(current_admin: AdminResponse = Depends(get_current_admin)):
+async def get_admin_stats(
+    background_tasks: BackgroundTasks,
+    current_admin: AdminResponse = Depends(get_current_admin)
+):
     """
     Get global statistics for the admin dashboard.
+    Served from maintained counters; a stale snapshot is returned at once
+    and recounted in the background.
     """
-    therapist_count = db_manager.doctors.count_documents({})
-    parent_count = db_manager.parents.count_documents({})
-    child_count = db_manager.children.count_documents({})
-    
-    # Ongoing therapies: Children who have at least one therapist assigned
-    ongoing_therapies = db_manager.children.count_documents({
-        "$or": [
-            {"therapistId": {"$ne": None, "$exists": True}},
-            {"therapistIds": {"$exists": True, "$not": {"$size": 0}}}
-        ]
-    })
+    stats, is_stale = get_stats()
+    if is_stale:
+        background_tasks.add_task(refresh_stats_in_background)
     
     # Pending assignments: Children with no therapist assigned + Pending appointment requests
-    non_assigned_kids = db_manager.children.count_documents({
-        "$and": [
-            {"$or": [{"therapistId": None}, {"therapistId": {"$exists": False}}]},
-            {"$or": [{"therapistIds": None}, {"therapistIds": {"$exists": False}}, {"therapistIds": {"$size": 0}}]}
-        ]
-    })
-    
-    pending_appointments = db_manager.appointments.count_documents({"status": "pending"})
-    pending_assignments = non_assigned_kids + pending_appointments
+    non_assigned_kids = max(stats["child_count"] - stats["ongoing_therapies"], 0)
+    pending_assignments = non_assigned_kids + stats["pending_appointments"]
     
     return {
-        "therapist_count": therapist_count,
-        "parent_count": parent_count,
-        "child_count": child_count,
-        "active_children": child_count, # Keeping for backward compatibility
-        "ongoing_therapies": ongoing_therapies,
+        "therapist_count": stats["therapist_count"],
+        "parent_count": stats["parent_count"],
+        "child_count": stats["child_count"],
+        "active_children": stats["child_count"], # Keeping for backward compatibility
+        "ongoing_therapies": stats["ongoing_therapies"],
         "pending_assignments": pending_assignments
     }
 
@@ -77,7 +63,6 @@ async def get_admin_stats(current_admin: AdminResponse = Depends(get_current_adm
 async def create_therapist(
     request: Request,
     therapist: DoctorCreate,
-    background_tasks: BackgroundTasks,
     current_admin: AdminResponse = Depends(get_current_admin)
 ):
     """
@@ -107,6 +92,11 @@ async def create_therapist(
     # Patient assignment logic removed as requested.
     assigned_child_id = None
 
+    try:
+        profile_photo = store_avatar(therapist.profile_photo)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid profile photo")
+
     doctor_data = {
         "_id": doctor_id,
         "name": therapist.name,
@@ -117,7 +107,7 @@ async def create_therapist(
         "experience_years": therapist.experience_years,
         "assigned_children": 1 if assigned_child_id else 0,
         "phone": therapist.phone,
-        "profile_photo": therapist.profile_photo,
+        "profile_photo": profile_photo,
         "license_number": therapist.license_number,
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc),
@@ -126,11 +116,11 @@ async def create_therapist(
     }
     
     db_manager.doctors.insert_one(doctor_data)
+    adjust_stats(therapist_count=1)
     
-    # Send invitation email if it's an invitation flow
+    # Queue the invitation email (delivered by the mail worker)
     if invitation_link:
-        background_tasks.add_task(
-            send_invitation_email,
+        send_invitation_email(
             email=therapist.email,
             name=therapist.name,
             role="therapist",
@@ -157,7 +147,6 @@ async def create_therapist(
 async def create_parent(
     request: Request,
     parent: ParentCreate,
-    background_tasks: BackgroundTasks,
     current_admin: AdminResponse = Depends(get_current_admin)
 ):
     """
@@ -202,11 +191,11 @@ async def create_parent(
     }
     
     db_manager.parents.insert_one(parent_data)
+    adjust_stats(parent_count=1)
     
-    # Send invitation email if it's an invitation flow
+    # Queue the invitation email (delivered by the mail worker)
     if invitation_link:
-        background_tasks.add_task(
-            send_invitation_email,
+        send_invitation_email(
             email=parent.email,
             name=parent.name,
             role="parent",
@@ -227,6 +216,39 @@ async def create_parent(
         invitation_link=invitation_link
     )
 
+@router.post("/bulk")
+async def bulk_import_users(
+    request: Request,
+    type: Optional[str] = Query(None, description="Row type when the file has no type column: therapist, parent or child"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults to the Content-Type"),
+    dry_run: bool = Query(False, description="Validate only; nothing is written"),
+    current_admin: AdminResponse = Depends(get_current_admin)
+):
+    """
+    Onboard therapists, parents and children from a CSV or NDJSON body.
+    Columns are the fields of the single-create routes plus "type"; a child
+    names its parent by parent_id or parent_email (an existing parent or one
+    earlier in the file). Users without a password are invited by email.
+    Streams an NDJSON report: one line per row, then a summary line.
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.BULK_IMPORT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Import files are limited to {settings.BULK_IMPORT_MAX_BYTES} bytes")
+    if not body.strip():
+        raise HTTPException(status_code=400, detail="Import file is empty")
+
+    fmt = format or detect_format(request.headers.get("content-type"), bytes(body))
+    print(f"[ADMIN] Admin {current_admin.email} is importing users ({fmt}, {len(body)} bytes, dry_run={dry_run})")
+    run = BulkImport(default_type=type, dry_run=dry_run)
+
+    async def report():
+        async for entry in run.run(parse_rows(bytes(body), fmt)):
+            yield json.dumps(entry, default=str) + "\n"
+
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
 @router.delete("/therapist/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_therapist(
     user_id: str,
@@ -238,6 +260,7 @@ async def delete_therapist(
     result = db_manager.doctors.delete_one({"_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Therapist not found")
+    adjust_stats(therapist_count=-1)
     return None
 
 @router.delete("/parent/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -251,6 +274,7 @@ async def delete_parent(
     result = db_manager.parents.delete_one({"_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Parent not found")
+    adjust_stats(parent_count=-1)
     return None
     
 @router.patch("/{role}/{user_id}/status")
@@ -300,6 +324,11 @@ async def update_therapist(
     for field in allowed_fields:
         if field in therapist_update and therapist_update[field] is not None:
             update_fields[field] = therapist_update[field]
+    if "profile_photo" in update_fields:
+        try:
+            update_fields["profile_photo"] = store_avatar(update_fields["profile_photo"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid profile photo")
     
     # Check if email is being changed and if it's already taken
     if "email" in update_fields and update_fields["email"] != therapist["email"]:
@@ -349,6 +378,8 @@ async def update_parent(
             {"_id": user_id},
             {"$set": update_fields}
         )
+        if "name" in update_fields:
+            sync_member_name(user_id, update_fields["name"])
     
     return {"status": "success", "message": "Parent updated successfully"}
 
@@ -398,55 +429,180 @@ async def reset_password(
         "message": f"Password reset successfully for {user['name']}"
     }
 
-from models.child import ChildCreate, ChildResponse
+from models.child import ChildCreate, ChildResponse, ChildrenListResponse, CaseloadReassign
+from models.upload import ChildDocumentAttach
+from utils.blobs import stored_ref
 
-@router.get("/children", response_model=List[ChildResponse])
-async def list_children(current_user: dict = Depends(get_current_user)):
-    """
-    List all children with full details
+def _child_response(c: dict) -> ChildResponse:
+    """Build a ChildResponse from a children document (any projection)"""
+    # Reconcile therapistId and therapistIds
+    t_id = c.get("therapistId")
+    t_ids = c.get("therapistIds", [])
+    if not isinstance(t_ids, list): t_ids = []
+    
+    # Backward compatibility: ensure primary is in the list
+    if t_id and t_id not in t_ids:
+        t_ids.append(t_id)
+        
+    return ChildResponse(
+        id=str(c["_id"]),
+        name=c["name"],
+        age=c.get("age", 0),
+        gender=c.get("gender", "Unknown"),
+        condition=c.get("condition", "None"),
+        school_name=c.get("school_name"),
+        parent_id=c.get("parent_id", ""),
+        therapistId=t_id,
+        therapistIds=t_ids,
+        photoUrl=c.get("photoUrl"),
+        program=c.get("program", []),
+        currentMood=c.get("currentMood"),
+        moodContext=c.get("moodContext"),
+        streak=c.get("streak", 0),
+        schoolReadinessScore=c.get("schoolReadinessScore", 0),
+        status=c.get("status", "active"),
+        documents=c.get("documents", []),
+        is_active=c.get("is_active", True),
+        gamesUnlocked=c.get("gamesUnlocked", False),
+        unlockedGames=c.get("unlockedGames", []),
+        therapy_start_date=c.get("therapy_start_date") or c.get("enrollmentDate") or (c.get("created_at").isoformat() if hasattr(c.get("created_at"), 'isoformat') else str(c.get("created_at")) if c.get("created_at") else None),
+        therapy_type=c.get("therapy_type") or (c.get("program")[0] if c.get("program") and isinstance(c.get("program"), list) else "Speech Therapy"),
+        therapy_start_dates=c.get("therapy_start_dates", {}),
+        created_at=c.get("created_at", datetime.now(timezone.utc))
+    )
+
+@router.get("/children", response_model=ChildrenListResponse)
+async def list_children(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    therapist_id: Optional[str] = Query(None, description="Only children assigned to this therapist"),
+    mine: bool = Query(False, description="Therapists: only my caseload"),
+    parent_id: Optional[str] = Query(None, description="Only this parent's children"),
+    child_status: Optional[str] = Query(None, alias="status", description="Filter by status (e.g. active)"),
+    include_documents: bool = Query(False, description="Include legacy inline document contents; references are always returned"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    children_docs = list(db_manager.children.find())
-    print(f"[DEBUG] Fetched {len(children_docs)} children from database")
+    List children, paginated and filtered
     
-    response_list = []
-    for c in children_docs:
-        # Reconcile therapistId and therapistIds
-        t_id = c.get("therapistId")
-        t_ids = c.get("therapistIds", [])
-        if not isinstance(t_ids, list): t_ids = []
-        
-        # Backward compatibility: ensure primary is in the list
-        if t_id and t_id not in t_ids:
-            t_ids.append(t_id)
-            
-        response_list.append(ChildResponse(
-            id=str(c["_id"]),
-            name=c["name"],
-            age=c.get("age", 0),
-            gender=c.get("gender", "Unknown"),
-            condition=c.get("condition", "None"),
-            school_name=c.get("school_name"),
-            parent_id=c.get("parent_id", ""),
-            therapistId=t_id,
-            therapistIds=t_ids,
-            photoUrl=c.get("photoUrl"),
-            program=c.get("program", []),
-            currentMood=c.get("currentMood"),
-            moodContext=c.get("moodContext"),
-            streak=c.get("streak", 0),
-            schoolReadinessScore=c.get("schoolReadinessScore", 0),
-            status=c.get("status", "active"),
-            documents=c.get("documents", []),
-            is_active=c.get("is_active", True),
-            gamesUnlocked=c.get("gamesUnlocked", False),
-            unlockedGames=c.get("unlockedGames", []),
-            therapy_start_date=c.get("therapy_start_date") or c.get("enrollmentDate") or (c.get("created_at").isoformat() if hasattr(c.get("created_at"), 'isoformat') else str(c.get("created_at")) if c.get("created_at") else None),
-            therapy_type=c.get("therapy_type") or (c.get("program")[0] if c.get("program") and isinstance(c.get("program"), list) else "Speech Therapy"),
-            therapy_start_dates=c.get("therapy_start_dates", {}),
-            created_at=c.get("created_at", datetime.now(timezone.utc))
-        ))
-    
-    return response_list
+    Caseload filters use the multikey therapistIds index. Documents are
+    blob-store references (download via their url); any inline contents
+    not yet migrated are left out unless include_documents is set.
+    """
+    query = {}
+    if mine and current_user["role"] == "therapist":
+        therapist_id = current_user["id"]
+    if therapist_id:
+        query["therapistIds"] = therapist_id
+    if parent_id:
+        query["parent_id"] = parent_id
+    if child_status:
+        # Records without a status are treated as active
+        query["status"] = {"$in": [child_status, None]} if child_status == "active" else child_status
+    
+    projection = None if include_documents else {"documents.content": 0}
+    children_docs = list(
+        db_manager.children.find(query, projection).sort("_id", 1).skip(offset).limit(limit + 1)
+    )
+    has_more = len(children_docs) > limit
+    # The last page already tells us the total; otherwise count (indexed filters)
+    if not has_more and children_docs:
+        total = offset + len(children_docs)
+    else:
+        total = db_manager.children.count_documents(query)
+    
+    return ChildrenListResponse(
+        children=[_child_response(c) for c in children_docs[:limit]],
+        total=total,
+        limit=limit,
+        offset=offset,
+        has_more=has_more
+    )
+
+@router.get("/child/{child_id}/documents", response_model=List[dict])
+async def get_child_documents(
+    child_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Document references for one child (bytes stream from /api/documents)
+    """
+    child = db_manager.children.find_one({"_id": child_id}, {"documents": 1})
+    if not child and ObjectId.is_valid(child_id):
+        child = db_manager.children.find_one({"_id": ObjectId(child_id)}, {"documents": 1})
+    if not child:
+        raise HTTPException(status_code=404, detail="Child not found")
+    return child.get("documents", [])
+
+def _require_child_access(child_id: str, current_user: dict):
+    """
+    Allow admins, the child's parent and the child's therapists
+
+    Raises:
+        HTTPException: 404 if the child does not exist, 403 if the caller
+            is not related to it
+    """
+    access = {
+        "admin": {},
+        "therapist": {"therapistIds": current_user["id"]},
+        "parent": {"parent_id": current_user["id"]}
+    }.get(current_user["role"])
+    child_filter = {"_id": {"$in": _child_keys(child_id)}}
+    if access is not None and db_manager.children.count_documents({**child_filter, **access}, limit=1):
+        return
+    if not db_manager.children.count_documents(child_filter, limit=1):
+        raise HTTPException(status_code=404, detail="Child not found")
+    raise HTTPException(status_code=403, detail="Not authorized to change this child's documents")
+
+@router.post("/child/{child_id}/documents", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def attach_child_document(
+    child_id: str,
+    attach: ChildDocumentAttach,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Attach an uploaded document (see /api/uploads) to a child's record
+    """
+    _require_child_access(child_id, current_user)
+    doc = stored_ref(
+        attach.blob_id,
+        attach.title,
+        id=str(ObjectId()),
+        child_id=child_id,
+        title=attach.title,
+        category=attach.category or "Clinical",
+        type=attach.type or ("Parent Upload" if current_user["role"] == "parent" else "Therapist Upload"),
+        date=attach.date or datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        uploaded_at=datetime.now(timezone.utc),
+        uploaded_by=current_user["name"]
+    )
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Uploaded document not found")
+    doc["title"] = doc["title"] or doc["name"]
+    result = db_manager.children.update_one({"_id": {"$in": _child_keys(child_id)}}, {"$push": {"documents": doc}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Child not found")
+    return doc
+
+@router.delete("/child/{child_id}/documents/{doc_id}")
+async def remove_child_document(
+    child_id: str,
+    doc_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Remove a document reference from a child (the shared blob is kept)
+    """
+    _require_child_access(child_id, current_user)
+    result = db_manager.children.update_one(
+        {"_id": {"$in": _child_keys(child_id)}},
+        {"$pull": {"documents": {"id": doc_id}}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Child not found")
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"status": "success", "message": "Document removed"}
 
 @router.post("/child", response_model=ChildResponse, status_code=status.HTTP_201_CREATED)
 async def create_child(
@@ -487,6 +643,7 @@ async def create_child(
     
     # Insert child
     db_manager.children.insert_one(child_data)
+    adjust_stats(child_count=1)
     
     # Update parent's children_ids
     parent_filter = {"_id": child.parent_id}
@@ -578,10 +735,16 @@ async def delete_child(
         )
         
     # Delete child
-    db_manager.children.delete_one(child_filter)
+    if db_manager.children.delete_one(child_filter).deleted_count:
+        adjust_stats(child_count=-1, ongoing_therapies=-1 if is_assigned(child) else 0)
+        adjust_caseloads({tid: -1 for tid in child.get("therapistIds") or []})
     
     return None
 
+def _child_keys(child_id: str) -> list:
+    """Possible _id values of a child: the string ID, then a legacy ObjectId"""
+    return [child_id] + ([ObjectId(child_id)] if ObjectId.is_valid(child_id) else [])
+
 @router.patch("/child/{child_id}/assign/{therapist_id}")
 async def assign_child_to_therapist(
     child_id: str,
@@ -610,53 +773,25 @@ async def assign_child_to_therapist(
             raise HTTPException(status_code=403, detail="Not authorized")
 
     print(f"[ASSIGN] Assigning {child_id} to {therapist_id}")
-    
-    # Use "none" as a special value to unassign
-    update_val = therapist_id if therapist_id.lower() != "none" else None
-    
-    # 1. Get current state to ensure we don't lose the existing primary therapist
-    child = db_manager.children.find_one({"_id": child_id})
-    if not child and ObjectId.is_valid(child_id):
-        child = db_manager.children.find_one({"_id": ObjectId(child_id)})
-        
-    if not child:
+
+    # Use "none" as a special value: nothing to add, the child keeps its therapists
+    therapist_ids = None
+    if therapist_id.lower() == "none":
+        child = db_manager.children.find_one({"_id": {"$in": _child_keys(child_id)}}, {"therapistIds": 1})
+        if child:
+            therapist_ids = child.get("therapistIds") or []
+    else:
+        for child_key in _child_keys(child_id):
+            therapist_ids = assign_therapist(child_key, therapist_id)
+            if therapist_ids is not None:
+                break
+
+    if therapist_ids is None:
         print(f"[ASSIGN] ERROR: Child {child_id} not found")
         raise HTTPException(status_code=404, detail="Child not found")
-        
-    current_primary = child.get("therapistId")
-    current_ids = child.get("therapistIds", [])
-    if not isinstance(current_ids, list):
-        current_ids = []
-    
-    # Ensure current primary is in the list
-    if current_primary and current_primary not in current_ids:
-        current_ids.append(current_primary)
-    
-    # Add the new therapist
-    current_start_dates = child.get("therapy_start_dates", {})
-    if not isinstance(current_start_dates, dict):
-        current_start_dates = {}
-
-    if update_val and update_val not in current_ids:
-        current_ids.append(update_val)
-        # Set start date for THIS therapist assignment
-        current_start_dates[update_val] = datetime.now(timezone.utc).isoformat()
-        
-    # 2. Update with the full list and set the new one as primary
-    db_manager.children.update_one(
-        {"_id": child["_id"]},
-        {
-            "$set": {
-                "therapistIds": current_ids,
-                "therapistId": update_val if update_val else current_primary,
-                "therapy_start_dates": current_start_dates,
-                "updated_at": datetime.now(timezone.utc)
-            }
-        }
-    )
-    
-    print(f"[ASSIGN] SUCCESS: Child {child_id} now has therapists: {current_ids}")
-    return {"message": "Therapist assigned successfully", "therapistIds": current_ids}
+
+    print(f"[ASSIGN] SUCCESS: Child {child_id} now has therapists: {therapist_ids}")
+    return {"message": "Therapist assigned successfully", "therapistIds": therapist_ids}
 
 @router.delete("/child/{child_id}/assign/{therapist_id}")
 async def unassign_child_from_therapist(
@@ -667,35 +802,49 @@ async def unassign_child_from_therapist(
     """
     Unassign a child from a specific therapist (removes from therapistIds list)
     """
-    # 1. Find the child
-    child = db_manager.children.find_one({"_id": child_id})
-    if not child and ObjectId.is_valid(child_id):
-        child = db_manager.children.find_one({"_id": ObjectId(child_id)})
-        
-    if not child:
+    for child_key in _child_keys(child_id):
+        if unassign_therapist(child_key, therapist_id) is not None:
+            break
+    else:
         raise HTTPException(status_code=404, detail="Child not found")
-
-    # 2. Remove from therapistIds list
-    result = db_manager.children.update_one(
-        {"_id": child["_id"]},
-        {
-            "$pull": {"therapistIds": therapist_id},
-            "$set": {"updated_at": datetime.now(timezone.utc)}
-        }
-    )
-    
-    # 3. If the removed therapist was the primary, update to another one or None
-    if child.get("therapistId") == therapist_id:
-        remaining_therapists = [tid for tid in child.get("therapistIds", []) if tid != therapist_id]
-        new_primary = remaining_therapists[0] if remaining_therapists else None
-        
-        db_manager.children.update_one(
-            {"_id": child["_id"]},
-            {"$set": {"therapistId": new_primary}}
-        )
-        
     return {"message": "Therapist unassigned successfully"}
 
+@router.post("/caseload/reassign")
+async def reassign_children(
+    reassignment: CaseloadReassign,
+    current_admin: AdminResponse = Depends(get_current_admin)
+):
+    """
+    Move a caseload to another therapist: every child of from_therapist_id
+    (optionally only child_ids), or assign the listed children to
+    to_therapist_id. Caseload counts are adjusted in the same step and
+    both therapists are told to reload their caseload.
+    """
+    if not db_manager.doctors.count_documents({"_id": reassignment.to_therapist_id}, limit=1):
+        raise HTTPException(status_code=404, detail="Therapist not found")
+
+    child_keys = None
+    if reassignment.child_ids:
+        child_keys = [key for child_id in reassignment.child_ids for key in _child_keys(child_id)]
+
+    print(f"[ADMIN] Admin {current_admin.email} is reassigning children to {reassignment.to_therapist_id}")
+    result = reassign_caseload(reassignment.to_therapist_id, reassignment.from_therapist_id, child_keys)
+
+    if result["moved"] or result["merged"]:
+        for therapist_id in filter(None, (reassignment.from_therapist_id, reassignment.to_therapist_id)):
+            event_broker.publish(user_channel(therapist_id), "caseload.changed", {
+                "therapist_id": therapist_id,
+                "from_therapist_id": reassignment.from_therapist_id,
+                "to_therapist_id": reassignment.to_therapist_id
+            })
+
+    return {
+        "message": f"Reassigned {result['moved'] + result['merged']} children",
+        "from_therapist_id": reassignment.from_therapist_id,
+        "to_therapist_id": reassignment.to_therapist_id,
+        **result
+    }
+
 
 @router.get("/therapists", response_model=List[DoctorResponse])
 async def list_therapists(current_user: dict = Depends(get_current_user)):
@@ -713,7 +862,8 @@ async def list_therapists(current_user: dict = Depends(get_current_user)):
             experience_years=d.get("experience_years", 0),
             assigned_children=d.get("assigned_children", 0),
             phone=d.get("phone"),
-            profile_photo=d.get("profile_photo"),
+            profile_photo=listing_avatar(d.get("profile_photo")),
+            avatar=listing_avatar(d.get("avatar")),
             license_number=d.get("license_number"),
             is_active=d.get("is_active", True),
             created_at=d.get("created_at"),
@@ -734,7 +884,7 @@ async def list_parents(current_user: dict = Depends(get_current_user)):
             email=p["email"],
             phone=p.get("phone"),
             address=p.get("address"),
-            avatar=p.get("avatar"),
+            avatar=listing_avatar(p.get("avatar")),
             children_ids=p.get("children_ids", []),
             childId=p.get("child_id") or (p.get("children_ids")[0] if p.get("children_ids") else None),
             relationship=p.get("relationship"),
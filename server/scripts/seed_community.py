@@ -26,7 +26,7 @@ def seed_community():
         if existing:
             print("[INFO] Parent Support Community already exists")
             print(f"[INFO] Community ID: {existing['_id']}")
-            print(f"[INFO] Members: {len(existing.get('member_ids', []))}")
+            print(f"[INFO] Members: {existing.get('member_count', 0)}")
             return
         
         # Create default community
@@ -36,7 +36,8 @@ def seed_community():
             "name": "Parent Support Community",
             "description": "A safe space for parents to connect, share experiences, and support each other on their journey. Here you can ask questions, share successes, and find encouragement from other parents who understand what you're going through.",
             "created_by": "system",
-            "member_ids": [],
+            "member_count": 0,
+            "message_count": 1,
             "is_active": True,
             "created_at": datetime.now(timezone.utc),
             "updated_at": datetime.now(timezone.utc)
@@ -0,0 +1,129 @@
+"""
+Admin dashboard statistics
+The counters live in one admin_stats document. Create/delete/assign routes
+adjust them with $inc as they happen; a full single-aggregation recount
+refreshes them in the background once they are older than
+ADMIN_STATS_REFRESH_MINUTES (stale-while-revalidate). Each worker also
+keeps the document in memory for a few seconds.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config import settings
+from database import db_manager
+
+
+STATS_ID = "global"
+COUNTERS = ("therapist_count", "parent_count", "child_count", "ongoing_therapies", "pending_appointments")
+
+# How long a worker serves its in-memory copy before re-reading the document
+LOCAL_CACHE_SECONDS = 5
+
+_cache: Optional[dict] = None
+_cache_loaded_at = 0.0
+_refresh_lock = threading.Lock()
+
+
+def _assigned_expression() -> dict:
+    """True when a child has a primary therapist or a non-empty therapistIds list"""
+    return {"$or": [
+        {"$ne": [{"$ifNull": ["$therapistId", None]}, None]},
+        {"$gt": [{"$cond": [{"$isArray": "$therapistIds"}, {"$size": "$therapistIds"}, 0]}, 0]}
+    ]}
+
+
+def recompute_stats() -> dict:
+    """
+    Recount everything in one aggregation pass and store the result
+
+    Children are scanned once; the other collections are folded in with
+    $unionWith (projected down to a source tag), and one $group counts all.
+    """
+    pipeline = [
+        {"$project": {"_src": "child", "assigned": {"$cond": [_assigned_expression(), 1, 0]}}},
+        {"$unionWith": {"coll": "doctors", "pipeline": [{"$project": {"_src": "therapist"}}]}},
+        {"$unionWith": {"coll": "parents", "pipeline": [{"$project": {"_src": "parent"}}]}},
+        {"$unionWith": {"coll": "appointments", "pipeline": [
+            {"$match": {"status": "pending"}},
+            {"$project": {"_src": "pending_appointment"}}
+        ]}},
+        {"$group": {"_id": "$_src", "n": {"$sum": 1}, "assigned": {"$sum": {"$ifNull": ["$assigned", 0]}}}}
+    ]
+    rows = {row["_id"]: row for row in db_manager.children.aggregate(pipeline)}
+
+    stats = {
+        "therapist_count": rows.get("therapist", {}).get("n", 0),
+        "parent_count": rows.get("parent", {}).get("n", 0),
+        "child_count": rows.get("child", {}).get("n", 0),
+        "ongoing_therapies": rows.get("child", {}).get("assigned", 0),
+        "pending_appointments": rows.get("pending_appointment", {}).get("n", 0),
+        "computed_at": datetime.now(timezone.utc)
+    }
+    db_manager.admin_stats.replace_one({"_id": STATS_ID}, {"_id": STATS_ID, **stats}, upsert=True)
+    _remember({"_id": STATS_ID, **stats})
+    return stats
+
+
+def refresh_stats_in_background():
+    """Background-task entry point; at most one recount runs per worker"""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        recompute_stats()
+    except Exception as e:
+        print(f"[STATS] Background refresh failed: {e}")
+    finally:
+        _refresh_lock.release()
+
+
+def _remember(doc: Optional[dict]):
+    global _cache, _cache_loaded_at
+    _cache = doc
+    _cache_loaded_at = time.monotonic()
+
+
+def get_stats() -> tuple:
+    """
+    Current counters
+
+    Returns:
+        (stats dict, is_stale) where is_stale means the caller should
+        schedule refresh_stats_in_background()
+    """
+    doc = _cache if time.monotonic() - _cache_loaded_at < LOCAL_CACHE_SECONDS else None
+    if doc is None:
+        doc = db_manager.admin_stats.find_one({"_id": STATS_ID})
+        if doc is None:
+            return recompute_stats(), False
+        _remember(doc)
+
+    computed_at = doc.get("computed_at")
+    if computed_at is not None and computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    max_age = timedelta(minutes=settings.ADMIN_STATS_REFRESH_MINUTES)
+    is_stale = computed_at is None or datetime.now(timezone.utc) - computed_at > max_age
+    return doc, is_stale
+
+
+def adjust_stats(**deltas: int):
+    """
+    Apply counter deltas from a write path, e.g. adjust_stats(child_count=1)
+
+    A missing document is left alone; the next read recounts from scratch.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown admin stats counters: {unknown}")
+    db_manager.admin_stats.update_one({"_id": STATS_ID}, {"$inc": deltas})
+    _remember(None)
+
+
+def is_assigned(child: dict) -> bool:
+    """Python twin of _assigned_expression for write paths holding the document"""
+    ids = child.get("therapistIds")
+    return bool(child.get("therapistId")) or (isinstance(ids, list) and len(ids) > 0)
@@ -0,0 +1,146 @@
+"""
+Avatars and profile photos
+Images are stored once in the blob store and user records keep only their
+hash URL (/api/avatars/<sha256>). Thumbnails in AVATAR_SIZES are generated
+at upload time, stored as blobs of their own and listed in the original's
+metadata.variants, so user listings can point at a small variant.
+
+Avatar blobs are flagged (metadata.avatar) because /api/avatars is public:
+<img> tags cannot send tokens, and hashes are unguessable, but documents
+sharing the bucket must never be served through it. Thumbnailing needs
+Pillow; without it every size serves the original.
+"""
+import io
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+from database import db_manager
+from utils.blobs import BUCKET_NAME, decode_upload, find_blob, put_blob
+
+
+# Thumbnail bounding boxes (pixels)
+AVATAR_SIZES = (64, 256)
+# Variant used by user listings
+LIST_SIZE = 64
+AVATAR_PATH = "/api/avatars/"
+
+
+def avatar_url(blob_id: str, size: Optional[int] = None) -> str:
+    return f"{AVATAR_PATH}{blob_id}" + (f"?size={size}" if size else "")
+
+
+def avatar_blob_id(value: Optional[str]) -> Optional[str]:
+    """Blob ID of a hash-URL avatar, None for anything else"""
+    if not value or not value.startswith(AVATAR_PATH):
+        return None
+    return value[len(AVATAR_PATH):].split("?")[0]
+
+
+def listing_avatar(value: Optional[str]) -> Optional[str]:
+    """Avatar URL for user listings: the LIST_SIZE thumbnail of stored images"""
+    blob_id = avatar_blob_id(value)
+    return avatar_url(blob_id, LIST_SIZE) if blob_id else value
+
+
+def _thumbnail(data: bytes, size: int) -> Optional[Tuple[bytes, str]]:
+    """Image scaled to fit size x size, or None if it is already that small"""
+    if Image is None:
+        return None
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    except Exception:
+        return None
+    if max(image.size) <= size:
+        return None
+    image.thumbnail((size, size))
+    out = io.BytesIO()
+    if image.mode in ("RGBA", "LA", "P"):
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue(), "image/png"
+    image.convert("RGB").save(out, format="JPEG", quality=85, optimize=True)
+    return out.getvalue(), "image/jpeg"
+
+
+def _mark_avatar(blob_id: str, variants: Optional[dict] = None):
+    fields = {"metadata.avatar": True}
+    if variants:
+        fields["metadata.variants"] = variants
+    db_manager.get_database()[f"{BUCKET_NAME}.files"].update_one({"metadata.sha256": blob_id}, {"$set": fields})
+
+
+def store_avatar(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize an incoming avatar value
+
+    Data URLs (or bare base64) are stored with their thumbnails and replaced
+    by the hash URL; our own avatar URLs are reduced to that canonical form
+    and other URLs pass through unchanged.
+
+    Raises:
+        ValueError: If the value is inline data but not a decodable image
+    """
+    if value and AVATAR_PATH in value:
+        # Our own hash URL, possibly echoed back absolute or sized by a client
+        return avatar_url(avatar_blob_id(value[value.index(AVATAR_PATH):]))
+    if not value or value.startswith(("http://", "https://")):
+        return value
+    data, content_type = decode_upload(value)
+    if content_type and not content_type.startswith("image/"):
+        raise ValueError(f"Avatar must be an image, got {content_type}")
+
+    blob_id = put_blob(data, "avatar", content_type or "image/png")["blob_id"]
+    variants = {}
+    for size in AVATAR_SIZES:
+        thumb = _thumbnail(data, size)
+        if thumb:
+            variant_id = put_blob(thumb[0], f"avatar-{size}", thumb[1])["blob_id"]
+            _mark_avatar(variant_id)
+            variants[str(size)] = variant_id
+    _mark_avatar(blob_id, variants)
+    return avatar_url(blob_id)
+
+
+def resolve_avatar(blob_id: str, size: Optional[int] = None) -> Optional[str]:
+    """
+    Blob to serve for an avatar request: the smallest variant at least size
+    pixels, else the original. None if blob_id is not an avatar.
+    """
+    file_doc = find_blob(blob_id)
+    metadata = (file_doc or {}).get("metadata") or {}
+    if not metadata.get("avatar"):
+        return None
+    if size:
+        fitting = sorted(int(s) for s in (metadata.get("variants") or {}) if int(s) >= size)
+        if fitting:
+            return metadata["variants"][str(fitting[0])]
+    return blob_id
+
+
+def migrate_inline_avatars():
+    """
+    Move inline (data URL) avatars and profile photos into the blob store
+
+    Idempotent; runs at startup and is a no-op once every image is a hash URL.
+    """
+    sources = [(db_manager.doctors, ("avatar", "profile_photo")), (db_manager.parents, ("avatar",))]
+    for collection, fields in sources:
+        inline = {"$or": [{field: {"$regex": "^data:"}} for field in fields]}
+        migrated = 0
+        for record in collection.find(inline, {field: 1 for field in fields}):
+            updates = {}
+            for field in fields:
+                value = record.get(field)
+                if isinstance(value, str) and value.startswith("data:"):
+                    try:
+                        updates[field] = store_avatar(value)
+                    except ValueError as e:
+                        print(f"[MIGRATE] Dropping undecodable {field} on {record['_id']}: {e}")
+                        updates[field] = None
+            collection.update_one({"_id": record["_id"]}, {"$set": updates})
+            migrated += 1
+        if migrated:
+            print(f"[MIGRATE] {collection.name}: moved inline avatars of {migrated} records into the blob store")
@@ -0,0 +1,176 @@
+"""
+Document blob store
+Uploaded files live in the GridFS bucket "document_blobs", one copy per
+distinct content: each file carries its sha256 in metadata (uniquely
+indexed) and is addressed by that hash. Parent and child records keep only
+a small reference ({blob_id, size, content_type, url, ...}); the bytes are
+streamed by GET /api/documents/{blob_id}.
+"""
+import base64
+import binascii
+import hashlib
+from typing import Optional, Tuple
+
+from gridfs import GridFSBucket, NoFile
+from gridfs.grid_file import GridOut
+from pymongo.errors import DuplicateKeyError
+
+from database import db_manager
+
+
+BUCKET_NAME = "document_blobs"
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+# Bytes read from GridFS per streamed chunk
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def bucket() -> GridFSBucket:
+    return GridFSBucket(db_manager.get_database(), bucket_name=BUCKET_NAME)
+
+
+def blob_url(blob_id: str) -> str:
+    """Download path for a stored blob (relative to the API base URL)"""
+    return f"/api/documents/{blob_id}"
+
+
+def decode_upload(value: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Decode an uploaded file sent as a data URL or bare base64
+
+    Returns:
+        (bytes, content type from the data URL or None)
+
+    Raises:
+        ValueError: If the value is not valid base64
+    """
+    content_type = None
+    if value.startswith("data:"):
+        header, _, value = value.partition(",")
+        content_type = header[5:].split(";")[0] or None
+    try:
+        return base64.b64decode(value, validate=True), content_type
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 document: {e}")
+
+
+def find_blob(blob_id: str) -> Optional[dict]:
+    """GridFS file document for a content hash, or None"""
+    return db_manager.get_database()[f"{BUCKET_NAME}.files"].find_one({"metadata.sha256": blob_id})
+
+
+def put_blob(data: bytes, filename: str, content_type: Optional[str] = None) -> dict:
+    """
+    Store bytes unless identical content is already stored
+
+    Returns:
+        {"blob_id", "size", "content_type"} for use in a document reference
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    content_type = content_type or DEFAULT_CONTENT_TYPE
+    existing = find_blob(sha256)
+    if existing is None:
+        store = bucket()
+        upload = store.open_upload_stream(filename, metadata={"sha256": sha256, "content_type": content_type})
+        try:
+            upload.write(data)
+            upload.close()
+        except DuplicateKeyError:
+            # A concurrent upload of the same content won; drop our chunks
+            print(f"[BLOBS] Blob {sha256[:12]} stored concurrently, keeping the first copy")
+            try:
+                store.delete(upload._id)
+            except NoFile:
+                pass
+        existing = find_blob(sha256) or {"length": len(data), "metadata": {"content_type": content_type}}
+
+    return {
+        "blob_id": sha256,
+        "size": existing.get("length", len(data)),
+        "content_type": (existing.get("metadata") or {}).get("content_type", content_type)
+    }
+
+
+def document_ref(data: bytes, name: str, content_type: Optional[str] = None, **fields) -> dict:
+    """Store an uploaded file and build the metadata-only reference kept on records"""
+    blob = put_blob(data, name, content_type)
+    return {**fields, "name": name, **blob, "url": blob_url(blob["blob_id"])}
+
+
+def stored_ref(blob_id: str, name: Optional[str] = None, **fields) -> Optional[dict]:
+    """Reference to an already stored blob (e.g. a finished upload), or None"""
+    file_doc = find_blob(blob_id)
+    if file_doc is None:
+        return None
+    return {
+        **fields,
+        "name": name or file_doc.get("filename") or "document",
+        "blob_id": blob_id,
+        "size": file_doc.get("length", 0),
+        "content_type": (file_doc.get("metadata") or {}).get("content_type", DEFAULT_CONTENT_TYPE),
+        "url": blob_url(blob_id)
+    }
+
+
+def open_blob(blob_id: str) -> Optional[GridOut]:
+    """Seekable read handle for a blob, or None if it does not exist"""
+    file_doc = find_blob(blob_id)
+    if file_doc is None:
+        return None
+    try:
+        return bucket().open_download_stream(file_doc["_id"])
+    except NoFile:
+        return None
+
+
+def iter_blob(grid_out: GridOut, start: int = 0, length: Optional[int] = None):
+    """Yield length bytes from start without loading the blob into memory"""
+    try:
+        grid_out.seek(start)
+        remaining = grid_out.length - start if length is None else length
+        while remaining > 0:
+            chunk = grid_out.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
+
+
+def _externalize(doc: dict) -> Optional[dict]:
+    """Reference for one embedded document, or None if it holds no inline bytes"""
+    inline = doc.get("content")
+    if not inline and isinstance(doc.get("url"), str) and doc["url"].startswith("data:"):
+        inline = doc["url"]
+    if not inline or doc.get("blob_id"):
+        return None
+    data, content_type = decode_upload(inline)
+    fields = {k: v for k, v in doc.items() if k not in ("content", "url", "name")}
+    return document_ref(data, doc.get("name") or doc.get("title") or "document", content_type, **fields)
+
+
+def migrate_embedded_documents():
+    """
+    Move base64 document contents out of parents and children into the store
+
+    Idempotent; runs at startup and is a no-op once no record embeds bytes.
+    """
+    inline = {"$or": [{"documents.content": {"$exists": True}}, {"documents.url": {"$regex": "^data:"}}]}
+    for collection in (db_manager.parents, db_manager.children):
+        migrated = 0
+        for record in collection.find(inline, {"documents": 1}):
+            documents = []
+            changed = False
+            for doc in record.get("documents") or []:
+                try:
+                    ref = _externalize(doc) if isinstance(doc, dict) else None
+                except ValueError as e:
+                    print(f"[MIGRATE] Skipping undecodable document {doc.get('id')} on {record['_id']}: {e}")
+                    ref = None
+                documents.append(ref or doc)
+                changed = changed or ref is not None
+            if changed:
+                collection.update_one({"_id": record["_id"]}, {"$set": {"documents": documents}})
+                migrated += 1
+        if migrated:
+            print(f"[MIGRATE] {collection.name}: moved embedded documents of {migrated} records into the blob store")
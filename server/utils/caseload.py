@@ -0,0 +1,212 @@
+"""
+Therapist caseload helpers
+Children list every assigned therapist in therapistIds (multikey-indexed);
+therapistId is the primary therapist and is always a member of that list.
+
+Assignment changes are single conditional updates, so concurrent requests
+cannot lose each other's therapists, and each one that really changes the
+list adjusts the therapist's maintained assigned_children count (and the
+admin ongoing_therapies counter when a child gains its first or loses its
+last therapist). recount_caseloads() repairs any drift at startup.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import db_manager
+from utils.admin_stats import adjust_stats, is_assigned
+
+
+_ASSIGNMENT_FIELDS = {"therapistId": 1, "therapistIds": 1}
+
+
+def backfill_primary_therapist_ids():
+    """
+    Add each child's primary therapistId to therapistIds where it is missing
+
+    Older records only set therapistId; once it is in the list, caseload
+    queries need nothing but the therapistIds index. Idempotent.
+    """
+    result = db_manager.children.update_many(
+        {"therapistId": {"$nin": [None, ""]}, "$expr": {"$not": {"$in": [
+            "$therapistId",
+            {"$cond": [{"$isArray": "$therapistIds"}, "$therapistIds", []]}
+        ]}}},
+        [{"$set": {"therapistIds": {"$concatArrays": [
+            {"$cond": [{"$isArray": "$therapistIds"}, "$therapistIds", []]},
+            ["$therapistId"]
+        ]}}}]
+    )
+    if result.modified_count:
+        print(f"[MIGRATE] Added primary therapist to therapistIds on {result.modified_count} children")
+    # Assignment updates need an array to $addToSet into and an object to
+    # set per-therapist start dates in
+    for field, type_name, empty in (("therapistIds", "array", []), ("therapy_start_dates", "object", {})):
+        result = db_manager.children.update_many(
+            {field: {"$exists": True, "$not": {"$type": type_name}}},
+            {"$set": {field: empty}}
+        )
+        if result.modified_count:
+            print(f"[MIGRATE] Reset malformed {field} on {result.modified_count} children")
+
+
+def recount_caseloads():
+    """
+    Recompute every therapist's assigned_children from the children
+
+    One aggregation over the therapistIds index and one bulk_write; only
+    counts that differ are written.
+    """
+    counts = {
+        row["_id"]: row["n"]
+        for row in db_manager.children.aggregate([
+            {"$match": {"therapistIds.0": {"$exists": True}}},
+            {"$unwind": "$therapistIds"},
+            {"$group": {"_id": "$therapistIds", "n": {"$sum": 1}}}
+        ])
+    }
+    fixes = [
+        UpdateOne({"_id": d["_id"]}, {"$set": {"assigned_children": counts.get(d["_id"], 0)}})
+        for d in db_manager.doctors.find({}, {"assigned_children": 1})
+        if d.get("assigned_children") != counts.get(d["_id"], 0)
+    ]
+    if fixes:
+        db_manager.doctors.bulk_write(fixes, ordered=False)
+        print(f"[CASELOAD] Corrected assigned_children on {len(fixes)} therapists")
+
+
+def adjust_caseloads(deltas: dict):
+    """Apply {therapist_id: delta} to the maintained caseload counts"""
+    ops = [UpdateOne({"_id": tid}, {"$inc": {"assigned_children": n}}) for tid, n in deltas.items() if n]
+    if ops:
+        db_manager.doctors.bulk_write(ops, ordered=False)
+
+
+def assign_therapist(child_key, therapist_id: str) -> Optional[List[str]]:
+    """
+    Add a therapist to a child and make them the primary
+
+    Returns:
+        The child's therapistIds afterwards, or None if the child does not exist
+    """
+    now = datetime.now(timezone.utc)
+    # Only matches when the therapist is new to the child, so the start date
+    # and counters change exactly once however many requests race
+    before = db_manager.children.find_one_and_update(
+        {"_id": child_key, "therapistIds": {"$ne": therapist_id}},
+        {
+            "$addToSet": {"therapistIds": therapist_id},
+            "$set": {"therapistId": therapist_id, f"therapy_start_dates.{therapist_id}": now.isoformat(), "updated_at": now}
+        },
+        projection=_ASSIGNMENT_FIELDS,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is not None:
+        adjust_caseloads({therapist_id: 1})
+        if not is_assigned(before):
+            adjust_stats(ongoing_therapies=1)
+        return (before.get("therapistIds") or []) + [therapist_id]
+
+    # Already assigned: just promote to primary
+    after = db_manager.children.find_one_and_update(
+        {"_id": child_key},
+        {"$set": {"therapistId": therapist_id, "updated_at": now}},
+        projection=_ASSIGNMENT_FIELDS,
+        return_document=ReturnDocument.AFTER
+    )
+    return None if after is None else after.get("therapistIds") or []
+
+
+def unassign_therapist(child_key, therapist_id: str) -> Optional[bool]:
+    """
+    Remove a therapist from a child
+
+    If they were the primary, the first remaining therapist (or None) takes
+    over in the same write: a pipeline update, where $filter does the $pull.
+
+    Returns:
+        True if removed, False if the therapist was not assigned, None if
+        the child does not exist
+    """
+    before = db_manager.children.find_one_and_update(
+        {"_id": child_key, "therapistIds": therapist_id},
+        [
+            {"$set": {
+                "therapistIds": {"$filter": {"input": "$therapistIds", "cond": {"$ne": ["$$this", therapist_id]}}},
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            {"$set": {"therapistId": {"$cond": [
+                {"$eq": ["$therapistId", therapist_id]},
+                {"$ifNull": [{"$arrayElemAt": ["$therapistIds", 0]}, None]},
+                "$therapistId"
+            ]}}}
+        ],
+        projection=_ASSIGNMENT_FIELDS,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None if db_manager.children.count_documents({"_id": child_key}, limit=1) == 0 else False
+
+    adjust_caseloads({therapist_id: -1})
+    remaining = [tid for tid in before.get("therapistIds") or [] if tid != therapist_id]
+    if is_assigned(before) and not remaining:
+        adjust_stats(ongoing_therapies=-1)
+    return True
+
+
+def reassign_caseload(to_therapist_id: str, from_therapist_id: Optional[str] = None, child_keys: Optional[list] = None) -> dict:
+    """
+    Move children between therapists with a bounded number of update_many
+
+    With from_therapist_id, that therapist is replaced by the new one on
+    all their children (or only on child_keys), keeping its place in the
+    list and primary status. Without it, the new therapist is added to
+    child_keys and made primary, as a single assignment would.
+
+    Returns:
+        {"moved": children that gained the new therapist,
+         "merged": children that already had them and only lost the old one}
+    """
+    now = datetime.now(timezone.utc)
+    to_id, from_id = to_therapist_id, from_therapist_id
+    scope = {"_id": {"$in": child_keys}} if child_keys is not None else {}
+
+    if from_id:
+        primary = {"$cond": [{"$eq": ["$therapistId", from_id]}, to_id, "$therapistId"]}
+        moved = db_manager.children.update_many(
+            {**scope, "therapistIds": {"$eq": from_id, "$ne": to_id}},
+            [{"$set": {
+                "therapistIds": {"$map": {"input": "$therapistIds", "in": {"$cond": [{"$eq": ["$$this", from_id]}, to_id, "$$this"]}}},
+                "therapistId": primary,
+                "therapy_start_dates": {"$mergeObjects": [
+                    "$therapy_start_dates",
+                    {"$arrayToObject": {"$literal": [{"k": to_id, "v": now.isoformat()}]}}
+                ]},
+                "updated_at": now
+            }}]
+        ).modified_count
+        merged = db_manager.children.update_many(
+            {**scope, "therapistIds": {"$all": [from_id, to_id]}},
+            [{"$set": {
+                "therapistIds": {"$filter": {"input": "$therapistIds", "cond": {"$ne": ["$$this", from_id]}}},
+                "therapistId": primary,
+                "updated_at": now
+            }}]
+        ).modified_count
+        # Every child keeps at least one therapist, so ongoing_therapies is unchanged
+        adjust_caseloads({from_id: -(moved + merged), to_id: moved})
+    else:
+        update = {
+            "$addToSet": {"therapistIds": to_id},
+            "$set": {"therapistId": to_id, f"therapy_start_dates.{to_id}": now.isoformat(), "updated_at": now}
+        }
+        # Previously unassigned children first, so they can be counted as ongoing
+        newly_assigned = db_manager.children.update_many({**scope, "therapistIds.0": {"$exists": False}}, update).modified_count
+        added = db_manager.children.update_many({**scope, "therapistIds": {"$ne": to_id}}, update).modified_count
+        moved, merged = newly_assigned + added, 0
+        adjust_caseloads({to_id: moved})
+        adjust_stats(ongoing_therapies=newly_assigned)
+
+    print(f"[CASELOAD] Reassigned to {to_id} from {from_id or '-'}: {moved} moved, {merged} merged")
+    return {"moved": moved, "merged": merged}
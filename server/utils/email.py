@@ -1,32 +1,17 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from config import settings
-import logging
+"""
+Transactional email
+Messages are rendered here and handed to the outbound mail queue
+(utils.mail_queue), whose worker does the SMTP delivery; request handlers
+never wait on the mail server.
+"""
+from typing import Iterable, List
 
-logger = logging.getLogger(__name__)
+from utils.mail_queue import queue_emails
 
-async def send_invitation_email(email: str, name: str, role: str, invitation_link: str):
-    """
-    Send an invitation email to a new user.
-    """
-    print("\n" + "="*50)
-    print(f"📧 SENDING INVITATION TO: {email}")
-    print(f"🔗 LINK: {invitation_link}")
-    print("="*50 + "\n")
-
-    if not settings.SMTP_USER or "your-email" in settings.SMTP_USER:
-        print(f"⚠️  SKIPPING EMAIL SEND: SMTP_USER is not configured in .env")
-        print(f"👉 Please update SMTP_USER and SMTP_PASSWORD in your .env file to receive real emails.")
-        return False
-
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = settings.SMTP_FROM
-        msg['To'] = email
-        msg['Subject'] = f"Invitation to join NeuroBridge as a {role.capitalize()}"
 
-        body = f"""
+def render_invitation(name: str, role: str, invitation_link: str) -> dict:
+    """Subject and HTML body of an invitation email"""
+    body = f"""
         <html>
             <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
                 <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #eee; border-radius: 10px;">
@@ -34,7 +19,7 @@ async def send_invitation_email(email: str, name: str, role: str, invitation_lin
                     <p>You have been invited to join the NeuroBridge platform as a <strong>{role}</strong>.</p>
                     <p>To get started and set your password, please click the button below:</p>
                     <div style="text-align: center; margin: 30px 0;">
-                        <a href="{invitation_link}" 
+                        <a href="{invitation_link}"
                            style="background-color: #4f46e5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; font-weight: bold;">
                            Set Your Password
                         </a>
@@ -47,18 +32,32 @@ async def send_invitation_email(email: str, name: str, role: str, invitation_lin
             </body>
         </html>
         """
-        msg.attach(MIMEText(body, 'html'))
+    return {"subject": f"Invitation to join NeuroBridge as a {role.capitalize()}", "html": body}
+
+
+def queue_invitation_emails(invitations: Iterable[dict]) -> List:
+    """
+    Queue invitation emails in one batch
 
-        # Connect to server and send email
-        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"✅ SUCCESS: Invitation email sent to {email}")
-        return True
-    except Exception as e:
-        print(f"❌ ERROR: Failed to send email to {email}: {str(e)}")
-        logger.error(f"Failed to send email to {email}: {str(e)}")
-        return False
+    Args:
+        invitations: {"email", "name", "role", "invitation_link"} dicts
+
+    Returns:
+        Mail queue IDs
+    """
+    messages = []
+    for inv in invitations:
+        print(f"📧 QUEUED INVITATION TO: {inv['email']}  🔗 LINK: {inv['invitation_link']}")
+        messages.append({
+            "to": inv["email"],
+            "kind": "invitation",
+            **render_invitation(inv["name"], inv["role"], inv["invitation_link"])
+        })
+    return queue_emails(messages)
+
+
+def send_invitation_email(email: str, name: str, role: str, invitation_link: str):
+    """
+    Queue an invitation email to a new user
+    """
+    return queue_invitation_emails([{"email": email, "name": name, "role": role, "invitation_link": invitation_link}])[0]
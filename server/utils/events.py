@@ -0,0 +1,327 @@
+"""
+Real-time event fan-out
+Write paths publish events to named channels; streaming endpoints subscribe
+to those channels and forward every event to their connected client.
+
+Brokers:
+  - memory: in-process fan-out (single worker, and the stand-in for tests)
+  - mongo:  events go through a capped collection that every worker tails,
+            so a publish on one worker reaches subscribers on all of them
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import CursorType
+
+from config import settings
+from database import db_manager
+
+
+# Events buffered per subscriber before a slow client starts losing them
+SUBSCRIBER_QUEUE_SIZE = 256
+# Recent events kept per worker so reconnecting clients can resume
+REPLAY_BUFFER_SIZE = 2000
+# Published on a user's channel when they join or leave a community
+MEMBERSHIP_CHANGED = "membership.changed"
+
+
+def _envelope(channel: str, event_type: str, data: dict) -> dict:
+    """Wrap a payload in the envelope every subscriber receives"""
+    return {
+        "id": str(ObjectId()),
+        "channel": channel,
+        "type": event_type,
+        "data": data,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+class EventBroker:
+    """Base broker: in-process publish/subscribe over asyncio queues"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._recent: deque = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        # Loop the subscriber queues belong to; set by start()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _dispatch(self, channel: str, event: dict):
+        """Deliver an event to every local subscriber of a channel"""
+        with self._lock:
+            self._recent.append(event)
+            queues = list(self._subscribers.get(channel, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Drop for this subscriber only; the client re-syncs on reconnect
+                print(f"[EVENTS] Subscriber queue full on {channel}, dropping event")
+
+    def _on_loop(self) -> bool:
+        """True when called from the broker's event loop thread"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _deliver(self, channel: str, event: dict):
+        """
+        Dispatch on the event loop
+
+        asyncio queues are not thread-safe, so publishes from threadpool
+        code (sync routes, background tasks) are handed to the loop.
+        """
+        if self._loop is None or self._on_loop():
+            self._dispatch(channel, event)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, channel, event)
+
+    def publish(self, channel: str, event_type: str, data: dict) -> dict:
+        """
+        Publish an event to a channel
+
+        Args:
+            channel: Channel name (e.g. "community:<id>")
+            event_type: Event name sent to clients (e.g. "message.created")
+            data: JSON-serializable payload
+
+        Returns:
+            The published event envelope
+        """
+        event = _envelope(channel, event_type, data)
+        self._deliver(channel, event)
+        return event
+
+    def replay(self, channels: Iterable[str], last_event_id: str) -> Optional[List[dict]]:
+        """
+        Events on the given channels dispatched after last_event_id
+
+        Returns None when the event has already left the replay buffer, in
+        which case the client has to re-sync from the REST endpoints.
+        """
+        channels = set(channels)
+        with self._lock:
+            recent = list(self._recent)
+        for position, event in enumerate(recent):
+            if event["id"] == last_event_id:
+                return [e for e in recent[position + 1:] if e["channel"] in channels]
+        return None
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        """Yield a queue receiving every event published to the channel"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                channel_queues = self._subscribers.get(channel)
+                if channel_queues is not None:
+                    channel_queues.discard(queue)
+                    if not channel_queues:
+                        del self._subscribers[channel]
+
+    def start(self):
+        """Bind the broker to the running event loop"""
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self):
+        """Stop background resources"""
+        self._loop = None
+
+
+class InMemoryBroker(EventBroker):
+    """In-process broker; used for single-worker deployments and tests"""
+
+
+class MongoBroker(EventBroker):
+    """
+    Cross-worker broker backed by a capped MongoDB collection
+
+    publish() inserts into the capped collection; a tailer thread in each
+    worker follows it with a tailable cursor and dispatches to local queues.
+    """
+
+    COLLECTION = "event_stream"
+    CAPPED_SIZE_BYTES = 16 * 1024 * 1024
+
+    def __init__(self):
+        super().__init__()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def _collection(self):
+        return db_manager.get_database()[self.COLLECTION]
+
+    def _ensure_collection(self):
+        db = db_manager.get_database()
+        if self.COLLECTION not in db.list_collection_names():
+            db.create_collection(self.COLLECTION, capped=True, size=self.CAPPED_SIZE_BYTES)
+
+    def publish(self, channel: str, event_type: str, data: dict) -> dict:
+        event = _envelope(channel, event_type, data)
+        # Local delivery happens when the tailer reads the document back
+        doc = {k: v for k, v in event.items() if k != "id"}
+        self._collection.insert_one({"_id": ObjectId(event["id"]), **doc})
+        return event
+
+    def _tail(self):
+        """Follow the capped collection and hand new events to the event loop"""
+        last_id = None
+        latest = self._collection.find_one(sort=[("$natural", -1)])
+        if latest:
+            last_id = latest["_id"]
+
+        while not self._stopping.is_set():
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT, max_await_time_ms=1000)
+            try:
+                while cursor.alive and not self._stopping.is_set():
+                    for doc in cursor:
+                        last_id = doc["_id"]
+                        event = {
+                            "id": str(doc["_id"]),
+                            "channel": doc["channel"],
+                            "type": doc["type"],
+                            "data": doc["data"],
+                            "timestamp": doc["timestamp"]
+                        }
+                        self._loop.call_soon_threadsafe(self._dispatch, event["channel"], event)
+            except Exception as e:
+                print(f"[EVENTS] Tailer error, restarting cursor: {e}")
+            finally:
+                cursor.close()
+            self._stopping.wait(0.5)
+
+    def start(self):
+        self._ensure_collection()
+        super().start()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._tail, name="event-tailer", daemon=True)
+        self._thread.start()
+        print("[EVENTS] Mongo event tailer started")
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        super().stop()
+
+
+def _create_broker() -> EventBroker:
+    if settings.EVENT_BROKER == "mongo":
+        return MongoBroker()
+    return InMemoryBroker()
+
+
+# Global broker instance
+event_broker = _create_broker()
+
+
+def community_channel(community_id: str) -> str:
+    """Channel carrying message/reaction/delete events for one community"""
+    return f"community:{community_id}"
+
+
+def user_channel(user_id: str) -> str:
+    """Channel carrying events addressed to one user (read receipts, notifications)"""
+    return f"user:{user_id}"
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event envelope as a Server-Sent Events frame"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def sse_stream(
+    request,
+    channels,
+    heartbeat: Optional[int] = None,
+    last_event_id: Optional[str] = None,
+    refresh_channels: Optional[Callable[[], Iterable[str]]] = None
+):
+    """
+    Async generator relaying events from one or more channels as SSE frames
+
+    Sends a comment heartbeat when idle so proxies keep the connection open,
+    and stops as soon as the client disconnects. With last_event_id (the
+    Last-Event-ID a reconnecting EventSource sends) missed events are
+    replayed first, or a "resync" event is sent if they are no longer held.
+    With refresh_channels, a membership.changed event re-reads the channel
+    list and the subscriptions are brought in line with it, so a long-lived
+    stream follows the user's joins and leaves.
+    """
+    heartbeat = heartbeat or settings.SSE_HEARTBEAT_SECONDS
+    merged: asyncio.Queue = asyncio.Queue()
+    subscriptions: Dict[str, Tuple[AsyncExitStack, asyncio.Task]] = {}
+
+    async def _pump(queue: asyncio.Queue):
+        while True:
+            await merged.put(await queue.get())
+
+    async def _subscribe(channel: str):
+        if channel in subscriptions:
+            return
+        stack = AsyncExitStack()
+        queue = await stack.enter_async_context(event_broker.subscribe(channel))
+        subscriptions[channel] = (stack, asyncio.create_task(_pump(queue)))
+
+    async def _unsubscribe(channel: str):
+        stack, pump = subscriptions.pop(channel)
+        pump.cancel()
+        await stack.aclose()
+
+    try:
+        for channel in channels:
+            await _subscribe(channel)
+        yield "retry: 5000\n\n"
+
+        # Subscribed before replaying, so nothing falls in between; events
+        # delivered by both paths are sent once
+        replayed: Set[str] = set()
+        if last_event_id:
+            missed = event_broker.replay(subscriptions, last_event_id)
+            if missed is None:
+                # No id line: the client keeps its last id for the next attempt
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                for event in missed:
+                    replayed.add(event["id"])
+                    yield format_sse(event)
+
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(merged.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            # Still queued from a channel dropped since it was received
+            if event["channel"] not in subscriptions or event["id"] in replayed:
+                continue
+            yield format_sse(event)
+
+            if event["type"] == MEMBERSHIP_CHANGED and refresh_channels is not None:
+                wanted = set(await asyncio.to_thread(refresh_channels))
+                for channel in set(subscriptions) - wanted:
+                    await _unsubscribe(channel)
+                added = wanted - set(subscriptions)
+                for channel in added:
+                    await _subscribe(channel)
+                # Catch up on anything the new channels carried since the change
+                for missed_event in event_broker.replay(added, event["id"]) or []:
+                    replayed.add(missed_event["id"])
+                    yield format_sse(missed_event)
+    finally:
+        for channel in list(subscriptions):
+            await _unsubscribe(channel)
@@ -0,0 +1,248 @@
+"""
+Roadmap outcome forecasting
+Fits per-goal progress trajectories from milestone completion dates and
+session engagement, and stores the result on each roadmap goal.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from database import db_manager
+
+
+# Engagement (0-100) that leaves the fitted rate unchanged; higher speeds it up
+BASELINE_ENGAGEMENT = 70.0
+# Only the most recent sessions inform the engagement factor
+RECENT_SESSIONS = 10
+
+
+def _parse_date(value) -> Optional[datetime]:
+    """Parse a stored date (datetime or ISO/YYYY-MM-DD string) into aware UTC"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _session_stats(child_ids: Optional[List[str]] = None) -> Dict[str, dict]:
+    """
+    Aggregate recent session engagement per child in one query
+
+    Returns:
+        {child_id: {"count", "avg_engagement", "last_date"}}
+    """
+    pipeline = []
+    if child_ids is not None:
+        # Match first so each branch of the $or uses its index, then keep
+        # only sessions whose effective child (childId before child_id) is wanted
+        pipeline.append({"$match": {"$or": [{"childId": {"$in": child_ids}}, {"child_id": {"$in": child_ids}}]}})
+    pipeline.append({"$set": {"_child": {"$ifNull": ["$childId", "$child_id"]}}})
+    if child_ids is not None:
+        pipeline.append({"$match": {"_child": {"$in": child_ids}}})
+    pipeline += [
+        {"$match": {"status": {"$ne": "canceled"}}},
+        {"$sort": {"date": -1}},
+        {"$group": {
+            "_id": "$_child",
+            "count": {"$sum": 1},
+            "last_date": {"$first": "$date"},
+            "recent": {"$push": "$engagement"}
+        }},
+        {"$project": {
+            "count": 1,
+            "last_date": 1,
+            "avg_engagement": {"$avg": {"$slice": ["$recent", RECENT_SESSIONS]}}
+        }}
+    ]
+
+    stats = {}
+    for doc in db_manager.sessions.aggregate(pipeline):
+        last_date = _parse_date(doc.get("last_date"))
+        stats[str(doc["_id"])] = {
+            "count": doc.get("count", 0),
+            "avg_engagement": round(doc["avg_engagement"], 1) if doc.get("avg_engagement") is not None else None,
+            "last_date": last_date.date().isoformat() if last_date else None
+        }
+    return stats
+
+
+def _fingerprint(goal: dict, stats: Optional[dict]) -> str:
+    """Hash of every input the forecast depends on"""
+    payload = {
+        "milestones": [
+            [m.get("id"), bool(m.get("completed")), m.get("date")]
+            for m in goal.get("milestones") or []
+        ],
+        "targetDate": goal.get("targetDate"),
+        "progress": goal.get("progress", 0),
+        "sessions": stats
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _trajectory_matrix(goals: List[dict]):
+    """
+    Build padded (goal x observation) arrays of elapsed days and completion
+
+    Each goal contributes an anchor at (0, 0) for its start date followed by
+    one point per completed milestone, ordered by completion date.
+    """
+    series = []
+    starts = []
+    for goal in goals:
+        milestones = goal.get("milestones") or []
+        total = len(milestones)
+        start = _parse_date(goal.get("created_at")) or datetime.now(timezone.utc)
+        done_dates = sorted(
+            d for d in (_parse_date(m.get("date")) for m in milestones if m.get("completed")) if d
+        )
+        if done_dates and done_dates[0] < start:
+            start = done_dates[0] - timedelta(days=1)
+
+        points = [(0.0, 0.0)]
+        for k, done_at in enumerate(done_dates, start=1):
+            points.append(((done_at - start).total_seconds() / 86400.0, k / total))
+        series.append(points)
+        starts.append(start)
+
+    width = max(len(p) for p in series)
+    t = np.zeros((len(series), width))
+    y = np.zeros((len(series), width))
+    mask = np.zeros((len(series), width), dtype=bool)
+    for row, points in enumerate(series):
+        t[row, :len(points)] = [p[0] for p in points]
+        y[row, :len(points)] = [p[1] for p in points]
+        mask[row, :len(points)] = True
+    return t, y, mask, starts
+
+
+def _fit(goals: List[dict], stats: Dict[str, dict]) -> List[dict]:
+    """Least-squares fit of completion vs. time for every goal at once"""
+    t, y, mask, starts = _trajectory_matrix(goals)
+    n = mask.sum(axis=1)
+    t_mean = np.where(mask, t, 0).sum(axis=1) / n
+    y_mean = np.where(mask, y, 0).sum(axis=1) / n
+    dt = np.where(mask, t - t_mean[:, None], 0)
+    dy = np.where(mask, y - y_mean[:, None], 0)
+    sxx = (dt * dt).sum(axis=1)
+    sxy = (dt * dy).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    intercept = y_mean - slope * t_mean
+
+    engagement = np.array([
+        (stats.get(g["childId"]) or {}).get("avg_engagement") or BASELINE_ENGAGEMENT
+        for g in goals
+    ])
+    slope = slope * np.clip(engagement / BASELINE_ENGAGEMENT, 0.5, 1.5)
+
+    # Day (relative to goal start) where the fitted line reaches 100%
+    eta_days = np.divide(1.0 - intercept, slope, out=np.full_like(slope, np.nan), where=slope > 0)
+
+    results = []
+    for row, goal in enumerate(goals):
+        observations = int(n[row]) - 1
+        target = _parse_date(goal.get("targetDate"))
+        result = {
+            "ratePerWeek": round(float(slope[row]) * 7 * 100, 1),
+            "observations": observations,
+            "confidence": "high" if observations >= 4 else "medium" if observations >= 2 else "low",
+            "estimatedCompletion": None,
+            "likelihood": None
+        }
+        if observations >= 1 and y[row, observations] >= 1.0:
+            # Every milestone is done: completion is the last observation
+            done_at = starts[row] + timedelta(days=float(t[row, observations]))
+            result["estimatedCompletion"] = done_at.date().isoformat()
+            result["likelihood"] = 100
+        elif not np.isnan(eta_days[row]):
+            eta = starts[row] + timedelta(days=float(eta_days[row]))
+            result["estimatedCompletion"] = eta.date().isoformat()
+            if target:
+                # Slack relative to the total planned duration, squashed to 0-100
+                planned = max((target - starts[row]).days, 1)
+                slack = (target - eta).days / planned
+                result["likelihood"] = int(round(100 / (1 + np.exp(-4 * slack))))
+        results.append(result)
+    return results
+
+
+def _summary(forecast: dict, target_date: Optional[str]) -> str:
+    """Human-readable prediction shown in the roadmap views"""
+    if forecast["likelihood"] == 100:
+        return "All milestones completed."
+    if not forecast["estimatedCompletion"]:
+        return "Not enough milestone history yet to forecast completion."
+    text = f"Projected to complete around {forecast['estimatedCompletion']}"
+    if target_date and forecast["likelihood"] is not None:
+        text += f" ({forecast['likelihood']}% likely to meet the {target_date} target)"
+    return text + "."
+
+
+def refresh_forecasts(child_id: Optional[str] = None, force: bool = False) -> dict:
+    """
+    Recompute forecasts for goals whose milestones or session history changed
+
+    Args:
+        child_id: Limit the refresh to one child's roadmap (None = all children)
+        force: Recompute even when the stored fingerprint still matches
+
+    Returns:
+        {"checked": int, "updated": int}
+    """
+    query = {"childId": child_id} if child_id else {}
+    goals = list(db_manager.roadmaps.find(query, {
+        "childId": 1, "milestones": 1, "progress": 1, "targetDate": 1,
+        "created_at": 1, "forecast.fingerprint": 1
+    }))
+    if not goals:
+        return {"checked": 0, "updated": 0}
+
+    stats = _session_stats([child_id] if child_id else None)
+    stale = []
+    for goal in goals:
+        fingerprint = _fingerprint(goal, stats.get(goal["childId"]))
+        if force or (goal.get("forecast") or {}).get("fingerprint") != fingerprint:
+            goal["_fingerprint"] = fingerprint
+            stale.append(goal)
+
+    # Goals without milestones have no trajectory to fit: keep only the
+    # fingerprint, dropping any forecast (and its summary) left from before
+    fittable = [g for g in stale if g.get("milestones")]
+    now = datetime.now(timezone.utc)
+    operations = []
+    for goal in stale:
+        if goal.get("milestones"):
+            continue
+        update = {"$set": {"forecast": {"fingerprint": goal["_fingerprint"], "computed_at": now}}}
+        if goal.get("forecast"):
+            update["$unset"] = {"aiPrediction": ""}
+        operations.append(UpdateOne({"_id": goal["_id"]}, update))
+    for goal, forecast in zip(fittable, _fit(fittable, stats) if fittable else []):
+        forecast["fingerprint"] = goal["_fingerprint"]
+        forecast["computed_at"] = now
+        operations.append(UpdateOne(
+            {"_id": goal["_id"]},
+            {"$set": {"forecast": forecast, "aiPrediction": _summary(forecast, goal.get("targetDate"))}}
+        ))
+
+    if operations:
+        db_manager.roadmaps.bulk_write(operations, ordered=False)
+    print(f"[FORECAST] Checked {len(goals)} goals, refreshed {len(operations)}")
+    return {"checked": len(goals), "updated": len(operations)}
+
+
+def refresh_child_forecasts(child_id: str):
+    """Background-task entry point; never lets a forecast failure surface to the caller"""
+    try:
+        refresh_forecasts(child_id)
+    except Exception as e:
+        print(f"[FORECAST] Refresh failed for child {child_id}: {e}")
@@ -0,0 +1,157 @@
+"""
+Per-user hidden messages ("delete for me")
+Each hide is one row in hidden_messages keyed by (user_id, scope, message_id),
+where scope is a community ID or DIRECT_SCOPE. Read paths check only the
+messages they actually return against it (one $in per fetched batch, or a
+per-row $lookup inside aggregations), so neither message documents nor
+queries grow with how many messages a user has hidden.
+"""
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from database import db_manager
+from utils.pagination import keyset_after
+from utils.retention import tiered_find
+
+
+DIRECT_SCOPE = "direct"
+# Upserts per bulk_write when migrating legacy deleted_for arrays
+MIGRATION_BATCH_SIZE = 1000
+
+
+def hide_message(user_id: str, scope: str, message_id: Any) -> bool:
+    """
+    Hide a message for one user (idempotent)
+
+    Returns:
+        True if the message was newly hidden
+    """
+    result = db_manager.hidden_messages.update_one(
+        {"user_id": user_id, "scope": scope, "message_id": message_id},
+        {"$setOnInsert": {"hidden_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return result.upserted_id is not None
+
+
+def hidden_among(user_id: str, scope: str, message_ids: Iterable[Any]) -> Set[Any]:
+    """Which of the given messages the user has hidden (one $in on the unique index)"""
+    message_ids = list(message_ids)
+    if not message_ids:
+        return set()
+    return {
+        row["message_id"]
+        for row in db_manager.hidden_messages.find(
+            {"user_id": user_id, "scope": scope, "message_id": {"$in": message_ids}},
+            {"message_id": 1, "_id": 0}
+        )
+    }
+
+
+def drop_hidden(user_id: str, scope: str, docs: List[dict]) -> List[dict]:
+    """The given message documents minus those the user has hidden"""
+    hidden = hidden_among(user_id, scope, (doc["_id"] for doc in docs))
+    return [doc for doc in docs if doc["_id"] not in hidden] if hidden else docs
+
+
+def is_hidden(user_id: str, scope: str, message_id: Any) -> bool:
+    """Whether the user has hidden one specific message"""
+    return db_manager.hidden_messages.find_one(
+        {"user_id": user_id, "scope": scope, "message_id": message_id},
+        {"_id": 1}
+    ) is not None
+
+
+def visible_find(collection: Collection, query: dict, sort: List[Tuple[str, int]], limit: int,
+                 user_id: str, scope: str) -> List[dict]:
+    """
+    tiered_find() without the user's hidden messages
+
+    Each batch is checked with hidden_among() and the next one continues
+    past its last row (keyset on timestamp, _id), until limit visible
+    messages are found or the tiers run out.
+    """
+    docs = []
+    batch_query = query
+    while len(docs) < limit:
+        wanted = limit - len(docs)
+        batch = tiered_find(collection, batch_query, sort, wanted)
+        docs += drop_hidden(user_id, scope, batch)
+        if len(batch) < wanted:
+            break
+        batch_query = {"$and": [query, keyset_after(batch[-1], sort[0][1])]}
+    return docs
+
+
+def unhidden_stages(user_expr: Any, scope: str) -> List[dict]:
+    """
+    Aggregation stages dropping messages their user has hidden
+
+    An indexed $lookup per row, so the cost follows the rows aggregated.
+    user_expr is an expression for the user ID, e.g. {"$literal": user_id}
+    or {"$toString": "$recipient_id"}.
+    """
+    return [
+        {"$lookup": {
+            "from": db_manager.hidden_messages.name,
+            "let": {"uid": user_expr, "mid": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$user_id", "$$uid"]},
+                    {"$eq": ["$scope", {"$literal": scope}]},
+                    {"$eq": ["$message_id", "$$mid"]}
+                ]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "_hidden"
+        }},
+        {"$match": {"_hidden": {"$size": 0}}},
+        {"$unset": "_hidden"}
+    ]
+
+
+def migrate_deleted_for():
+    """
+    Move legacy deleted_for arrays into hidden_messages
+
+    Idempotent; runs at startup and is a no-op once every array is gone.
+    Only non-empty arrays are read, streamed in batches of
+    MIGRATION_BATCH_SIZE; the arrays are then dropped with one update_many.
+    """
+    sources = [
+        (db_manager.community_messages, lambda doc: doc.get("community_id")),
+        (db_manager.direct_messages, lambda doc: DIRECT_SCOPE)
+    ]
+    for collection, scope_of in sources:
+        now = datetime.now(timezone.utc)
+        moved = 0
+        operations = []
+        cursor = collection.find(
+            {"deleted_for": {"$exists": True, "$ne": []}},
+            {"deleted_for": 1, "community_id": 1}
+        ).batch_size(MIGRATION_BATCH_SIZE)
+        for doc in cursor:
+            operations.extend(
+                UpdateOne(
+                    {"user_id": str(user_id), "scope": scope_of(doc), "message_id": doc["_id"]},
+                    {"$setOnInsert": {"hidden_at": now}},
+                    upsert=True
+                )
+                for user_id in set(doc.get("deleted_for") or [])
+            )
+            if len(operations) >= MIGRATION_BATCH_SIZE:
+                db_manager.hidden_messages.bulk_write(operations, ordered=False)
+                moved += len(operations)
+                operations = []
+        if operations:
+            db_manager.hidden_messages.bulk_write(operations, ordered=False)
+            moved += len(operations)
+
+        result = collection.update_many({"deleted_for": {"$exists": True}}, {"$unset": {"deleted_for": ""}})
+        if moved or result.modified_count:
+            print(f"[MIGRATE] {collection.name}: moved {moved} hidden-message entries, "
+                  f"dropped deleted_for from {result.modified_count} messages")
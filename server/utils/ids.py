@@ -0,0 +1,55 @@
+"""
+Sequential record IDs (TH-1001, PA-1001, CH-1001, ...)
+Each prefix has a counter document in id_counters; one $inc reserves a
+whole block, so bulk imports take N IDs in a single round trip and
+concurrent creates never hand out the same number. A counter is seeded
+from the highest existing ID the first time its prefix is used.
+"""
+from typing import List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db_manager
+
+
+# Numbering starts after this when a collection has no IDs yet
+FIRST_ID_FLOOR = 1000
+
+
+def _counter_key(collection, prefix: str) -> str:
+    return f"{collection.name}:{prefix}"
+
+
+def _seed_counter(collection, prefix: str):
+    """Start the counter at the highest existing PREFIX-<n> (idempotent)"""
+    max_num = FIRST_ID_FLOOR
+    for doc in collection.find({"_id": {"$regex": f"^{prefix}-\\d+$"}}, {"_id": 1}):
+        max_num = max(max_num, int(doc["_id"].split("-")[1]))
+    key = _counter_key(collection, prefix)
+    try:
+        db_manager.id_counters.update_one({"_id": key}, {"$max": {"seq": max_num}}, upsert=True)
+    except DuplicateKeyError:
+        # Another worker seeded it first; $max keeps the higher value
+        db_manager.id_counters.update_one({"_id": key}, {"$max": {"seq": max_num}})
+
+
+def allocate_ids(collection, prefix: str, count: int = 1) -> List[str]:
+    """
+    Reserve count consecutive IDs for a collection
+
+    Returns:
+        The reserved IDs, lowest first (unused ones are simply skipped)
+    """
+    if count <= 0:
+        return []
+    key = _counter_key(collection, prefix)
+    if db_manager.id_counters.find_one({"_id": key}, {"_id": 1}) is None:
+        _seed_counter(collection, prefix)
+    counter = db_manager.id_counters.find_one_and_update(
+        {"_id": key},
+        {"$inc": {"seq": count}},
+        return_document=ReturnDocument.AFTER
+    )
+    last = counter["seq"]
+    return [f"{prefix}-{n}" for n in range(last - count + 1, last + 1)]
@@ -0,0 +1,285 @@
+"""
+Outbound mail queue
+Request handlers only insert messages into the mail_queue collection; a
+worker task per process drains it. Messages are claimed in batches (safe
+across processes), delivered in a thread over one reused SMTP connection,
+and retried with exponential backoff on failure:
+  pending -> sending -> sent | pending (retry later) | failed
+A claim left "sending" by a crashed worker is picked up again once its
+lock expires. While SMTP is not configured nothing is claimed, so queued
+messages wait (still pending) until mail settings are added.
+"""
+import asyncio
+import smtplib
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Iterable, List, Optional
+
+from config import settings
+from database import db_manager
+
+
+# A claimed batch not finished within this time is retried by any worker
+CLAIM_LOCK_MINUTES = 10
+# Idle SMTP connections are closed after this long
+SMTP_IDLE_SECONDS = 60
+# Longest wait between two attempts of one message
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+_worker_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# Logged once per process rather than on every poll
+_warned_unconfigured = False
+
+
+def smtp_configured() -> bool:
+    return settings.SMTP_STUB or bool(settings.SMTP_USER and "your-email" not in settings.SMTP_USER)
+
+
+def queue_emails(messages: Iterable[dict]) -> List:
+    """
+    Queue messages for delivery in one insert
+
+    Args:
+        messages: {"to", "subject", "html", optional "kind"} dicts
+
+    Returns:
+        Queue IDs
+    """
+    now = datetime.now(timezone.utc)
+    docs = [
+        {
+            "to": m["to"],
+            "subject": m["subject"],
+            "html": m["html"],
+            "kind": m.get("kind", "generic"),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        }
+        for m in messages
+    ]
+    if not docs:
+        return []
+    ids = db_manager.mail_queue.insert_many(docs, ordered=False).inserted_ids
+    _wake_worker()
+    return ids
+
+
+def _wake_worker():
+    if _wakeup is not None and _loop is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+class SMTPConnection:
+    """One SMTP session reused across messages, reopened when it drops or idles"""
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._used_at = 0.0
+
+    def _open(self) -> smtplib.SMTP:
+        if settings.SMTP_STUB:
+            smtp = smtplib.SMTP("127.0.0.1", settings.SMTP_STUB_PORT, timeout=30)
+            smtp.ehlo()
+            return smtp
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        smtp.ehlo()
+        if smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return smtp
+
+    def close_if_idle(self):
+        if self._smtp is not None and time.monotonic() - self._used_at > SMTP_IDLE_SECONDS:
+            self.close()
+
+    def send(self, msg: MIMEMultipart):
+        self.close_if_idle()
+        if self._smtp is None:
+            self._smtp = self._open()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the idle session; reconnect once
+            self._smtp = self._open()
+            self._smtp.send_message(msg)
+        self._used_at = time.monotonic()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+_connection = SMTPConnection()
+
+
+def _build_message(doc: dict) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = settings.SMTP_FROM or "noreply@localhost"
+    msg["To"] = doc["to"]
+    msg["Subject"] = doc["subject"]
+    msg.attach(MIMEText(doc["html"], "html"))
+    return msg
+
+
+def _claim_batch() -> List[dict]:
+    """Atomically take up to MAIL_BATCH_SIZE due messages for this worker"""
+    now = datetime.now(timezone.utc)
+    due = {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        {"status": "sending", "locked_until": {"$lt": now}}
+    ]}
+    ids = [d["_id"] for d in db_manager.mail_queue.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(settings.MAIL_BATCH_SIZE)]
+    if not ids:
+        return []
+    claim = uuid.uuid4().hex
+    db_manager.mail_queue.update_many(
+        {"_id": {"$in": ids}, **due},
+        {"$set": {"status": "sending", "claim": claim, "locked_until": now + timedelta(minutes=CLAIM_LOCK_MINUTES)}}
+    )
+    return list(db_manager.mail_queue.find({"claim": claim, "status": "sending"}))
+
+
+def _backoff_seconds(attempts: int) -> int:
+    return min(settings.MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def _record_failure(doc: dict, error: Exception, permanent: bool):
+    attempts = doc.get("attempts", 0) + 1
+    now = datetime.now(timezone.utc)
+    if permanent or attempts >= settings.MAIL_MAX_ATTEMPTS:
+        update = {"status": "failed", "failed_at": now}
+        print(f"[MAIL] Giving up on {doc['to']} after {attempts} attempts: {error}")
+    else:
+        update = {"status": "pending", "next_attempt_at": now + timedelta(seconds=_backoff_seconds(attempts))}
+    db_manager.mail_queue.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {**update, "attempts": attempts, "last_error": str(error)[:500]}, "$unset": {"claim": "", "locked_until": ""}}
+    )
+
+
+def _release(ids: List):
+    """Return claimed messages to the queue without counting an attempt"""
+    if ids:
+        db_manager.mail_queue.update_many(
+            {"_id": {"$in": ids}, "status": "sending"},
+            {"$set": {"status": "pending"}, "$unset": {"claim": "", "locked_until": ""}}
+        )
+
+
+def deliver_batch() -> int:
+    """
+    Claim and send one batch over the shared connection
+
+    Returns:
+        Number of messages delivered; 0 (nothing due, SMTP not configured,
+        or the server is unreachable) makes the worker wait before trying
+        again
+    """
+    global _warned_unconfigured
+    if not smtp_configured():
+        if not _warned_unconfigured:
+            print("[MAIL] SMTP not configured; queued messages will be sent once it is")
+            _warned_unconfigured = True
+        return 0
+
+    batch = _claim_batch()
+    if not batch:
+        _connection.close_if_idle()
+        return 0
+
+    sent = 0
+    for index, doc in enumerate(batch):
+        try:
+            _connection.send(_build_message(doc))
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+            _record_failure(doc, e, permanent=True)
+            continue
+        except (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected, OSError) as e:
+            # Server unreachable or rejecting us: retry this message later and
+            # hand the rest of the batch back untouched
+            _connection.close()
+            _record_failure(doc, e, permanent=False)
+            _release([d["_id"] for d in batch[index + 1:]])
+            break
+        except smtplib.SMTPResponseException as e:
+            _record_failure(doc, e, permanent=500 <= e.smtp_code < 600)
+            continue
+        except smtplib.SMTPException as e:
+            _connection.close()
+            _record_failure(doc, e, permanent=False)
+            continue
+        db_manager.mail_queue.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc), "attempts": doc.get("attempts", 0) + 1},
+             "$unset": {"claim": "", "locked_until": "", "last_error": ""}}
+        )
+        sent += 1
+    if sent:
+        print(f"[MAIL] Delivered {sent}/{len(batch)} queued messages")
+    return sent
+
+
+def requeue_skipped() -> int:
+    """
+    Put messages an earlier version marked "skipped" (SMTP unconfigured)
+    back in the queue; idempotent, a no-op while SMTP is still unconfigured
+    """
+    if not smtp_configured():
+        return 0
+    result = db_manager.mail_queue.update_many(
+        {"status": "skipped"},
+        {"$set": {"status": "pending", "next_attempt_at": datetime.now(timezone.utc)}}
+    )
+    if result.modified_count:
+        print(f"[MAIL] Re-queued {result.modified_count} messages skipped while SMTP was unconfigured")
+    return result.modified_count
+
+
+async def _worker_loop():
+    while True:
+        try:
+            delivered = await asyncio.to_thread(deliver_batch)
+        except Exception as e:
+            print(f"[MAIL] Delivery run failed: {e}")
+            delivered = 0
+        if delivered:
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.MAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_mail_worker():
+    """Start draining the mail queue on the running event loop"""
+    global _worker_task, _wakeup, _loop
+    if _worker_task is None:
+        requeue_skipped()
+        _loop = asyncio.get_running_loop()
+        _wakeup = asyncio.Event()
+        _worker_task = _loop.create_task(_worker_loop())
+
+
+def stop_mail_worker():
+    """Cancel the worker and close its SMTP connection"""
+    global _worker_task, _wakeup, _loop
+    if _worker_task is not None:
+        _worker_task.cancel()
+        _worker_task = None
+    _wakeup = None
+    _loop = None
+    _connection.close()
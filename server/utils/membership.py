@@ -0,0 +1,260 @@
+"""
+Community membership helpers
+Membership lives in the community_members collection (one document per
+community/user pair, unique-indexed) and communities.member_count is kept
+in step, so no request ever loads a community's full member list.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import db_manager
+from utils.events import MEMBERSHIP_CHANGED, event_broker, user_channel
+
+
+DEFAULT_COMMUNITY_NAME = "Parent Support Community"
+
+# Resolved once per process by resolve_default_community()
+_default_community_id: Optional[str] = None
+
+
+def resolve_default_community() -> str:
+    """
+    Find (or create) the default parent community and cache its ID
+
+    Creation is an upsert keyed on the uniquely indexed name, so concurrent
+    workers starting up together still end with a single community (the
+    loser's upsert fails with a duplicate key and simply reads the winner's).
+    """
+    global _default_community_id
+    now = datetime.now(timezone.utc)
+    new_id = str(ObjectId())
+    upsert = dict(
+        filter={"name": DEFAULT_COMMUNITY_NAME},
+        update={"$setOnInsert": {
+            "_id": new_id,
+            "description": "A safe space for parents to connect, share experiences, and support each other.",
+            "created_by": "system",
+            "member_count": 0,
+            "message_count": 1,  # the welcome message below
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now
+        }},
+        projection={"_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    try:
+        community = db_manager.communities.find_one_and_update(**upsert)
+    except DuplicateKeyError:
+        # Another worker inserted it between our match and insert
+        community = db_manager.communities.find_one_and_update(**upsert)
+
+    if community["_id"] == new_id:
+        db_manager.community_messages.insert_one({
+            "_id": str(ObjectId()),
+            "community_id": new_id,
+            "sender_id": "system",
+            "sender_name": "NeuroBridge Team",
+            "sender_role": "system",
+            "content": "Welcome to the Parent Support Community! 🎉 This is a safe space for you to connect with other parents.",
+            "attachments": [],
+            "timestamp": now,
+            "is_deleted": False
+        })
+        print(f"[OK] Created default community: {new_id}")
+
+    _default_community_id = str(community["_id"])
+    return _default_community_id
+
+
+def merge_duplicate_communities():
+    """
+    Fold communities sharing a name into the oldest one
+
+    Earlier versions could create the default community twice when workers
+    raced at startup. Messages, members, read cursors and hides move to the
+    survivor, which must happen before the unique name index is built.
+    Idempotent; a no-op once names are unique.
+    """
+    groups = db_manager.communities.aggregate([
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$group": {"_id": "$name", "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}}
+    ])
+    db = db_manager.get_database()
+    for group in groups:
+        keep, extras = group["ids"][0], group["ids"][1:]
+        for collection in (db_manager.community_messages, db["community_messages_archive"]):
+            collection.update_many({"community_id": {"$in": extras}}, {"$set": {"community_id": keep}})
+        db_manager.hidden_messages.update_many({"scope": {"$in": extras}}, {"$set": {"scope": keep}})
+
+        members = [
+            UpdateOne(
+                {"community_id": keep, "user_id": m["user_id"]},
+                {"$setOnInsert": {"role": m.get("role", "parent"), "joined_at": m.get("joined_at"), "name_key": m.get("name_key", "")}},
+                upsert=True
+            )
+            for m in db_manager.community_members.find({"community_id": {"$in": extras}})
+        ]
+        if members:
+            db_manager.community_members.bulk_write(members, ordered=False)
+        db_manager.community_members.delete_many({"community_id": {"$in": extras}})
+
+        cursors = [
+            UpdateOne({"user_id": c["user_id"], "community_id": keep}, {"$max": {"last_read_at": c["last_read_at"]}}, upsert=True)
+            for c in db_manager.community_read_cursors.find({"community_id": {"$in": extras}, "last_read_at": {"$ne": None}})
+        ]
+        if cursors:
+            db_manager.community_read_cursors.bulk_write(cursors, ordered=False)
+        db_manager.community_read_cursors.delete_many({"community_id": {"$in": extras}})
+
+        db_manager.communities.delete_many({"_id": {"$in": extras}})
+        # message_count is recounted lazily when missing
+        db_manager.communities.update_one(
+            {"_id": keep},
+            {"$set": {"member_count": db_manager.community_members.count_documents({"community_id": keep})},
+             "$unset": {"message_count": ""}}
+        )
+        print(f"[MIGRATE] Merged {len(extras)} duplicate \"{group['_id']}\" communities into {keep}")
+
+
+def get_default_community_id() -> str:
+    """Cached default community ID (resolved on first use if startup skipped it)"""
+    return _default_community_id or resolve_default_community()
+
+
+def join_default_community(user_id: str, name: Optional[str] = None):
+    """Background-task entry point for the login auto-join; never raises"""
+    try:
+        add_member(get_default_community_id(), user_id, "parent", name)
+    except Exception as e:
+        print(f"Warning: Failed to auto-join community: {str(e)}")
+
+
+def name_key(name: Optional[str]) -> str:
+    """Normalized name used for indexed, case-insensitive prefix search"""
+    return (name or "").strip().lower()
+
+
+def add_member(community_id: str, user_id: str, role: str = "parent", name: Optional[str] = None) -> bool:
+    """
+    Idempotently add a user to a community
+
+    Returns:
+        True if the user was newly added, False if already a member
+    """
+    now = datetime.now(timezone.utc)
+    result = db_manager.community_members.update_one(
+        {"community_id": community_id, "user_id": user_id},
+        {"$setOnInsert": {"role": role, "joined_at": now, "name_key": name_key(name)}},
+        upsert=True
+    )
+    if result.upserted_id is None:
+        return False
+
+    db_manager.communities.update_one(
+        {"_id": community_id},
+        {"$inc": {"member_count": 1}, "$set": {"updated_at": now}}
+    )
+    event_broker.publish(user_channel(user_id), MEMBERSHIP_CHANGED, {"community_id": community_id, "member": True})
+    return True
+
+
+def remove_member(community_id: str, user_id: str) -> bool:
+    """
+    Remove a user from a community
+
+    Returns:
+        True if the user was a member
+    """
+    result = db_manager.community_members.delete_one({"community_id": community_id, "user_id": user_id})
+    if not result.deleted_count:
+        return False
+
+    db_manager.communities.update_one(
+        {"_id": community_id},
+        {"$inc": {"member_count": -1}, "$set": {"updated_at": datetime.now(timezone.utc)}}
+    )
+    event_broker.publish(user_channel(user_id), MEMBERSHIP_CHANGED, {"community_id": community_id, "member": False})
+    return True
+
+
+def sync_member_name(user_id: str, name: str):
+    """Keep the denormalized search key in step after a user is renamed"""
+    db_manager.community_members.update_many({"user_id": user_id}, {"$set": {"name_key": name_key(name)}})
+
+
+def load_parents(user_ids: List[str], projection: Dict[str, int]) -> Dict[str, dict]:
+    """
+    Resolve many parents with a single $in query
+
+    Parent IDs are stored either as strings or ObjectIds, so both forms are
+    queried. Returns {str(_id): parent}.
+    """
+    keys = list(user_ids)
+    keys += [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
+    if not keys:
+        return {}
+    return {str(p["_id"]): p for p in db_manager.parents.find({"_id": {"$in": keys}}, projection)}
+
+
+def is_member(community_id: str, user_id: str) -> bool:
+    """Indexed O(1) membership check"""
+    return db_manager.community_members.find_one(
+        {"community_id": community_id, "user_id": user_id},
+        {"_id": 1}
+    ) is not None
+
+
+def community_ids_for(user_id: str, role: str) -> List[str]:
+    """Communities whose activity a user follows: memberships for parents, every active one for staff"""
+    if role == "parent":
+        return [m["community_id"] for m in db_manager.community_members.find({"user_id": user_id}, {"community_id": 1})]
+    return [c["_id"] for c in db_manager.communities.find({"is_active": True}, {"_id": 1})]
+
+
+def backfill_member_names():
+    """Fill name_key on membership rows created before it existed (batched)"""
+    missing = list(db_manager.community_members.find({"name_key": {"$exists": False}}, {"user_id": 1}))
+    if not missing:
+        return
+    parents = load_parents(list({m["user_id"] for m in missing}), {"name": 1})
+    operations = [
+        UpdateOne({"_id": m["_id"]}, {"$set": {"name_key": name_key((parents.get(m["user_id"]) or {}).get("name"))}})
+        for m in missing
+    ]
+    db_manager.community_members.bulk_write(operations, ordered=False)
+    print(f"[MIGRATE] Backfilled name_key on {len(operations)} membership rows")
+
+
+def migrate_legacy_member_ids():
+    """
+    Move any remaining communities.member_ids arrays into community_members
+
+    Idempotent; runs at startup and is a no-op once every array is gone.
+    """
+    for community in db_manager.communities.find({"member_ids": {"$exists": True}}, {"member_ids": 1, "updated_at": 1}):
+        community_id = community["_id"]
+        joined_at = community.get("updated_at") or datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"community_id": community_id, "user_id": str(user_id)},
+                {"$setOnInsert": {"role": "parent", "joined_at": joined_at}},
+                upsert=True
+            )
+            for user_id in set(community.get("member_ids") or [])
+        ]
+        if operations:
+            db_manager.community_members.bulk_write(operations, ordered=False)
+
+        member_count = db_manager.community_members.count_documents({"community_id": community_id})
+        db_manager.communities.update_one(
+            {"_id": community_id},
+            {"$set": {"member_count": member_count}, "$unset": {"member_ids": ""}}
+        )
+        print(f"[MIGRATE] Community {community_id}: {member_count} members moved to community_members")
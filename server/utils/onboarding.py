@@ -0,0 +1,403 @@
+"""
+Bulk onboarding
+Imports therapists, parents and children from CSV or NDJSON. Rows are
+handled in batches of BULK_IMPORT_BATCH_SIZE: validated with the models of
+the single-record routes, checked for taken emails with one query per
+collection, numbered from one reserved ID block per prefix and written
+with one bulk_write per collection. bcrypt is CPU-bound, so passwords are
+hashed in a process pool; invited accounts (no password) share one
+placeholder hash of a discarded random secret. Children are linked to
+their parents with one $push per parent, and a batch's invitations are
+queued together.
+
+Every row produces one report entry, so the route can stream progress as
+batches finish. Children may name their parent by parent_email when the
+parent row comes earlier in the same import.
+"""
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from database import db_manager
+from models.child import BulkChildRow
+from models.doctor import DoctorCreate
+from models.parent import ParentCreate
+from utils.admin_stats import adjust_stats
+from utils.auth import hash_password
+from utils.avatars import store_avatar
+from utils.email import queue_invitation_emails
+from utils.ids import allocate_ids
+
+
+ROW_MODELS = {"therapist": DoctorCreate, "parent": ParentCreate, "child": BulkChildRow}
+ID_PREFIXES = {"therapist": "TH", "parent": "PA", "child": "CH"}
+# Accepted values of a row's "type" column
+TYPE_ALIASES = {"therapist": "therapist", "doctor": "therapist", "parent": "parent", "child": "child", "patient": "child"}
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        workers = settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        # spawn, not fork: a forked worker would inherit the MongoClient's threads
+        _hash_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """bcrypt-hash passwords in parallel worker processes"""
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(loop.run_in_executor(_pool(), hash_password, p) for p in passwords)))
+
+
+def stop_hash_pool():
+    """Shut down the hashing processes (they are started on first use)"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+def detect_format(content_type: Optional[str], body: bytes) -> str:
+    """"csv" or "ndjson", from the Content-Type or else the first byte"""
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "json" in content_type:
+        return "ndjson"
+    return "ndjson" if body.lstrip().startswith(b"{") else "csv"
+
+
+def parse_rows(body: bytes, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """
+    (row number, fields) per record
+
+    CSV rows are numbered from the first line after the header, NDJSON rows
+    by line. Empty CSV cells are dropped so optional fields take their
+    defaults; an unreadable NDJSON line yields {"_error": message}.
+    """
+    text = body.decode("utf-8-sig", errors="replace")
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            fields = {key.strip(): value.strip() for key, value in record.items()
+                      if key and isinstance(value, str) and value.strip()}
+            if fields:
+                yield number, fields
+        return
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield number, {"_error": f"Invalid JSON: {e}"}
+            continue
+        yield number, fields if isinstance(fields, dict) else {"_error": "Each line must be a JSON object"}
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        (f"{'.'.join(str(part) for part in e['loc'])}: " if e["loc"] else "") + e["msg"]
+        for e in error.errors()
+    )
+
+
+class BulkImport:
+    """
+    One import run
+
+    Remembers the emails and parents of earlier batches, so duplicates
+    across the whole file are caught and children can reference parents
+    created by it. With dry_run nothing is written and valid rows are
+    reported as "valid".
+    """
+
+    def __init__(self, default_type: Optional[str] = None, dry_run: bool = False):
+        self.default_type = default_type
+        self.dry_run = dry_run
+        self.seen_emails = set()
+        # email -> _id of parents created (or, in a dry run, validated) by this import
+        self.parents_by_email: Dict[str, object] = {}
+        self.created = {kind: 0 for kind in ROW_MODELS}
+        self.rows = 0
+        self.failed = 0
+        self._placeholder_hash: Optional[str] = None
+
+    def summary(self) -> dict:
+        return {"rows": self.rows, "created": self.created, "failed": self.failed, "dry_run": self.dry_run}
+
+    async def run(self, rows: Iterator[Tuple[int, dict]]) -> AsyncIterator[dict]:
+        """Report entries in row order, batch by batch, then {"summary": ...}"""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= settings.BULK_IMPORT_BATCH_SIZE:
+                for entry in await self._process(batch):
+                    yield entry
+                batch = []
+        if batch:
+            for entry in await self._process(batch):
+                yield entry
+        print(f"[BULK] Import finished: {self.summary()}")
+        yield {"summary": self.summary()}
+
+    async def _process(self, batch: List[Tuple[int, dict]]) -> List[dict]:
+        items = await asyncio.to_thread(self._prepare, batch)
+        if not self.dry_run:
+            await self._hash(items)
+            await asyncio.to_thread(self._write, items)
+        reports = [item["report"] for item in items]
+        self.rows += len(reports)
+        self.failed += sum(1 for r in reports if r["status"] not in ("created", "valid"))
+        return reports
+
+    # -- validation -------------------------------------------------------
+
+    def _prepare(self, batch: List[Tuple[int, dict]]) -> List[dict]:
+        """Validate a batch, resolve parents and assign IDs (no writes but avatars)"""
+        items = [self._validate(number, fields) for number, fields in batch]
+        self._check_emails(items)
+        if not self.dry_run:
+            self._store_photos(items)
+            self._assign_ids(items, ("therapist", "parent"))
+        self._resolve_parents(items)
+        if not self.dry_run:
+            self._assign_ids(items, ("child",))
+        for item in items:
+            if item["ok"] and self.dry_run:
+                item["report"]["status"] = "valid"
+        return items
+
+    def _validate(self, number: int, fields: dict) -> dict:
+        fields = dict(fields)
+        raw_type = fields.pop("type", None) or fields.pop("role", None) or self.default_type
+        kind = TYPE_ALIASES.get(str(raw_type or "").strip().lower())
+        item = {"kind": kind, "ok": False, "model": None, "report": {"row": number, "type": kind, "status": "invalid"}}
+        if "_error" in fields:
+            item["report"]["error"] = fields["_error"]
+            return item
+        if kind is None:
+            item["report"]["error"] = f"Unknown or missing type {raw_type!r} (therapist, parent or child)"
+            return item
+        if kind == "parent" and fields.get("children_ids"):
+            item["report"]["error"] = "children_ids is not imported; give each child row a parent_email instead"
+            return item
+        try:
+            item["model"] = ROW_MODELS[kind](**fields)
+        except ValidationError as e:
+            item["report"]["error"] = _validation_message(e)
+            return item
+        if kind != "child":
+            item["report"]["email"] = item["model"].email
+        item["ok"] = True
+        return item
+
+    def _fail(self, item: dict, status: str, error: str):
+        item["ok"] = False
+        item["report"].update(status=status, error=error)
+        item["report"].pop("id", None)
+        item["report"].pop("invitation_link", None)
+
+    def _check_emails(self, items: List[dict]):
+        """Reject emails already registered, or used by an earlier row of the import"""
+        users = [item for item in items if item["ok"] and item["kind"] != "child"]
+        emails = list({item["model"].email for item in users})
+        if not emails:
+            return
+        taken = {}
+        for collection, role in ((db_manager.doctors, "Therapist"), (db_manager.parents, "Parent")):
+            for doc in collection.find({"email": {"$in": emails}}, {"email": 1}):
+                taken[doc["email"]] = role
+        for item in users:
+            email = item["model"].email
+            if email in taken:
+                self._fail(item, "duplicate", f"Email is already registered as a {taken[email]}")
+            elif email in self.seen_emails:
+                self._fail(item, "duplicate", "Email appears earlier in the import")
+            else:
+                self.seen_emails.add(email)
+
+    def _store_photos(self, items: List[dict]):
+        for item in items:
+            if item["ok"] and item["kind"] == "therapist":
+                try:
+                    item["profile_photo"] = store_avatar(item["model"].profile_photo)
+                except ValueError:
+                    self._fail(item, "invalid", "Invalid profile photo")
+
+    def _assign_ids(self, items: List[dict], kinds: Tuple[str, ...]):
+        """Number the valid rows of each kind from one reserved block"""
+        collections = {"therapist": db_manager.doctors, "parent": db_manager.parents, "child": db_manager.children}
+        for kind in kinds:
+            pending = [item for item in items if item["ok"] and item["kind"] == kind]
+            for item, new_id in zip(pending, allocate_ids(collections[kind], ID_PREFIXES[kind], len(pending))):
+                item["id"] = new_id
+                item["report"]["id"] = new_id
+                if kind == "parent":
+                    self.parents_by_email[item["model"].email] = new_id
+
+    def _resolve_parents(self, items: List[dict]):
+        """Find each child's parent: earlier rows of the import, then the database"""
+        if self.dry_run:
+            for item in items:
+                if item["ok"] and item["kind"] == "parent":
+                    self.parents_by_email[item["model"].email] = None
+        children = [item for item in items if item["ok"] and item["kind"] == "child"]
+        if not children:
+            return
+        emails = list({c["model"].parent_email for c in children
+                       if c["model"].parent_email and c["model"].parent_email not in self.parents_by_email})
+        ids = list({c["model"].parent_id for c in children if c["model"].parent_id})
+        by_email, by_id = {}, {}
+        if emails:
+            for doc in db_manager.parents.find({"email": {"$in": emails}}, {"email": 1}):
+                by_email[doc["email"]] = doc["_id"]
+        if ids:
+            # Legacy parents may still have ObjectId keys
+            keys = ids + [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+            for doc in db_manager.parents.find({"_id": {"$in": keys}}, {"_id": 1}):
+                by_id[str(doc["_id"])] = doc["_id"]
+
+        for child in children:
+            model = child["model"]
+            if model.parent_id:
+                found = model.parent_id in by_id
+                parent_key = by_id.get(model.parent_id)
+            else:
+                found = model.parent_email in self.parents_by_email or model.parent_email in by_email
+                parent_key = self.parents_by_email.get(model.parent_email, by_email.get(model.parent_email))
+            if not found:
+                self._fail(child, "invalid", "Parent not found")
+                continue
+            child["parent_key"] = parent_key
+            child["report"]["parent_id"] = str(parent_key) if parent_key is not None else None
+
+    # -- writes -----------------------------------------------------------
+
+    async def _hash(self, items: List[dict]):
+        """Hash the given passwords in the pool; invited accounts get the placeholder"""
+        users = [item for item in items if item["ok"] and item["kind"] != "child"]
+        with_password = [item for item in users if item["model"].password]
+        for item, hashed in zip(with_password, await hash_passwords([item["model"].password for item in with_password])):
+            item["hashed_password"] = hashed
+        if len(with_password) < len(users):
+            if self._placeholder_hash is None:
+                self._placeholder_hash = (await hash_passwords([uuid.uuid4().hex]))[0]
+            for item in users:
+                item.setdefault("hashed_password", self._placeholder_hash)
+
+    def _document(self, item: dict, now: datetime) -> dict:
+        model, kind = item["model"], item["kind"]
+        if kind == "child":
+            return {
+                "_id": item["id"],
+                "name": model.name,
+                "age": model.age,
+                "gender": model.gender,
+                "condition": model.condition,
+                "school_name": model.school_name,
+                "parent_id": item["report"]["parent_id"],
+                "therapy_start_date": model.therapy_start_date,
+                "therapy_type": model.therapy_type,
+                "therapistId": None,
+                "therapistIds": [],
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now
+            }
+        doc = {
+            "_id": item["id"],
+            "name": model.name,
+            "email": model.email,
+            "hashed_password": item["hashed_password"],
+            "phone": model.phone,
+            "created_at": now,
+            "updated_at": now,
+            "is_active": bool(model.password),
+            "activation_token": str(uuid.uuid4())
+        }
+        if kind == "therapist":
+            doc.update(
+                specialization=model.specialization,
+                qualification=model.qualification,
+                experience_years=model.experience_years,
+                assigned_children=0,
+                profile_photo=item.get("profile_photo"),
+                license_number=model.license_number
+            )
+        else:
+            doc.update(address=model.address, children_ids=[], relationship=model.relationship)
+        return doc
+
+    def _insert(self, collection, items: List[dict], now: datetime) -> List[dict]:
+        """bulk_write the rows' documents; returns the rows that were stored"""
+        if not items:
+            return []
+        docs = [self._document(item, now) for item in items]
+        failed = {}
+        try:
+            collection.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+        stored = []
+        for index, (item, doc) in enumerate(zip(items, docs)):
+            if index in failed:
+                self._fail(item, "failed", failed[index])
+                continue
+            item["doc"] = doc
+            item["report"]["status"] = "created"
+            self.created[item["kind"]] += 1
+            stored.append(item)
+        return stored
+
+    def _write(self, items: List[dict]):
+        now = datetime.now(timezone.utc)
+        therapists = self._insert(db_manager.doctors, [i for i in items if i["ok"] and i["kind"] == "therapist"], now)
+        parents = self._insert(db_manager.parents, [i for i in items if i["ok"] and i["kind"] == "parent"], now)
+
+        # Children of parent rows that failed to insert cannot be linked
+        lost = {item["id"] for item in items if item["kind"] == "parent" and item.get("id") and not item["ok"]}
+        for email in [e for e, key in self.parents_by_email.items() if key in lost]:
+            del self.parents_by_email[email]
+        for item in items:
+            if item["ok"] and item["kind"] == "child" and item["parent_key"] in lost:
+                self._fail(item, "failed", "Parent row was not created")
+        children = self._insert(db_manager.children, [i for i in items if i["ok"] and i["kind"] == "child"], now)
+
+        by_parent: Dict[object, List[str]] = {}
+        for child in children:
+            by_parent.setdefault(child["parent_key"], []).append(child["id"])
+        if by_parent:
+            db_manager.parents.bulk_write(
+                [UpdateOne({"_id": key}, {"$push": {"children_ids": {"$each": ids}}}) for key, ids in by_parent.items()],
+                ordered=False
+            )
+
+        adjust_stats(therapist_count=len(therapists), parent_count=len(parents), child_count=len(children))
+
+        invitations = []
+        for item in therapists + parents:
+            if item["doc"]["is_active"]:
+                continue
+            link = f"{settings.FRONTEND_URL}/activate?token={item['doc']['activation_token']}&role={item['kind']}"
+            item["report"]["invitation_link"] = link
+            invitations.append({"email": item["doc"]["email"], "name": item["doc"]["name"], "role": item["kind"], "invitation_link": link})
+        if invitations:
+            queue_invitation_emails(invitations)
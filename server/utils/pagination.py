@@ -0,0 +1,51 @@
+"""
+Keyset pagination cursors
+A cursor is '<epoch millis>:<message id>' for the (timestamp, _id) position
+of a message; pages continue strictly before or after it.
+"""
+from datetime import datetime, timezone
+from typing import Any, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+def encode_cursor(message: dict) -> str:
+    """Opaque keyset cursor for a message"""
+    ts = message["timestamp"]
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return f"{int(ts.timestamp() * 1000)}:{message['_id']}"
+
+
+def decode_cursor(cursor: str, object_ids: bool = False) -> Tuple[datetime, Any]:
+    """
+    Inverse of encode_cursor; raises 400 on malformed input
+
+    Args:
+        object_ids: Return the message ID as an ObjectId (collections keyed by ObjectId)
+    """
+    try:
+        millis, message_id = cursor.split(":", 1)
+        ts = datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if object_ids and ObjectId.is_valid(message_id):
+        message_id = ObjectId(message_id)
+    return ts, message_id
+
+
+def _keyset(ts: datetime, message_id: Any, direction: int) -> dict:
+    op = "$lt" if direction == -1 else "$gt"
+    return {"$or": [{"timestamp": {op: ts}}, {"timestamp": ts, "_id": {op: message_id}}]}
+
+
+def keyset_filter(cursor: str, direction: int, object_ids: bool = False) -> dict:
+    """$or filter selecting messages strictly past the cursor in the given sort direction"""
+    ts, message_id = decode_cursor(cursor, object_ids)
+    return _keyset(ts, message_id, direction)
+
+
+def keyset_after(message: dict, direction: int) -> dict:
+    """Like keyset_filter, continuing past an already fetched message"""
+    return _keyset(message["timestamp"], message["_id"], direction)
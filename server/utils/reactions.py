@@ -0,0 +1,78 @@
+"""
+Atomic emoji reaction toggles shared by community and direct messages
+
+Message documents keep:
+  reactions:       { "emoji": [user_id, ...] }
+  reaction_counts: { "emoji": int }   (maintained alongside the user lists)
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+def validate_emoji(emoji: str) -> str:
+    """Reject values that cannot be used as a MongoDB field name"""
+    emoji = emoji.strip()
+    if not emoji or "." in emoji or emoji.startswith("$") or len(emoji) > 16:
+        raise HTTPException(status_code=400, detail="Invalid reaction emoji")
+    return emoji
+
+
+def toggle_reaction(collection: Collection, base_query: dict, emoji: str, user_id: str) -> Optional[dict]:
+    """
+    Add the user's reaction, or remove it if already present
+
+    Each branch is a single conditional update, so concurrent reactions on the
+    same message never overwrite one another.
+
+    Args:
+        collection: Messages collection
+        base_query: Filter selecting the (visible) message
+        emoji: Reaction emoji (already validated)
+        user_id: Reacting user
+
+    Returns:
+        {"emoji", "user_ids", "count", "reacted"} or None if no message matched
+    """
+    users_field = f"reactions.{emoji}"
+    count_field = f"reaction_counts.{emoji}"
+    projection = {users_field: 1, count_field: 1}
+
+    # Add when the user has not reacted with this emoji yet
+    doc = collection.find_one_and_update(
+        {**base_query, users_field: {"$ne": user_id}},
+        {"$addToSet": {users_field: user_id}, "$inc": {count_field: 1}},
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+    reacted = True
+    if doc is None:
+        # Otherwise remove it
+        doc = collection.find_one_and_update(
+            {**base_query, users_field: user_id},
+            {"$pull": {users_field: user_id}, "$inc": {count_field: -1}},
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+        reacted = False
+    if doc is None:
+        return None
+
+    user_ids = (doc.get("reactions") or {}).get(emoji, [])
+    count = (doc.get("reaction_counts") or {}).get(emoji, 0)
+
+    if not user_ids:
+        # Last reaction removed: drop the empty entry
+        collection.update_one(
+            {"_id": doc["_id"], users_field: {"$size": 0}},
+            {"$unset": {users_field: "", count_field: ""}}
+        )
+        count = 0
+    elif count != len(user_ids):
+        # Messages written before counts were maintained: resync this emoji
+        collection.update_one({"_id": doc["_id"]}, {"$set": {count_field: len(user_ids)}})
+        count = len(user_ids)
+
+    return {"emoji": emoji, "user_ids": user_ids, "count": count, "reacted": reacted}
@@ -0,0 +1,144 @@
+"""
+Chat message retention
+Messages older than MESSAGE_RETENTION_DAYS (direct messages only once
+read), and messages deleted for everyone more than DELETED_MESSAGE_GRACE_DAYS
+ago, move from the hot collections into compressed *_archive collections. Read paths go through
+tiered_find(), which continues into the archive when the hot tier runs out,
+so clients never see the boundary.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+
+from config import settings
+from database import db_manager
+
+
+# Messages moved per round trip
+ARCHIVE_BATCH_SIZE = 1000
+
+_retention_task: Optional[asyncio.Task] = None
+
+
+def archive_of(collection: Collection) -> Collection:
+    """Archive tier for a hot message collection"""
+    return db_manager.get_database()[f"{collection.name}_archive"]
+
+
+def _retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Messages older than this are due for the archive (None when retention is off)"""
+    if settings.MESSAGE_RETENTION_DAYS <= 0:
+        return None
+    return (now or datetime.now(timezone.utc)) - timedelta(days=settings.MESSAGE_RETENTION_DAYS)
+
+
+def _sort_value(value):
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return str(value)
+
+
+def tiered_find(collection: Collection, query: dict, sort: List[Tuple[str, int]], limit: int,
+                projection: Optional[dict] = None) -> List[dict]:
+    """
+    Find across the hot and archive tiers in sort order
+
+    Archived messages are older than the retention cutoff (apart from
+    soft-deleted rows, which read paths filter out), so a newest-first page
+    that stays on the near side of the cutoff comes from the hot tier alone.
+    Hot rows past the cutoff (unread direct messages, which are held back
+    from archiving) can interleave with archived ones, so any other page is
+    the merge of both tiers. sort starts with "timestamp" and uses one
+    direction throughout.
+    """
+    archive = archive_of(collection)
+    newest_first = sort[0][1] == -1
+    docs = list(collection.find(query, projection).sort(sort).limit(limit))
+    if newest_first and len(docs) >= limit:
+        cutoff = _retention_cutoff()
+        if cutoff is None or _sort_value(docs[-1]["timestamp"]) >= cutoff:
+            return docs
+
+    docs += list(archive.find(query, projection).sort(sort).limit(limit))
+    docs.sort(key=lambda doc: tuple(_sort_value(doc.get(field)) for field, _ in sort), reverse=newest_first)
+    return docs[:limit]
+
+
+def _archive_collection(collection: Collection, now: datetime, hold: Optional[dict] = None) -> int:
+    """
+    Move every expired message of one collection into its archive
+
+    Args:
+        hold: Extra condition a message past the retention cutoff must also
+            meet to be archived (messages deleted for everyone always go)
+    """
+    grace_cutoff = now - timedelta(days=settings.DELETED_MESSAGE_GRACE_DAYS)
+    expired = {"$or": [
+        {"timestamp": {"$lt": _retention_cutoff(now)}, **(hold or {})},
+        {"is_deleted": True, "deleted_at": {"$lt": grace_cutoff}}
+    ]}
+    archive = archive_of(collection)
+
+    moved = 0
+    while True:
+        batch = list(collection.find(expired).limit(ARCHIVE_BATCH_SIZE))
+        if not batch:
+            return moved
+        # Upsert first, delete second: a crash in between leaves a duplicate
+        # that the next run overwrites, never a lost message
+        archive.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": now}, upsert=True) for doc in batch],
+            ordered=False
+        )
+        collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        moved += len(batch)
+
+
+def run_retention() -> dict:
+    """
+    Archive expired community and direct messages
+
+    Returns:
+        {collection_name: messages_moved}
+    """
+    if settings.MESSAGE_RETENTION_DAYS <= 0:
+        return {}
+    now = datetime.now(timezone.utc)
+    result = {
+        db_manager.community_messages.name: _archive_collection(db_manager.community_messages, now),
+        # Unread DMs stay hot so the unread counters, reads and reactions
+        # (all hot-tier only) keep working; they are archived once read
+        db_manager.direct_messages.name: _archive_collection(
+            db_manager.direct_messages, now, hold={"read": {"$ne": False}}
+        )
+    }
+    if any(result.values()):
+        print(f"[RETENTION] Archived {result}")
+    return result
+
+
+async def _retention_loop():
+    while True:
+        try:
+            await asyncio.to_thread(run_retention)
+        except Exception as e:
+            print(f"[RETENTION] Run failed: {e}")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_MINUTES * 60)
+
+
+def start_retention():
+    """Schedule periodic archiving on the running event loop"""
+    global _retention_task
+    if settings.MESSAGE_RETENTION_DAYS > 0 and _retention_task is None:
+        _retention_task = asyncio.get_running_loop().create_task(_retention_loop())
+
+
+def stop_retention():
+    """Cancel the periodic archiving task"""
+    global _retention_task
+    if _retention_task is not None:
+        _retention_task.cancel()
+        _retention_task = None
@@ -0,0 +1,86 @@
+"""
+Message search
+Both message collections carry a MongoDB text index on "content"; this
+module runs ranked $text queries against them and builds highlight spans
+for the matched words.
+"""
+import re
+from typing import List, Tuple
+
+from pymongo.collection import Collection
+
+from utils.retention import archive_of
+
+
+# Characters of context kept on each side of the first match in a snippet
+SNIPPET_CONTEXT = 60
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(q: str) -> List[str]:
+    """Words to highlight: every word in the query, negated terms excluded"""
+    terms = []
+    for token in q.split():
+        if token.startswith("-"):
+            continue
+        terms += [t.lower() for t in _TERM.findall(token)]
+    return list(dict.fromkeys(terms))
+
+
+def highlight(content: str, terms: List[str]) -> Tuple[List[List[int]], str]:
+    """
+    Locate matched words in a message
+
+    The text index stems words ("sleeping" matches "sleep"), so a term
+    highlights any word that starts with it.
+
+    Returns:
+        ([[start, end], ...] offsets into content, snippet around the first match)
+    """
+    if not terms:
+        return [], content[:2 * SNIPPET_CONTEXT]
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    spans = [[m.start(), m.end()] for m in pattern.finditer(content)]
+
+    if not spans:
+        return [], content[:2 * SNIPPET_CONTEXT]
+    start = max(spans[0][0] - SNIPPET_CONTEXT, 0)
+    end = min(spans[0][1] + SNIPPET_CONTEXT, len(content))
+    snippet = ("…" if start else "") + content[start:end] + ("…" if end < len(content) else "")
+    return spans, snippet
+
+
+def search_messages(collection: Collection, q: str, visibility: dict, limit: int, offset: int = 0) -> List[dict]:
+    """
+    Ranked full-text search
+
+    Args:
+        collection: Messages collection with a text index on content
+        q: MongoDB $search string (supports "phrases" and -negation)
+        visibility: Filter restricting results to messages the user may see
+        limit: Page size
+        offset: Rows to skip (relevance order has no stable keyset cursor)
+
+    Returns:
+        Matching documents, best first (hot tier before archive), each with
+        "score", "highlights" and "snippet"
+    """
+    query = {"$text": {"$search": q}, **visibility}
+    projection = {"score": {"$meta": "textScore"}, "reactions": 0}
+    sort = [("score", {"$meta": "textScore"}), ("timestamp", -1)]
+
+    docs = list(collection.find(query, projection).sort(sort).skip(offset).limit(limit))
+    if len(docs) < limit:
+        # Hot matches ran out: continue with archived messages
+        archive_offset = max(offset - collection.count_documents(query), 0) if offset else 0
+        docs += list(
+            archive_of(collection).find(query, projection).sort(sort).skip(archive_offset).limit(limit - len(docs))
+        )
+
+    terms = query_terms(q)
+    results = []
+    for doc in docs:
+        doc["highlights"], doc["snippet"] = highlight(doc.get("content", ""), terms)
+        results.append(doc)
+    return results
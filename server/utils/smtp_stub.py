@@ -0,0 +1,109 @@
+"""
+Local SMTP stand-in
+A minimal in-process SMTP server for development and tests. With
+SMTP_STUB=true the app starts it on 127.0.0.1:SMTP_STUB_PORT and the mail
+worker delivers there instead of the real relay; received messages are
+kept in memory (captured_messages()) and logged, never forwarded.
+
+Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET,
+NOOP and QUIT. No TLS or AUTH.
+"""
+import asyncio
+from collections import deque
+from email import message_from_bytes
+from typing import List, Optional
+
+from config import settings
+
+
+# Messages kept in memory (oldest dropped first)
+CAPTURE_LIMIT = 500
+
+_captured: deque = deque(maxlen=CAPTURE_LIMIT)
+_server: Optional[asyncio.AbstractServer] = None
+
+
+def captured_messages() -> List[dict]:
+    """Messages received so far: {"mail_from", "rcpt_to", "subject", "data"}"""
+    return list(_captured)
+
+
+def clear_captured():
+    _captured.clear()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    async def reply(line: str):
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    mail_from, rcpt_to = None, []
+    await reply("220 localhost SMTP stand-in ready")
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            verb = line[:4].upper()
+            if verb == "EHLO":
+                await reply("250-localhost")
+                await reply("250 8BITMIME")
+            elif verb == "HELO":
+                await reply("250 localhost")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = line[10:].strip(), []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(line[8:].strip())
+                await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = await reader.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    # Undo dot-stuffing
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                data = b"".join(lines)
+                subject = message_from_bytes(data).get("Subject", "")
+                _captured.append({"mail_from": mail_from, "rcpt_to": rcpt_to, "subject": subject, "data": data})
+                print(f"[SMTP-STUB] Captured \"{subject}\" for {', '.join(rcpt_to)}")
+                mail_from, rcpt_to = None, []
+                await reply("250 OK: queued")
+            elif verb == "RSET":
+                mail_from, rcpt_to = None, []
+                await reply("250 OK")
+            elif verb == "NOOP":
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_smtp_stub():
+    """Listen on 127.0.0.1:SMTP_STUB_PORT when SMTP_STUB is enabled"""
+    global _server
+    if settings.SMTP_STUB and _server is None:
+        try:
+            _server = await asyncio.start_server(_handle, "127.0.0.1", settings.SMTP_STUB_PORT)
+        except OSError as e:
+            # Another worker process already runs the stand-in on this port
+            print(f"[SMTP-STUB] Not started ({e}); using the existing listener")
+            return
+        print(f"[SMTP-STUB] Capturing outbound mail on 127.0.0.1:{settings.SMTP_STUB_PORT}")
+
+
+async def stop_smtp_stub():
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
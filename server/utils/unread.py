@@ -0,0 +1,193 @@
+"""
+Maintained direct-message unread counters
+One small document per user in dm_unread_counters:
+  { "_id": user_id, "total": int, "threads": { "<thread key>": int } }
+Write paths adjust it atomically with $inc and push an "unread.changed"
+event to the user's channel; a periodic reconciliation recounts from
+direct_messages to repair any drift.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from config import settings
+from database import db_manager
+from utils.events import event_broker, user_channel
+from utils.hidden import DIRECT_SCOPE, unhidden_stages
+
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def _thread_key(thread_id: str) -> str:
+    """Thread ID made safe for use as a field name"""
+    return str(thread_id).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _thread_id(key: str) -> str:
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def adjust_unread(user_id: str, thread_id: str, delta: int):
+    """
+    Add delta to a user's unread counters (total and per thread)
+
+    Decrements are clamped at zero so a double-counted read can never push
+    the badge negative; reconciliation repairs the rest.
+    """
+    if not delta:
+        return
+    field = f"threads.{_thread_key(thread_id)}"
+    now = datetime.now(timezone.utc)
+    if delta > 0:
+        update = {"$inc": {"total": delta, field: delta}, "$set": {"updated_at": now}}
+    else:
+        update = [{"$set": {
+            "total": {"$max": [0, {"$add": [{"$ifNull": ["$total", 0]}, delta]}]},
+            field: {"$max": [0, {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}]},
+            "updated_at": now
+        }}]
+    doc = db_manager.dm_unread_counters.find_one_and_update(
+        {"_id": user_id},
+        update,
+        projection={"total": 1},
+        upsert=delta > 0,
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is not None:
+        event_broker.publish(user_channel(user_id), "unread.changed", {
+            "thread_id": thread_id,
+            "delta": delta,
+            "total": doc.get("total", 0)
+        })
+
+
+def _count_unread(user_id: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Recount unread messages from direct_messages: {user_id: {thread_id: n}}
+
+    Messages the recipient has hidden are left out (they came off the
+    counters when they were hidden).
+    """
+    match = {"read": False, "is_deleted": {"$ne": True}}
+    if user_id:
+        match["recipient_id"] = user_id
+    counts: Dict[str, Dict[str, int]] = {}
+    pipeline = [
+        {"$match": match},
+        *unhidden_stages({"$toString": "$recipient_id"}, DIRECT_SCOPE),
+        {"$group": {"_id": {"user": "$recipient_id", "thread": "$thread_id"}, "n": {"$sum": 1}}}
+    ]
+    for row in db_manager.direct_messages.aggregate(pipeline):
+        counts.setdefault(str(row["_id"]["user"]), {})[str(row["_id"].get("thread"))] = row["n"]
+    return counts
+
+
+def _counter_doc(user_id: str, threads: Dict[str, int], now: datetime) -> dict:
+    return {
+        "_id": user_id,
+        "total": sum(threads.values()),
+        "threads": {_thread_key(t): n for t, n in threads.items()},
+        "updated_at": now,
+        "reconciled_at": now
+    }
+
+
+def reconcile_user(user_id: str) -> dict:
+    """
+    Count one user's unread messages into a new counter document
+
+    Only inserts: if adjust_unread created the document meanwhile, that
+    one (with its increments) is kept and returned.
+    """
+    threads = _count_unread(user_id).get(user_id, {})
+    doc = _counter_doc(user_id, threads, datetime.now(timezone.utc))
+    return db_manager.dm_unread_counters.find_one_and_update(
+        {"_id": user_id},
+        {"$setOnInsert": doc},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def get_unread(user_id: str) -> dict:
+    """
+    Current counters for a user: {"total": int, "threads": {thread_id: int}}
+
+    One primary-key read; users without a counter document yet are counted
+    once and the result stored.
+    """
+    doc = db_manager.dm_unread_counters.find_one({"_id": user_id}, {"total": 1, "threads": 1})
+    if doc is None:
+        doc = reconcile_user(user_id)
+    return {
+        "total": max(doc.get("total", 0), 0),
+        "threads": {_thread_id(k): n for k, n in (doc.get("threads") or {}).items() if n > 0}
+    }
+
+
+def reconcile_unread_counters() -> int:
+    """
+    Recount every user's unread messages and correct drifted counters
+
+    Counters are read before counting and each correction is a
+    $set guarded by the updated_at/total that was read, so a counter that
+    adjust_unread touched during the recount is left for the next round
+    instead of losing that $inc. Returns the number of counters corrected.
+    """
+    now = datetime.now(timezone.utc)
+    stored = {
+        doc["_id"]: doc
+        for doc in db_manager.dm_unread_counters.find({}, {"total": 1, "threads": 1, "updated_at": 1})
+    }
+    counts = _count_unread()
+
+    operations = []
+    for user_id in set(stored) | set(counts):
+        threads = {t: n for t, n in counts.get(user_id, {}).items() if n > 0}
+        expected = _counter_doc(user_id, threads, now)
+        current = stored.get(user_id)
+        if current is None:
+            # Created by nobody yet; if adjust_unread creates it first, keep that
+            operations.append(UpdateOne({"_id": user_id}, {"$setOnInsert": expected}, upsert=True))
+            continue
+        current_threads = {k: n for k, n in (current.get("threads") or {}).items() if n}
+        if current.get("total") != expected["total"] or current_threads != expected["threads"]:
+            expected.pop("_id")
+            operations.append(UpdateOne(
+                {"_id": user_id, "updated_at": current.get("updated_at"), "total": current.get("total")},
+                {"$set": expected}
+            ))
+
+    corrected = 0
+    if operations:
+        result = db_manager.dm_unread_counters.bulk_write(operations, ordered=False)
+        corrected = result.modified_count + result.upserted_count
+        print(f"[UNREAD] Reconciled {corrected} drifted unread counters")
+    return corrected
+
+
+async def _reconcile_loop():
+    while True:
+        await asyncio.sleep(settings.UNREAD_RECONCILE_MINUTES * 60)
+        try:
+            await asyncio.to_thread(reconcile_unread_counters)
+        except Exception as e:
+            print(f"[UNREAD] Reconciliation failed: {e}")
+
+
+def start_reconciliation():
+    """Schedule periodic counter reconciliation on the running event loop"""
+    global _reconcile_task
+    if settings.UNREAD_RECONCILE_MINUTES > 0 and _reconcile_task is None:
+        _reconcile_task = asyncio.get_running_loop().create_task(_reconcile_loop())
+
+
+def stop_reconciliation():
+    """Cancel the periodic reconciliation task"""
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        _reconcile_task = None
@@ -0,0 +1,173 @@
+"""
+Resumable uploads
+A client opens a session, then PUTs the file's bytes in one or more parts,
+each with a Content-Range. Parts are cut into fixed-size GridFS chunks and
+written straight into the document_blobs bucket under the session's ID, so
+a request holds at most one chunk in memory and nothing is copied when the
+upload ends. Only whole chunks count as received; an interrupted part is
+resumed from the session's "received" offset.
+
+When the last byte arrives the stored chunks are hashed: new content
+becomes a blob (the session's chunks plus a files document), content that
+is already stored is dropped in favour of the existing copy.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database import db_manager
+from utils.blobs import BUCKET_NAME, DEFAULT_CONTENT_TYPE, blob_url, find_blob
+
+
+# GridFS chunk size of uploaded blobs; parts are committed in whole chunks
+CHUNK_SIZE = 256 * 1024
+# Suggested part size for clients (a multiple of CHUNK_SIZE)
+PART_SIZE = 16 * CHUNK_SIZE
+# A finalize claim not completed within this time can be taken over
+FINALIZE_LOCK_MINUTES = 10
+
+
+def _chunks():
+    return db_manager.get_database()[f"{BUCKET_NAME}.chunks"]
+
+
+def _files():
+    return db_manager.get_database()[f"{BUCKET_NAME}.files"]
+
+
+def create_session(user_id: str, filename: str, size: int, content_type: Optional[str]) -> dict:
+    """Open an upload session for a file of a known size"""
+    now = datetime.now(timezone.utc)
+    session = {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "filename": filename,
+        "size": size,
+        "content_type": content_type or DEFAULT_CONTENT_TYPE,
+        "received": 0,
+        "status": "open",
+        "created_at": now,
+        "expires_at": now + timedelta(hours=settings.UPLOAD_SESSION_HOURS)
+    }
+    db_manager.upload_sessions.insert_one(session)
+    return session
+
+
+def get_session(upload_id: str, user_id: str) -> Optional[dict]:
+    """A caller's own session, or None"""
+    if not ObjectId.is_valid(upload_id):
+        return None
+    return db_manager.upload_sessions.find_one({"_id": ObjectId(upload_id), "user_id": user_id})
+
+
+def commit_chunk(session: dict, offset: int, data: bytes) -> bool:
+    """
+    Store one chunk at offset and advance the session past it
+
+    Offsets are chunk-aligned; rewriting a chunk (a retried part) is
+    harmless. Returns False if another request moved the session first.
+    """
+    _chunks().replace_one(
+        {"files_id": session["_id"], "n": offset // CHUNK_SIZE},
+        {"files_id": session["_id"], "n": offset // CHUNK_SIZE, "data": data},
+        upsert=True
+    )
+    result = db_manager.upload_sessions.update_one(
+        {"_id": session["_id"], "status": "open", "received": offset},
+        {"$set": {"received": offset + len(data)}}
+    )
+    return result.modified_count == 1
+
+
+def finalize(session_id: ObjectId) -> dict:
+    """
+    Hash the received chunks and turn them into a blob (or drop them as a duplicate)
+
+    Only one request finalizes a session: it first moves the session from
+    "open" to "finalizing" (a claim that expires after FINALIZE_LOCK_MINUTES
+    in case that request dies). Blocking; call it off the event loop.
+
+    Returns:
+        The session: complete, with its "document" reference, or still
+        "finalizing" if another request holds the claim
+    """
+    now = datetime.now(timezone.utc)
+    session = db_manager.upload_sessions.find_one_and_update(
+        {"_id": session_id, "$or": [
+            {"status": "open"},
+            {"status": "finalizing", "finalizing_at": {"$lt": now - timedelta(minutes=FINALIZE_LOCK_MINUTES)}}
+        ]},
+        {"$set": {"status": "finalizing", "finalizing_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if session is None:
+        return db_manager.upload_sessions.find_one({"_id": session_id})
+
+    digest = hashlib.sha256()
+    cursor = _chunks().find({"files_id": session_id}, {"data": 1, "_id": 0}).sort("n", 1).batch_size(16)
+    for chunk in cursor:
+        digest.update(chunk["data"])
+    sha256 = digest.hexdigest()
+
+    existing = find_blob(sha256)
+    if existing is None:
+        try:
+            _files().insert_one({
+                "_id": session_id,
+                "length": session["size"],
+                "chunkSize": CHUNK_SIZE,
+                "uploadDate": datetime.now(timezone.utc),
+                "filename": session["filename"],
+                "metadata": {"sha256": sha256, "content_type": session["content_type"]}
+            })
+        except DuplicateKeyError:
+            # The same content was stored concurrently (or by an earlier,
+            # interrupted finalize of this very session)
+            existing = find_blob(sha256)
+    # Our chunks are only redundant if another files document owns the content
+    deduplicated = existing is not None and existing["_id"] != session_id
+    if deduplicated:
+        _chunks().delete_many({"files_id": session_id})
+
+    content_type = (existing or {}).get("metadata", {}).get("content_type", session["content_type"])
+    document = {
+        "name": session["filename"],
+        "blob_id": sha256,
+        "size": session["size"],
+        "content_type": content_type,
+        "url": blob_url(sha256)
+    }
+    return db_manager.upload_sessions.find_one_and_update(
+        {"_id": session_id},
+        {"$set": {"status": "complete", "document": document, "deduplicated": deduplicated},
+         "$unset": {"finalizing_at": ""}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def purge_stale_uploads() -> int:
+    """
+    Drop expired sessions; unfinished ones take their chunks with them
+
+    Completed sessions' chunks belong to a blob and are left alone.
+    """
+    expired = list(db_manager.upload_sessions.find(
+        {"expires_at": {"$lt": datetime.now(timezone.utc)}},
+        {"status": 1}
+    ))
+    if not expired:
+        return 0
+    unfinished = [s["_id"] for s in expired if s.get("status") != "complete"]
+    # A session that died while finalizing may already own a files document
+    owned = {f["_id"] for f in _files().find({"_id": {"$in": unfinished}}, {"_id": 1})} if unfinished else set()
+    unfinished = [session_id for session_id in unfinished if session_id not in owned]
+    if unfinished:
+        _chunks().delete_many({"files_id": {"$in": unfinished}})
+    db_manager.upload_sessions.delete_many({"_id": {"$in": [s["_id"] for s in expired]}})
+    print(f"[UPLOADS] Purged {len(expired)} expired upload sessions ({len(unfinished)} unfinished)")
+    return len(expired)
@@ -18,6 +18,7 @@ import {
 } from 'lucide-react';
 import { Button } from './ui/Button';
 import { communityAPI } from '../lib/api';
+import { applyReactionChange } from '../lib/utils';
 import { useApp } from '../lib/context';
 
 // Message Bubble Component
@@ -393,7 +394,7 @@ const CommunityChat = ({ communityId, currentUserId, currentUserName, currentUse
 
             // Load members
             const membersData = await communityAPI.getMembers(communityId);
-            setMembers(membersData || []);
+            setMembers(membersData?.members || []);
 
             setLoading(false);
             setTimeout(scrollToBottom, 100);
@@ -411,51 +412,63 @@ const CommunityChat = ({ communityId, currentUserId, currentUserName, currentUse
         }
     }, [communityId]);
 
-    // Poll for new messages every 60 seconds (Reduced to clean up logs)
+    // Live updates over SSE; fall back to polling every 60 seconds if the stream fails
     useEffect(() => {
         if (!communityId) return;
 
         const pollMessages = async () => {
             try {
                 const messagesData = await communityAPI.getMessages(communityId, 100, 0);
-                const newMessages = messagesData.messages || [];
+                setMessages(messagesData.messages || []);
+            } catch (err) {
+                console.error('Failed to poll messages:', err);
+            }
+        };
 
-                // Update if count changed OR reactions changed on any message
+        const stream = communityAPI.subscribe(communityId, {
+            'message.created': ({ data }) => {
                 setMessages(prev => {
-                    if (newMessages.length > prev.length) {
-                        const latest = newMessages[newMessages.length - 1];
-                        if (latest.sender_id !== currentUserId && prev.length > 0) {
-                            setNotification({
-                                title: `New message from ${latest.sender_name}`,
-                                content: latest.content.substring(0, 50) + (latest.content.length > 50 ? '...' : '')
-                            });
-                            setTimeout(() => setNotification(null), 3000);
-                        }
-                        return newMessages;
-                    }
-
-                    // Check if reactions changed on any existing message
-                    const reactionsChanged = newMessages.some((msg, idx) => {
-                        if (idx >= prev.length) return false;
-                        return JSON.stringify(msg.reactions || {}) !== JSON.stringify(prev[idx].reactions || {});
-                    });
-
-                    if (reactionsChanged) {
-                        return newMessages;
+                    if (prev.some(m => m.id === data.id)) return prev;
+                    if (data.sender_id !== currentUserId) {
+                        setNotification({
+                            title: `New message from ${data.sender_name}`,
+                            content: data.content.substring(0, 50) + (data.content.length > 50 ? '...' : '')
+                        });
+                        setTimeout(() => setNotification(null), 3000);
                     }
-
-                    return prev;
+                    return [...prev, data];
                 });
-            } catch (err) {
-                console.error('Failed to poll messages:', err);
+            },
+            'message.reaction': ({ data }) => {
+                setMessages(prev => prev.map(m =>
+                    m.id === data.message_id ? { ...m, reactions: applyReactionChange(m.reactions, data) } : m
+                ));
+            },
+            'message.deleted': ({ data }) => {
+                setMessages(prev => prev.filter(m => m.id !== data.message_id));
+            },
+            // Missed events were no longer held for replay; reload instead
+            resync: () => pollMessages(),
+            error: () => {
+                // EventSource retries on its own; keep a slow poll running meanwhile
+                if (!pollIntervalRef.current) {
+                    pollIntervalRef.current = setInterval(pollMessages, 60000);
+                }
+            }
+        });
+        stream.onopen = () => {
+            if (pollIntervalRef.current) {
+                clearInterval(pollIntervalRef.current);
+                pollIntervalRef.current = null;
+                pollMessages();
             }
         };
 
-        pollIntervalRef.current = setInterval(pollMessages, 60000);
-
         return () => {
+            stream.close();
             if (pollIntervalRef.current) {
                 clearInterval(pollIntervalRef.current);
+                pollIntervalRef.current = null;
             }
         };
     }, [communityId, currentUserId]);
@@ -484,7 +497,7 @@ const CommunityChat = ({ communityId, currentUserId, currentUserName, currentUse
             const sentMessage = await communityAPI.sendMessage(communityId, newMessage.trim());
 
             // Add message to local state immediately
-            setMessages(prev => [...prev, sentMessage]);
+            setMessages(prev => prev.some(m => m.id === sentMessage.id) ? prev : [...prev, sentMessage]);
             setNewMessage('');
             scrollToBottom();
         } catch (err) {
@@ -497,13 +510,15 @@ const CommunityChat = ({ communityId, currentUserId, currentUserName, currentUse
 
     const handleReact = async (messageId, emoji) => {
         try {
-            const updatedMessage = await communityAPI.reactToMessage(communityId, messageId, emoji);
-            setMessages(prev => prev.map(m => m.id === messageId ? updatedMessage : m));
+            const change = await communityAPI.reactToMessage(communityId, messageId, emoji);
+            setMessages(prev => prev.map(m =>
+                m.id === messageId ? { ...m, reactions: applyReactionChange(m.reactions, change) } : m
+            ));
 
             // Refresh members list since reacting may auto-join a parent
             try {
                 const membersData = await communityAPI.getMembers(communityId);
-                setMembers(membersData || []);
+                setMembers(membersData?.members || []);
             } catch (_) { /* silently ignore member refresh failure */ }
         } catch (err) {
             console.error('Failed to react:', err);
@@ -35,7 +35,7 @@ import {
 import { useNavigate } from 'react-router-dom';
 import { Card, CardContent, CardHeader, CardTitle } from '../ui/Card';
 import { Button } from '../ui/Button';
-import { userManagementAPI } from '../../lib/api';
+import { userManagementAPI, avatarUrl } from '../../lib/api';
 import { useApp } from '../../lib/context';
 
 const UserManagement = () => {
@@ -173,7 +173,7 @@ const UserManagement = () => {
 
     const fetchChildren = async () => {
         try {
-            const data = await userManagementAPI.listChildren();
+            const data = await userManagementAPI.listAllChildren();
             setChildrenList(data);
         } catch (error) {
             console.error('Failed to fetch children:', error);
@@ -1140,7 +1140,7 @@ const UserManagement = () => {
                                             : 'bg-pink-50 text-pink-600 border border-pink-100'
                                             }`}>
                                             {activeTab === 'therapists' && user.profile_photo ? (
-                                                <img src={user.profile_photo} alt={user.name} className="w-full h-full object-cover" />
+                                                <img src={avatarUrl(user.profile_photo)} alt={user.name} className="w-full h-full object-cover" />
                                             ) : (
                                                 user.name.charAt(0)
                                             )}
@@ -1500,7 +1500,7 @@ const UserManagement = () => {
                                                 <div className="flex items-center gap-4">
                                                     {editingUser.profile_photo && (
                                                         <div className="h-14 w-14 rounded-2xl border-2 border-primary-100 overflow-hidden bg-neutral-100 flex-shrink-0 shadow-sm">
-                                                            <img src={editingUser.profile_photo} alt="Preview" className="w-full h-full object-cover" />
+                                                            <img src={avatarUrl(editingUser.profile_photo)} alt="Preview" className="w-full h-full object-cover" />
                                                         </div>
                                                     )}
                                                     <label className="flex-1 flex items-center justify-center gap-3 px-5 py-4 bg-neutral-50/50 border-2 border-neutral-200 border-dashed rounded-2xl hover:bg-white hover:border-primary-400 hover:shadow-md transition-all cursor-pointer group">
@@ -5,7 +5,7 @@ import { cn } from '../../lib/utils';
 import { Button } from '../ui/Button';
 import { useApp } from '../../lib/context';
 import ProfileEditModal from './ProfileEditModal';
-import { parentAuthAPI, doctorAuthAPI } from '../../lib/api';
+import { parentAuthAPI, doctorAuthAPI, uploadsAPI, documentUrl } from '../../lib/api';
 
 const DashboardLayout = ({ children, title, sidebarItems, roleColor = "bg-primary-700", onLogout }) => {
     const [isSidebarOpen, setSidebarOpen] = useState(false);
@@ -27,14 +27,27 @@ const DashboardLayout = ({ children, title, sidebarItems, roleColor = "bg-primar
             // Remove large fields like document and avatar before storing in localStorage
             // We keep the full updatedData for the API call, but sanitize for local storage
             // We keep the full updatedData for the API call, but include basic fields for local storage
-            const { document, documentName, ...sanitizedData } = updatedData;
+            const { documentFile, documentName, ...sanitizedData } = updatedData;
 
             if (currentUser?.role === 'parent') {
                 const parentToken = localStorage.getItem('parent_token');
                 if (parentToken) {
+                    // Upload the document first; the profile update only carries its reference
+                    let uploadedDoc = null;
+                    if (documentFile) {
+                        try {
+                            uploadedDoc = await uploadsAPI.upload(documentFile, { name: documentName });
+                        } catch (uploadError) {
+                            console.error('Document upload failed:', uploadError);
+                        }
+                    }
+
                     // Update parent profile via API
                     try {
-                        const freshProfile = await parentAuthAPI.updateProfile(updatedData);
+                        const freshProfile = await parentAuthAPI.updateProfile({
+                            ...sanitizedData,
+                            ...(uploadedDoc && { documentBlobId: uploadedDoc.blob_id, documentName })
+                        });
                         // Update localStorage with fresh data from server
                         localStorage.setItem('parent_data', JSON.stringify(freshProfile));
                     } catch (apiError) {
@@ -45,16 +58,17 @@ const DashboardLayout = ({ children, title, sidebarItems, roleColor = "bg-primar
                     }
 
                     // Link document to child if uploaded
-                    if (updatedData.document && updatedData.documentName && currentUser.childId) {
+                    if (uploadedDoc && currentUser.childId) {
                         addDocument({
                             childId: currentUser.childId,
-                            title: updatedData.documentName,
+                            title: documentName,
                             type: 'Parent Upload',
                             category: 'Parent Documents',
-                            format: updatedData.documentName.split('.').pop() || 'pdf',
+                            format: documentName.split('.').pop() || 'pdf',
                             uploadedBy: currentUser.name,
-                            fileSize: 'Managed via Profile',
-                            url: updatedData.document
+                            fileSize: (uploadedDoc.size / (1024 * 1024)).toFixed(2) + ' MB',
+                            blob_id: uploadedDoc.blob_id,
+                            url: documentUrl(uploadedDoc)
                         });
                     }
 
@@ -66,7 +80,7 @@ const DashboardLayout = ({ children, title, sidebarItems, roleColor = "bg-primar
                 if (doctorToken) {
                     // Update doctor/therapist profile via API
                     try {
-                        const freshProfile = await doctorAuthAPI.updateProfile(updatedData);
+                        const freshProfile = await doctorAuthAPI.updateProfile(sanitizedData);
                         // Update localStorage with fresh data from server
                         localStorage.setItem('doctor_data', JSON.stringify(freshProfile));
                     } catch (apiError) {
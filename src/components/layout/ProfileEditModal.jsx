@@ -198,12 +198,8 @@ const ProfileEditModal = ({ user, onClose, onSave }) => {
                                     <input type="file" className="hidden" onChange={(e) => {
                                         const file = e.target.files[0];
                                         if (file) {
-                                            // Handle file selection
-                                            const reader = new FileReader();
-                                            reader.onloadend = () => {
-                                                setFormData(prev => ({ ...prev, document: reader.result, documentName: file.name }));
-                                            };
-                                            reader.readAsDataURL(file);
+                                            // Keep the File itself; it is uploaded on save
+                                            setFormData(prev => ({ ...prev, documentFile: file, documentName: file.name }));
                                         }
                                     }} />
                                 </label>
@@ -9,6 +9,64 @@ export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:80
 
 
 
+/**
+ * Browser-openable URL for a document.
+ * Blob-store references get the API base and the stored JWT (links and
+ * viewers cannot send headers); legacy documents fall back to inline data.
+ * @param {Object} doc - Document reference
+ * @returns {string|null}
+ */
+export const documentUrl = (doc) => {
+    if (doc?.blob_id && doc.url) {
+        const token = localStorage.getItem('doctor_token') ||
+            localStorage.getItem('admin_token') ||
+            localStorage.getItem('parent_token');
+        return `${API_BASE_URL}${doc.url}?token=${encodeURIComponent(token || '')}`;
+    }
+    return doc?.url || doc?.content || null;
+};
+
+/**
+ * Browser-loadable avatar URL. Stored images come back as hash paths
+ * (/api/avatars/<sha256>, cacheable and public), which need the API base.
+ * @param {string} value - Avatar/profile_photo field
+ * @returns {string|null}
+ */
+export const avatarUrl = (value) => {
+    if (!value) return null;
+    return value.startsWith('/api/avatars/') ? `${API_BASE_URL}${value}` : value;
+};
+
+/**
+ * Open a Server-Sent Events stream with the stored JWT.
+ * EventSource cannot send headers, so the token goes in the query string.
+ * @param {string} path - Stream endpoint path
+ * @param {Object} handlers - Map of event type -> callback(eventEnvelope)
+ * @returns {EventSource}
+ */
+export const openEventStream = (path, handlers = {}) => {
+    const token = localStorage.getItem('doctor_token') ||
+        localStorage.getItem('admin_token') ||
+        localStorage.getItem('parent_token');
+    const separator = path.includes('?') ? '&' : '?';
+    const source = new EventSource(`${API_BASE_URL}${path}${separator}token=${encodeURIComponent(token || '')}`);
+
+    Object.entries(handlers).forEach(([type, callback]) => {
+        if (type === 'error') {
+            source.onerror = callback;
+            return;
+        }
+        source.addEventListener(type, (e) => {
+            try {
+                callback(JSON.parse(e.data));
+            } catch (err) {
+                console.error(`Failed to handle ${type} event:`, err);
+            }
+        });
+    });
+    return source;
+};
+
 // Create axios instance with default config
 const apiClient = axios.create({
     baseURL: API_BASE_URL,
@@ -342,14 +400,17 @@ export const communityAPI = {
      * Get community messages with pagination
      * @param {string} communityId - Community ID
      * @param {number} limit - Number of messages to fetch
-     * @param {number} offset - Offset for pagination
+     * @param {number} offset - Deprecated offset; prefer cursors
+     * @param {Object} cursors - { before, after } keyset cursors (next_before/next_after from a previous page)
      * @returns {Promise} - Messages list response
      */
-    getMessages: async (communityId, limit = 50, offset = 0) => {
+    getMessages: async (communityId, limit = 50, offset = 0, cursors = {}) => {
         try {
-            const response = await apiClient.get(`/api/communities/${communityId}/messages`, {
-                params: { limit, offset }
-            });
+            const params = { limit };
+            if (cursors.before) params.before = cursors.before;
+            else if (cursors.after) params.after = cursors.after;
+            else if (offset) params.offset = offset;
+            const response = await apiClient.get(`/api/communities/${communityId}/messages`, { params });
             return response.data;
         } catch (error) {
             throw error.response?.data || error.message;
@@ -380,6 +441,7 @@ export const communityAPI = {
      * @param {string} communityId - Community ID
      * @param {string} messageId - Message ID
      * @param {string} emoji - Emoji to react with
+     * @returns {Promise} - Changed reaction { message_id, emoji, user_ids, count, reacted }
      */
     reactToMessage: async (communityId, messageId, emoji) => {
         try {
@@ -393,13 +455,60 @@ export const communityAPI = {
     },
 
     /**
-     * Get community members
+     * Get community members (paginated)
+     * @param {string} communityId - Community ID
+     * @param {Object} options - { limit, offset, q } where q is a name prefix
+     * @returns {Promise} - { members, total, limit, offset, has_more }
+     */
+    getMembers: async (communityId, { limit = 500, offset = 0, q } = {}) => {
+        try {
+            const params = { limit, offset };
+            if (q) params.q = q;
+            const response = await apiClient.get(`/api/communities/${communityId}/members`, { params });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Search a community's message history (ranked by relevance)
+     * @param {string} communityId - Community ID
+     * @param {string} q - Words, "phrases" or -excluded terms
+     * @param {Object} options - { limit, offset }
+     * @returns {Promise} - { query, results: [{ id, content, snippet, highlights, score, ... }], has_more }
+     */
+    search: async (communityId, q, { limit = 20, offset = 0 } = {}) => {
+        try {
+            const response = await apiClient.get(`/api/communities/${communityId}/search`, { params: { q, limit, offset } });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Get unread counts for every community the user belongs to
+     * @returns {Promise} - { communities: [{ community_id, unread, capped, last_read_at }], total }
+     */
+    getUnread: async () => {
+        try {
+            const response = await apiClient.get('/api/communities/unread');
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Mark a community as read up to now (or up to a given timestamp)
      * @param {string} communityId - Community ID
-     * @returns {Promise} - List of members
+     * @param {string} upTo - Optional ISO timestamp
+     * @returns {Promise} - Updated { community_id, unread, last_read_at }
      */
-    getMembers: async (communityId) => {
+    markRead: async (communityId, upTo) => {
         try {
-            const response = await apiClient.get(`/api/communities/${communityId}/members`);
+            const response = await apiClient.post(`/api/communities/${communityId}/read`, upTo ? { up_to: upTo } : {});
             return response.data;
         } catch (error) {
             throw error.response?.data || error.message;
@@ -449,6 +558,16 @@ export const communityAPI = {
         } catch (error) {
             throw error.response?.data || error.message;
         }
+    },
+
+    /**
+     * Subscribe to live community events (new messages, reactions, deletes)
+     * @param {string} communityId - Community ID
+     * @param {Object} handlers - { 'message.created', 'message.reaction', 'message.deleted', resync, error }
+     * @returns {EventSource} - Call .close() to unsubscribe
+     */
+    subscribe: (communityId, handlers) => {
+        return openEventStream(`/api/communities/${communityId}/stream`, handlers);
     }
 };
 
@@ -469,13 +588,64 @@ export const messagesAPI = {
     },
 
     /**
-     * Get all messages for a specific user
+     * Search the current user's direct messages (ranked by relevance)
+     * @param {string} q - Words, "phrases" or -excluded terms
+     * @param {Object} options - { withUser, limit, offset }
+     * @returns {Promise} - { query, results: [{ id, content, snippet, highlights, score, ... }], has_more }
+     */
+    search: async (q, { withUser, limit = 20, offset = 0 } = {}) => {
+        try {
+            const params = { q, limit, offset };
+            if (withUser) params.with_user = withUser;
+            const response = await apiClient.get('/api/messages/search', { params });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Get one page of a user's messages (newest first)
      * @param {string} userId - User ID
-     * @returns {Promise} - List of messages
+     * @param {Object} options - { limit, before } where before is a next_before cursor
+     * @returns {Promise} - { messages, has_more, next_before }
+     */
+    getByUser: async (userId, { limit = 50, before } = {}) => {
+        try {
+            const params = { limit };
+            if (before) params.before = before;
+            const response = await apiClient.get(`/api/messages/user/${userId}`, { params });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Get the inbox: one summary per conversation, most recent first
+     * @param {Object} options - { limit, offset }
+     * @returns {Promise} - { threads: [{ thread_id, participant_id, participant_name, last_message, unread_count }], has_more }
      */
-    getByUser: async (userId) => {
+    getThreads: async ({ limit = 50, offset = 0 } = {}) => {
         try {
-            const response = await apiClient.get(`/api/messages/user/${userId}`);
+            const response = await apiClient.get('/api/messages/threads', { params: { limit, offset } });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Get one page of a conversation (oldest first within the page)
+     * @param {string} threadId - Thread ID
+     * @param {Object} options - { limit, before } where before is a next_before cursor
+     * @returns {Promise} - { messages, has_more, next_before }
+     */
+    getThread: async (threadId, { limit = 50, before } = {}) => {
+        try {
+            const params = { limit };
+            if (before) params.before = before;
+            const response = await apiClient.get(`/api/messages/threads/${encodeURIComponent(threadId)}`, { params });
             return response.data;
         } catch (error) {
             throw error.response?.data || error.message;
@@ -496,6 +666,24 @@ export const messagesAPI = {
         }
     },
 
+    /**
+     * Mark a whole conversation as read in one request
+     * @param {string} threadId - Thread ID
+     * @param {string} upTo - Optional ISO timestamp; only messages sent up to it are marked
+     * @returns {Promise} - { thread_id, marked, up_to }
+     */
+    markThreadRead: async (threadId, upTo) => {
+        try {
+            const response = await apiClient.patch(
+                `/api/messages/threads/${encodeURIComponent(threadId)}/read`,
+                upTo ? { up_to: upTo } : {}
+            );
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
     /**
      * Get unread messages count for current user
      * @returns {Promise} - Count object {count: number}
@@ -545,7 +733,7 @@ export const messagesAPI = {
      * Toggle an emoji reaction on a private message
      * @param {string} messageId - Message ID
      * @param {string} emoji - Emoji character
-     * @returns {Promise} - Updated reactions object { reactions: {...} }
+     * @returns {Promise} - Changed reaction { message_id, emoji, user_ids, count, reacted }
      */
     reactToMessage: async (messageId, emoji) => {
         try {
@@ -560,6 +748,62 @@ export const messagesAPI = {
 };
 
 // Progress Tracking API
+// Notifications API
+export const notificationsAPI = {
+    /**
+     * Subscribe to the current user's notification stream
+     * (unread.changed, message.received, message.read, message.created, caseload.changed, resync)
+     * @param {Object} handlers - Event name -> callback, plus optional error
+     * @returns {EventSource} - Call .close() to unsubscribe
+     */
+    stream: (handlers) => {
+        return openEventStream('/api/notifications/stream', handlers);
+    }
+};
+
+export const uploadsAPI = {
+    /**
+     * Upload a file through a resumable session: the raw bytes go up in
+     * parts with Content-Range, and a failed part resumes from the offset
+     * the server last committed instead of starting over.
+     * @param {File|Blob} file - File to upload
+     * @param {Object} options - { name, onProgress(fraction), retries }
+     * @returns {Promise<Object>} - Document reference { name, blob_id, size, content_type, url }
+     */
+    upload: async (file, { name, onProgress, retries = 3 } = {}) => {
+        try {
+            let session = (await apiClient.post('/api/uploads', {
+                filename: name || file.name || 'document',
+                size: file.size,
+                content_type: file.type || null
+            })).data;
+
+            let failures = 0;
+            while (!session.complete) {
+                const start = session.received;
+                const end = Math.min(start + session.part_size, file.size);
+                try {
+                    session = (await apiClient.put(`/api/uploads/${session.upload_id}`, file.slice(start, end), {
+                        headers: {
+                            'Content-Type': 'application/octet-stream',
+                            'Content-Range': `bytes ${start}-${end - 1}/${file.size}`
+                        }
+                    })).data;
+                    failures = 0;
+                } catch (error) {
+                    if (++failures > retries) throw error;
+                    // Ask where to resume; only whole chunks were kept
+                    session = (await apiClient.get(`/api/uploads/${session.upload_id}`)).data;
+                }
+                onProgress?.(session.received / file.size);
+            }
+            return session.document;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    }
+};
+
 export const progressAPI = {
     // === Goals ===
     createGoal: async (goalData) => {
@@ -735,6 +979,56 @@ export const roadmapAPI = {
         } catch (error) {
             throw error.response?.data || error.message;
         }
+    },
+
+    /**
+     * Set (or flip, when completed is omitted) a single milestone.
+     * Returns only the milestone plus the recomputed progress/status.
+     */
+    toggleMilestone: async (roadmapId, milestoneId, completed = null) => {
+        try {
+            const body = completed === null ? {} : { completed };
+            const response = await apiClient.patch(`/api/roadmap/${roadmapId}/milestones/${milestoneId}/toggle`, body);
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Append a milestone to a goal
+     */
+    addMilestone: async (roadmapId, title) => {
+        try {
+            const response = await apiClient.post(`/api/roadmap/${roadmapId}/milestones`, { title });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Remove a milestone from a goal
+     */
+    removeMilestone: async (roadmapId, milestoneId) => {
+        try {
+            const response = await apiClient.delete(`/api/roadmap/${roadmapId}/milestones/${milestoneId}`);
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Reorder milestones (order = full list of milestone IDs)
+     */
+    reorderMilestones: async (roadmapId, order) => {
+        try {
+            const response = await apiClient.put(`/api/roadmap/${roadmapId}/milestones/order`, { order });
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
     }
 };
 
@@ -764,6 +1058,52 @@ export const userManagementAPI = {
         return response.data;
     },
 
+    /**
+     * Bulk-import therapists, parents and children from a CSV or NDJSON file.
+     * The server streams one report line per row; onRow receives each as it
+     * arrives and the final summary is returned.
+     * @param {File} file - .csv or .ndjson file
+     * @param {Object} [options] - { type, dryRun, onRow }
+     */
+    bulkImport: async (file, { type, dryRun = false, onRow } = {}) => {
+        const params = new URLSearchParams();
+        if (type) params.set('type', type);
+        if (dryRun) params.set('dry_run', 'true');
+        const isCsv = file.name?.toLowerCase().endsWith('.csv');
+        const response = await fetch(`${API_BASE_URL}/api/admin/users/bulk?${params}`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('admin_token') || ''}`,
+                'Content-Type': isCsv ? 'text/csv' : 'application/x-ndjson'
+            },
+            body: file
+        });
+        if (!response.ok) {
+            throw await response.json().catch(() => response.statusText);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        let summary = null;
+        const handle = (line) => {
+            if (!line.trim()) return;
+            const entry = JSON.parse(line);
+            if (entry.summary) summary = entry.summary;
+            else if (onRow) onRow(entry);
+        };
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            lines.forEach(handle);
+        }
+        handle(buffered + decoder.decode());
+        return summary;
+    },
+
     /**
      * List all therapist accounts
      */
@@ -795,13 +1135,70 @@ export const userManagementAPI = {
     },
 
     /**
-     * Get list of children for assignment
+     * Get one page of children (document contents excluded unless includeDocuments)
+     * @param {Object} params - { limit, offset, therapist_id, mine, parent_id, status, include_documents }
+     * @returns {Promise} - { children, total, limit, offset, has_more }
      */
-    listChildren: async () => {
-        const response = await apiClient.get('/api/admin/users/children');
+    listChildren: async (params = {}) => {
+        const response = await apiClient.get('/api/admin/users/children', { params });
         return response.data;
     },
 
+    /**
+     * Get every child matching the filters, following pages
+     * @param {Object} params - Same filters as listChildren
+     * @returns {Promise<Array>} - Children
+     */
+    listAllChildren: async (params = {}) => {
+        const children = [];
+        let offset = 0;
+        for (;;) {
+            const page = await userManagementAPI.listChildren({ ...params, limit: 500, offset });
+            children.push(...(page.children || []));
+            if (!page.has_more) return children;
+            offset += page.limit;
+        }
+    },
+
+    /**
+     * Get one child's document references
+     * @param {string} childId - Child ID
+     * @returns {Promise<Array>} - Documents
+     */
+    getChildDocuments: async (childId) => {
+        const response = await apiClient.get(`/api/admin/users/child/${childId}/documents`);
+        return response.data;
+    },
+
+    /**
+     * Attach an uploaded document to a child
+     * @param {string} childId - Child ID
+     * @param {Object} data - { blob_id, title, category, type, date }
+     * @returns {Promise<Object>} - Stored document reference
+     */
+    attachChildDocument: async (childId, data) => {
+        try {
+            const response = await apiClient.post(`/api/admin/users/child/${childId}/documents`, data);
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
+    /**
+     * Remove a document from a child
+     * @param {string} childId - Child ID
+     * @param {string} docId - Document ID
+     */
+    removeChildDocument: async (childId, docId) => {
+        try {
+            const response = await apiClient.delete(`/api/admin/users/child/${childId}/documents/${docId}`);
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
     /**
      * Get global admin statistics
      */
@@ -850,6 +1247,21 @@ export const userManagementAPI = {
         return response.data;
     },
 
+    /**
+     * Move children to another therapist in one request
+     * @param {Object} data - { to_therapist_id, from_therapist_id?, child_ids? }:
+     *   every child of from_therapist_id (or only child_ids), or child_ids alone
+     * @returns {Promise<Object>} - { moved, merged, ... }
+     */
+    reassignCaseload: async (data) => {
+        try {
+            const response = await apiClient.post('/api/admin/users/caseload/reassign', data);
+            return response.data;
+        } catch (error) {
+            throw error.response?.data || error.message;
+        }
+    },
+
     /**
      * Update therapist details
      */
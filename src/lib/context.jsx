@@ -20,8 +20,9 @@ import {
     DOCUMENTS,
     PERIODIC_REVIEWS
 } from '../data/mockData';
-import { sessionAPI, communityAPI, messagesAPI, progressAPI, userManagementAPI, roadmapAPI } from './api';
+import { sessionAPI, communityAPI, messagesAPI, progressAPI, userManagementAPI, roadmapAPI, notificationsAPI, uploadsAPI, documentUrl, avatarUrl } from './api';
 import { cryptoUtils } from './crypto';
+import { applyReactionChange } from './utils';
 
 const AppContext = createContext();
 
@@ -92,6 +93,8 @@ export const AppProvider = ({ children }) => {
     const [communityUnreadCount, setCommunityUnreadCount] = useState(0);
     const [privateUnreadCount, setPrivateUnreadCount] = useState(0);
     const notifiedMessageIds = useRef(new Set());
+    const lastCommunityUnread = useRef(0);
+    const threadFingerprints = useRef({});
     const isMigratingRoadmap = useRef(false);
     const [quickTestResults, setQuickTestResults] = useState(() => {
         const saved = localStorage.getItem('neurobridge_quick_test_results');
@@ -118,7 +121,10 @@ export const AppProvider = ({ children }) => {
 
     useEffect(() => {
         localStorage.setItem('neurobridge_documents', JSON.stringify(childDocuments));
-    }, [childDocuments]);
+        setKids(prev => prev.map(k => k.documents?.some(d => d.id === docId)
+            ? { ...k, documents: k.documents.filter(d => d.id !== docId) }
+            : k));
+    }, [childDocuments, kids]);
 
     useEffect(() => {
         localStorage.setItem('neurobridge_quick_test_results', JSON.stringify(quickTestResults));
@@ -293,8 +299,12 @@ export const AppProvider = ({ children }) => {
 
     const refreshChildren = useCallback(async () => {
         try {
-            const childrenData = await userManagementAPI.listChildren();
-            const fetched = Array.isArray(childrenData) ? childrenData : [];
+            // Therapists load their caseload and parents their own children; admins page through all
+            const filters = currentUser?.role === 'therapist' ? { mine: true }
+                : currentUser?.role === 'parent' ? { parent_id: currentUser.id }
+                    : {};
+            // Documents arrive as blob-store references; bytes stream on demand from their url
+            const fetched = await userManagementAPI.listAllChildren(filters);
             setRealChildren(fetched);
 
             // Merge backend data into kids state to ensure UI picks up real documents/data
@@ -333,7 +343,7 @@ export const AppProvider = ({ children }) => {
         } catch (err) {
             console.warn('Failed to refresh children:', err);
         }
-    }, []);
+    }, [currentUser?.id, currentUser?.role]);
 
     const refreshUsers = useCallback(async () => {
         try {
@@ -375,7 +385,7 @@ export const AppProvider = ({ children }) => {
         return {
             ...u,
             id: u.id || u._id,
-            avatar: u.avatar || u.avatarUrl || u.photoUrl || u.profile_photo || u.profilePhoto || u.image || u.photo || u.avatar_url || u.profile_image || u.picture || `https://api.dicebear.com/7.x/avataaars/svg?seed=${u.name || 'User'}`,
+            avatar: avatarUrl(u.avatar || u.avatarUrl || u.photoUrl || u.profile_photo || u.profilePhoto || u.image || u.photo || u.avatar_url || u.profile_image || u.picture) || `https://api.dicebear.com/7.x/avataaars/svg?seed=${u.name || 'User'}`,
         };
     }, []);
 
@@ -439,14 +449,14 @@ export const AppProvider = ({ children }) => {
         const normalizedRealTherapists = realTherapists.map(t => ({
             ...t,
             id: t.id || t._id,
-            avatar: t.avatar || t.avatarUrl || t.photoUrl || t.profile_photo || t.profilePhoto || t.image || t.photo || t.avatar_url || t.profile_image || t.picture || `https://api.dicebear.com/7.x/avataaars/svg?seed=${t.name}`,
+            avatar: avatarUrl(t.avatar || t.avatarUrl || t.photoUrl || t.profile_photo || t.profilePhoto || t.image || t.photo || t.avatar_url || t.profile_image || t.picture) || `https://api.dicebear.com/7.x/avataaars/svg?seed=${t.name}`,
             role: 'therapist'
         }));
 
         const normalizedRealParents = realParents.map(p => ({
             ...p,
             id: p.id || p._id,
-            avatar: p.avatar || p.avatarUrl || p.photoUrl || p.profile_photo || p.profilePhoto || p.image || p.photo || p.avatar_url || p.profile_image || p.picture || `https://api.dicebear.com/7.x/avataaars/svg?seed=${p.name}`,
+            avatar: avatarUrl(p.avatar || p.avatarUrl || p.photoUrl || p.profile_photo || p.profilePhoto || p.image || p.photo || p.avatar_url || p.profile_image || p.picture) || `https://api.dicebear.com/7.x/avataaars/svg?seed=${p.name}`,
             role: 'parent'
         }));
 
@@ -532,12 +542,22 @@ export const AppProvider = ({ children }) => {
 
     // Production-Level Message Synchronization
     useEffect(() => {
+        threadFingerprints.current = {}; // new session: fetch every thread once
         const syncMessagesFromCloud = async () => {
             if (!isAuthenticated || !currentUser) return;
 
             try {
-                const cloudMessages = await messagesAPI.getByUser(currentUser.id);
-                if (cloudMessages && cloudMessages.length > 0) {
+                // Only re-fetch conversations whose last message or unread count changed
+                const { threads = [] } = await messagesAPI.getThreads({ limit: 200 });
+                const changed = threads.filter(t =>
+                    threadFingerprints.current[t.thread_id] !== `${t.last_message.id}:${t.unread_count}`
+                );
+                const pages = await Promise.all(changed.map(t => messagesAPI.getThread(t.thread_id, { limit: 100 })));
+                changed.forEach(t => {
+                    threadFingerprints.current[t.thread_id] = `${t.last_message.id}:${t.unread_count}`;
+                });
+                const cloudMessages = pages.flatMap(p => p.messages || []);
+                if (cloudMessages.length > 0) {
                     // Normalize snake_case from MongoDB to camelCase for the frontend
                     const normalizedMessages = cloudMessages.map(m => {
                         const mId = m.id || m._id || (m.thread_id + m.timestamp + (m.content || '').substring(0, 10));
@@ -940,56 +960,90 @@ export const AppProvider = ({ children }) => {
         return () => clearInterval(interval);
     }, [isAuthenticated, currentUser, kids, refreshChildren]);
 
-    // Global Message & Community Polling for Notifications
+    // Global Message & Community Notifications (server-pushed)
     useEffect(() => {
         if (!isAuthenticated || !currentUser) return;
 
-        const pollUnreadCounts = async () => {
+        const refreshUnreadCounts = async () => {
             try {
-                // 1. Explicitly fetch private messages unread count from backend
-                // This ensures the badge is accurate even if message sync is lagging
                 const unreadResponse = await messagesAPI.getUnreadCount();
                 if (unreadResponse && typeof unreadResponse.count === 'number') {
                     setPrivateUnreadCount(unreadResponse.count);
                 }
 
-                // 2. Poll Community Messages separately
-                const community = await communityAPI.getDefault();
-                if (community) {
-                    const messagesData = await communityAPI.getMessages(community.id, 20, 0);
-                    const communityMessages = messagesData.messages || [];
-
-                    const lastSeen = localStorage.getItem(`last_seen_community_${community.id}`) || 0;
-                    const unreadList = communityMessages.filter(m =>
-                        new Date(m.timestamp).getTime() > parseInt(lastSeen) &&
-                        m.sender_id !== currentUser.id && m.senderId !== currentUser.id
-                    );
-
-                    setCommunityUnreadCount(unreadList.length);
-
-                    // Trigger toast for new community messages
-                    unreadList.forEach(m => {
-                        const mId = m.id || m._id;
-                        if (!notifiedMessageIds.current.has(mId)) {
-                            addNotification({
-                                type: 'message',
-                                title: `New Community Message`,
-                                message: `${m.sender_name || 'Someone'} posted: ${m.content.substring(0, 40)}...`,
-                                messageId: mId
-                            });
-                            notifiedMessageIds.current.add(mId);
-                        }
+                // Community unread counts are computed server-side from read cursors
+                const communityUnread = await communityAPI.getUnread();
+                const total = communityUnread?.total || 0;
+                setCommunityUnreadCount(total);
+
+                // Toast only when the count grows since the last refresh
+                if (total > lastCommunityUnread.current) {
+                    const added = total - lastCommunityUnread.current;
+                    addNotification({
+                        type: 'message',
+                        title: `New Community Message${added > 1 ? 's' : ''}`,
+                        message: `${added} new message${added > 1 ? 's' : ''} in your community`
                     });
                 }
+                lastCommunityUnread.current = total;
             } catch (err) {
-                console.warn('Silent failure polling for notifications:', err);
+                console.warn('Silent failure refreshing unread counts:', err);
             }
         };
 
-        pollUnreadCounts();
-        const interval = setInterval(pollUnreadCounts, 15000); // 15s poll for better responsiveness
-        return () => clearInterval(interval);
-    }, [isAuthenticated, currentUser]);
+        refreshUnreadCounts();
+        let fallbackInterval = null;
+
+        const stream = notificationsAPI.stream({
+            'unread.changed': ({ data }) => {
+                setPrivateUnreadCount(data.total);
+            },
+            'message.received': ({ data }) => {
+                if (notifiedMessageIds.current.has(data.id)) return;
+                notifiedMessageIds.current.add(data.id);
+                const preview = cryptoUtils.decrypt(data.content) || '';
+                addNotification({
+                    type: 'message',
+                    title: `New Message from ${data.sender_name || 'Someone'}`,
+                    message: preview.substring(0, 40) + (preview.length > 40 ? '...' : ''),
+                    messageId: data.id
+                });
+            },
+            'message.created': ({ data }) => {
+                if (data.sender_id === currentUser.id || notifiedMessageIds.current.has(data.id)) return;
+                notifiedMessageIds.current.add(data.id);
+                lastCommunityUnread.current += 1;
+                setCommunityUnreadCount(prev => prev + 1);
+                addNotification({
+                    type: 'message',
+                    title: `New Community Message`,
+                    message: `${data.sender_name || 'Someone'} posted: ${data.content.substring(0, 40)}...`,
+                    messageId: data.id
+                });
+            },
+            // An admin moved children onto or off this therapist's caseload
+            'caseload.changed': () => refreshChildren(),
+            // Too long offline for the server to replay what was missed
+            resync: () => refreshUnreadCounts(),
+            error: () => {
+                // EventSource reconnects (with Last-Event-ID) on its own; poll slowly meanwhile
+                if (!fallbackInterval) {
+                    fallbackInterval = setInterval(refreshUnreadCounts, 60000);
+                }
+            }
+        });
+        stream.onopen = () => {
+            if (fallbackInterval) {
+                clearInterval(fallbackInterval);
+                fallbackInterval = null;
+            }
+        };
+
+        return () => {
+            stream.close();
+            if (fallbackInterval) clearInterval(fallbackInterval);
+        };
+    }, [isAuthenticated, currentUser, refreshChildren]);
 
     // Update private unread count whenever messages change (Local sync)
     useEffect(() => {
@@ -1268,8 +1322,9 @@ export const AppProvider = ({ children }) => {
                 ));
             }
 
-            // 4. Background Refresh
+            // 4. Background Refresh (children, and therapists for their caseload counts)
             refreshChildren();
+            refreshUsers();
 
         } catch (err) {
             console.error("Failed to assign therapist:", err);
@@ -1283,7 +1338,7 @@ export const AppProvider = ({ children }) => {
             userName: currentUser?.name,
             details: `Assigned child ${childId} to therapist ${therapistId}`
         });
-    }, [currentUser, refreshChildren, addAuditLog]);
+    }, [currentUser, refreshChildren, refreshUsers, addAuditLog]);
 
     const unassignChildFromTherapist = useCallback(async (childId, therapistId) => {
         console.log(`[AppProvider] Unassigning child ${childId} from therapist ${therapistId}`);
@@ -1306,8 +1361,9 @@ export const AppProvider = ({ children }) => {
             await userManagementAPI.unassignTherapist(childId, therapistId);
             console.log(`[AppProvider] Successfully unassigned therapist via API`);
 
-            // 3. Background Refresh
+            // 3. Background Refresh (children, and therapists for their caseload counts)
             refreshChildren();
+            refreshUsers();
         } catch (err) {
             console.error("Failed to unassign therapist:", err);
             // 4. Revert on error via refresh
@@ -1320,7 +1376,25 @@ export const AppProvider = ({ children }) => {
             userName: currentUser?.name,
             details: `Unassigned child ${childId} from therapist ${therapistId}`
         });
-    }, [currentUser, refreshChildren, addAuditLog]);
+    }, [currentUser, refreshChildren, refreshUsers, addAuditLog]);
+
+    const reassignCaseload = useCallback(async ({ fromTherapistId = null, toTherapistId, childIds = null }) => {
+        const result = await userManagementAPI.reassignCaseload({
+            from_therapist_id: fromTherapistId,
+            to_therapist_id: toTherapistId,
+            child_ids: childIds
+        });
+        refreshChildren();
+        refreshUsers();
+
+        addAuditLog({
+            action: 'REASSIGN_CASELOAD',
+            userId: currentUser?.id,
+            userName: currentUser?.name,
+            details: `Moved ${result.moved + result.merged} children to therapist ${toTherapistId}` + (fromTherapistId ? ` from ${fromTherapistId}` : '')
+        });
+        return result;
+    }, [currentUser, refreshChildren, refreshUsers, addAuditLog]);
 
     const addChild = useCallback(async (childData) => {
         try {
@@ -1375,51 +1449,54 @@ export const AppProvider = ({ children }) => {
     }, [currentUser]);
 
     const addDocument = useCallback(async (doc) => {
-        const newDoc = {
-            ...doc,
+        const { file, ...meta } = doc;
+        let newDoc = {
+            ...meta,
             id: doc.id || `doc-${Date.now()}`,
             date: doc.date || new Date().toISOString().split('T')[0]
         };
 
-        // 1. Update local state
-        setChildDocuments(prev => [newDoc, ...prev]);
-
-        // 2. Persist to Backend Child Record
-        const child = kids.find(k => k.id === doc.childId);
-        if (child) {
-            const updatedDocs = [...(child.documents || []), newDoc];
+        // Files go up through a resumable upload, then the reference is attached to the child
+        if (file && doc.childId) {
             try {
-                await userManagementAPI.updateChild(child.id, { documents: updatedDocs });
+                const ref = await uploadsAPI.upload(file, { name: file.name });
+                const stored = await userManagementAPI.attachChildDocument(doc.childId, {
+                    blob_id: ref.blob_id,
+                    title: newDoc.title,
+                    category: newDoc.category,
+                    type: newDoc.type,
+                    date: newDoc.date
+                });
+                newDoc = { ...newDoc, ...stored, url: documentUrl(stored) };
                 console.log('✅ Document saved to backend profile');
             } catch (err) {
                 console.error('❌ Failed to persist document to backend:', err);
             }
         }
 
+        setChildDocuments(prev => [newDoc, ...prev]);
         return newDoc;
-    }, [kids]);
+    }, []);
 
     const deleteDocument = useCallback(async (docId) => {
-        // Find which child this doc belongs to
-        const docToDelete = childDocuments.find(d => d.id === docId);
+        // Find which child this doc belongs to (local uploads or backend references)
+        const docToDelete = childDocuments.find(d => d.id === docId) ||
+            kids.flatMap(k => (k.documents || []).map(d => ({ ...d, childId: d.child_id || k.id })))
+                .find(d => d.id === docId);
 
         // 1. Update local state
         setChildDocuments(prev => prev.filter(d => d.id !== docId));
 
         // 2. Persist to Backend
-        if (docToDelete && docToDelete.childId) {
-            const child = kids.find(k => k.id === docToDelete.childId);
-            if (child) {
-                const updatedDocs = (child.documents || []).filter(d => d.id !== docId);
-                try {
-                    await userManagementAPI.updateChild(child.id, { documents: updatedDocs });
-                    console.log('✅ Document removed from backend profile');
-                } catch (err) {
-                    console.error('❌ Failed to remove document from backend:', err);
-                }
+        if (docToDelete?.childId && docToDelete.blob_id) {
+            try {
+                await userManagementAPI.removeChildDocument(docToDelete.childId, docId);
+                console.log('✅ Document removed from backend profile');
+            } catch (err) {
+                console.error('❌ Failed to remove document from backend:', err);
             }
         }
-    }, [childDocuments, kids]);
+    }, [childDocuments]);
 
     // ============ Skill Score Actions ============
     const getChildSkillScores = useCallback((childId, limit = null) => {
@@ -1609,11 +1686,13 @@ export const AppProvider = ({ children }) => {
 
         if (updatedGoal) {
             try {
-                await roadmapAPI.updateGoal(roadmapId, {
-                    milestones: updatedGoal.milestones,
-                    progress: updatedGoal.progress,
-                    status: updatedGoal.status
-                });
+                // Milestone-level update: server recomputes progress atomically
+                const result = await roadmapAPI.toggleMilestone(roadmapId, milestoneId, true);
+                setRoadmap(prev => prev.map(r =>
+                    (r.id === roadmapId || r._id === roadmapId)
+                        ? { ...r, progress: result.progress }
+                        : r
+                ));
             } catch (err) {
                 console.error("Failed to sync milestone completion:", err);
             }
@@ -1868,6 +1947,31 @@ export const AppProvider = ({ children }) => {
         ));
     }, []);
 
+    const markThreadRead = useCallback(async (threadMessages, myIds) => {
+        const unread = threadMessages.filter(m => myIds.includes(m.recipientId) && !m.read);
+        if (unread.length === 0) return;
+
+        const unreadIds = new Set(unread.map(m => m.id));
+        setMessages(prev => prev.map(m =>
+            unreadIds.has(m.id) || unreadIds.has(m._id) ? { ...m, read: true } : m
+        ));
+
+        // One request per backend conversation, up to its newest unread message
+        const upTo = {};
+        unread
+            .filter(m => m.threadId && String(m.id).length > 20)
+            .forEach(m => {
+                if (!upTo[m.threadId] || new Date(m.timestamp) > new Date(upTo[m.threadId])) {
+                    upTo[m.threadId] = m.timestamp;
+                }
+            });
+        await Promise.all(Object.entries(upTo).map(([threadId, timestamp]) =>
+            messagesAPI.markThreadRead(threadId, new Date(timestamp).toISOString()).catch(err =>
+                console.warn('Silent failure marking thread as read on backend:', err)
+            )
+        ));
+    }, []);
+
     const deleteMessageForMe = useCallback(async (messageId, currentUserId) => {
         // Optimistic: hide this message from local state for this user only
         setMessages(prev => prev.filter(m => m.id !== messageId && m._id !== messageId));
@@ -1898,7 +2002,7 @@ export const AppProvider = ({ children }) => {
             // Update local reactions with the server response
             setMessages(prev => prev.map(m =>
                 (m.id === messageId || m._id === messageId)
-                    ? { ...m, reactions: result.reactions || {} }
+                    ? { ...m, reactions: applyReactionChange(m.reactions, result) }
                     : m
             ));
         } catch (err) {
@@ -2337,6 +2441,7 @@ export const AppProvider = ({ children }) => {
         toggleSpecificGameUnlock,
         addChild,
         unassignChildFromTherapist,
+        reassignCaseload,
 
         // Skill Score Actions
         getChildSkillScores,
@@ -2369,6 +2474,7 @@ export const AppProvider = ({ children }) => {
         getUnreadCount,
         sendMessage,
         markMessageRead,
+        markThreadRead,
         deleteMessageForMe,
         deleteMessageForEveryone,
         reactToPrivateMessage,
@@ -2412,7 +2518,7 @@ export const AppProvider = ({ children }) => {
                 id: doc.id || doc._id || `backend-${Math.random()}`,
                 date: doc.date || (doc.uploaded_at ? new Date(doc.uploaded_at).toISOString().split('T')[0] : new Date().toISOString().split('T')[0]),
                 uploadedBy: doc.uploadedBy || doc.uploaded_by || 'Parent',
-                url: doc.url || doc.content || '#'
+                url: documentUrl(doc) || '#'
             }));
 
             // Merge and sort
@@ -2439,13 +2545,13 @@ export const AppProvider = ({ children }) => {
         consentRecords, auditLogs, cdcMetrics, adminStats, refreshAdminStats, currentUser, isAuthenticated,
         notifications, isLoading, login, logout, getChildSessions, getRecentSessions,
         addSession, getSessionsByTherapist, getTodaysSessions, getChildById,
-        getChildrenByTherapist, getChildrenByParent, updateChildMood, assignChildToTherapist, toggleGamesUnlock, toggleSpecificGameUnlock, unassignChildFromTherapist, getChildSkillScores,
+        getChildrenByTherapist, getChildrenByParent, updateChildMood, assignChildToTherapist, toggleGamesUnlock, toggleSpecificGameUnlock, unassignChildFromTherapist, reassignCaseload, getChildSkillScores,
         refreshRoadmap, getChildRoadmap, updateRoadmapProgress, completeMilestone, addRoadmapGoal, deleteRoadmapGoal,
         getPeriodicReviews, addPeriodicReview,
         getActivityAdherence20Days, completeQuickTestGame, getLatestQuickTestResult,
         shareQuickTestResult,
         quickTestResults, quickTestProgress,
-        getChildMessages, getUnreadCount, sendMessage, markMessageRead,
+        getChildMessages, getUnreadCount, sendMessage, markMessageRead, markThreadRead,
         deleteMessageForMe, deleteMessageForEveryone, reactToPrivateMessage, addAuditLog,
         addNotification, clearNotifications, getEngagementTrend, getTherapistStats,
         skillProgress, getChildProgress, updateSkillProgress,
@@ -4,3 +4,16 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
     return twMerge(clsx(inputs))
 }
+
+/**
+ * Merge a single reaction change ({ emoji, user_ids }) into a reactions map
+ */
+export function applyReactionChange(reactions = {}, { emoji, user_ids = [] }) {
+    const next = { ...reactions }
+    if (user_ids.length > 0) {
+        next[emoji] = user_ids
+    } else {
+        delete next[emoji]
+    }
+    return next
+}
@@ -51,10 +51,12 @@ const AdminDashboard = () => {
     const activeChildren = kids.filter(k => k.status === 'active').length;
     const therapists = (realTherapists && realTherapists.length > 0) ? realTherapists.map(t => ({ ...t, id: t.id || t._id, role: 'therapist' })) : users.filter(u => u.role === 'therapist');
 
-    // Dynamic Therapist Performance Data
+    // Dynamic Therapist Performance Data (caseload is maintained server-side;
+    // the loaded kids are only a page of all children)
     const therapistPerformance = therapists.map(t => {
-        const assignedKids = kids.filter(k => (k.therapistIds?.length > 0 ? k.therapistIds : (k.therapistId ? [k.therapistId] : [])).includes(t.id));
-        const caseload = assignedKids.length;
+        const caseload = typeof t.assigned_children === 'number'
+            ? t.assigned_children
+            : kids.filter(k => (k.therapistIds?.length > 0 ? k.therapistIds : (k.therapistId ? [k.therapistId] : [])).includes(t.id)).length;
         const utilization = Math.min(Math.round((caseload / MAX_CASELOAD) * 100), 100);
 
         return {
@@ -440,7 +442,9 @@ const OperationsPage = () => {
                 <CardContent>
                     <div className="grid grid-cols-1 lg:grid-cols-2 gap-4">
                         {users.filter(u => u.role === 'therapist').map((therapist) => {
-                            const assignedKidsCount = kids.filter(k => (k.therapistIds?.length > 0 ? k.therapistIds : (k.therapistId ? [k.therapistId] : [])).includes(therapist.id)).length;
+                            const assignedKidsCount = typeof therapist.assigned_children === 'number'
+                                ? therapist.assigned_children
+                                : kids.filter(k => (k.therapistIds?.length > 0 ? k.therapistIds : (k.therapistId ? [k.therapistId] : [])).includes(therapist.id)).length;
                             const utilization = Math.min(Math.round((assignedKidsCount / 15) * 100), 100);
 
                             return (
@@ -3,10 +3,11 @@
 // A digital scrapbook for capturing "Small Wins"
 // ============================================================
 
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { Camera, Plus, Heart, MessageCircle, Play, Image as ImageIcon, Video, Trash2, X, Sparkles } from 'lucide-react';
 import { Card, CardContent } from '../../components/ui/Card';
 import { Button } from '../../components/ui/Button';
+import { uploadsAPI, documentUrl } from '../../lib/api';
 
 const MOCK_MEMORIES = [
     {
@@ -36,6 +37,40 @@ const MOCK_MEMORIES = [
 const MemoryBox = () => {
     const [memories, setMemories] = useState(MOCK_MEMORIES);
     const [showAddModal, setShowAddModal] = useState(false);
+    const [draft, setDraft] = useState({ file: null, type: 'image', title: '', description: '' });
+    const [uploadProgress, setUploadProgress] = useState(null);
+    const photoInputRef = useRef(null);
+    const videoInputRef = useRef(null);
+
+    const closeModal = () => {
+        setShowAddModal(false);
+        setDraft({ file: null, type: 'image', title: '', description: '' });
+        setUploadProgress(null);
+    };
+
+    const handlePost = async () => {
+        if (!draft.file) return;
+        try {
+            // Photos and videos stream up in resumable parts rather than as base64
+            setUploadProgress(0);
+            const ref = await uploadsAPI.upload(draft.file, { onProgress: setUploadProgress });
+            setMemories(prev => [{
+                id: ref.blob_id,
+                type: draft.type,
+                title: draft.title || draft.file.name,
+                description: draft.description,
+                date: new Date().toISOString().split('T')[0],
+                url: documentUrl(ref),
+                tags: ['Home Win'],
+                likes: 0,
+                doctorComment: null
+            }, ...prev]);
+            closeModal();
+        } catch (error) {
+            console.error('Failed to upload memory:', error);
+            setUploadProgress(null);
+        }
+    };
 
     return (
         <div className="space-y-8 pb-32 animate-slide-up">
@@ -60,14 +95,18 @@ const MemoryBox = () => {
                         <CardContent className="p-0">
                             {/* Media Preview */}
                             <div className="relative aspect-[4/3] bg-neutral-100 overflow-hidden">
-                                <img
-                                    src={memory.url || memory.thumbnail}
-                                    alt={memory.title}
-                                    className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-110 shadow-inner"
-                                />
+                                {memory.type === 'video' && memory.url ? (
+                                    <video src={memory.url} controls preload="metadata" className="w-full h-full object-cover" />
+                                ) : (
+                                    <img
+                                        src={memory.url || memory.thumbnail}
+                                        alt={memory.title}
+                                        className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-110 shadow-inner"
+                                    />
+                                )}
                                 <div className="absolute inset-0 bg-gradient-to-t from-black/80 via-transparent to-transparent opacity-60" />
 
-                                {memory.type === 'video' && (
+                                {memory.type === 'video' && !memory.url && (
                                     <div className="absolute inset-0 flex items-center justify-center">
                                         <div className="h-20 w-20 bg-white/20 backdrop-blur-xl rounded-full flex items-center justify-center border border-white/30 text-white scale-90 group-hover:scale-100 transition-transform">
                                             <Play className="h-10 w-10 fill-white" />
@@ -154,30 +193,45 @@ const MemoryBox = () => {
                                 </div>
                                 <h3 className="text-2xl font-black text-neutral-800 tracking-tight">Capture a Win</h3>
                             </div>
-                            <button onClick={() => setShowAddModal(false)} className="h-10 w-10 hover:bg-neutral-100 rounded-full flex items-center justify-center transition-colors">
+                            <button onClick={closeModal} className="h-10 w-10 hover:bg-neutral-100 rounded-full flex items-center justify-center transition-colors">
                                 <X className="h-6 w-6 text-neutral-400" />
                             </button>
                         </div>
 
                         <div className="space-y-8">
+                            <input ref={photoInputRef} type="file" accept="image/*" className="hidden"
+                                onChange={(e) => e.target.files[0] && setDraft(prev => ({ ...prev, file: e.target.files[0], type: 'image' }))} />
+                            <input ref={videoInputRef} type="file" accept="video/*" className="hidden"
+                                onChange={(e) => e.target.files[0] && setDraft(prev => ({ ...prev, file: e.target.files[0], type: 'video' }))} />
                             <div className="grid grid-cols-2 gap-4">
-                                <button className="h-40 rounded-[2rem] border-2 border-neutral-100 flex flex-col items-center justify-center gap-3 hover:border-primary-500 hover:bg-primary-50 transition-all active:scale-95 group">
+                                <button onClick={() => photoInputRef.current?.click()} className="h-40 rounded-[2rem] border-2 border-neutral-100 flex flex-col items-center justify-center gap-3 hover:border-primary-500 hover:bg-primary-50 transition-all active:scale-95 group">
                                     <ImageIcon className="h-10 w-10 text-primary-500 group-hover:scale-110 transition-transform" />
                                     <span className="font-black text-neutral-600 uppercase text-[10px] tracking-widest">Select Photo</span>
                                 </button>
-                                <button className="h-40 rounded-[2rem] border-2 border-neutral-100 flex flex-col items-center justify-center gap-3 hover:border-primary-500 hover:bg-primary-50 transition-all active:scale-95 group">
+                                <button onClick={() => videoInputRef.current?.click()} className="h-40 rounded-[2rem] border-2 border-neutral-100 flex flex-col items-center justify-center gap-3 hover:border-primary-500 hover:bg-primary-50 transition-all active:scale-95 group">
                                     <Video className="h-10 w-10 text-violet-500 group-hover:scale-110 transition-transform" />
                                     <span className="font-black text-neutral-600 uppercase text-[10px] tracking-widest">Select Video</span>
                                 </button>
                             </div>
 
+                            {draft.file && (
+                                <p className="text-sm font-bold text-neutral-500 truncate">
+                                    Selected: {draft.file.name}
+                                    {uploadProgress !== null && ` — ${Math.round(uploadProgress * 100)}%`}
+                                </p>
+                            )}
+
                             <div className="space-y-4">
                                 <input
                                     type="text"
+                                    value={draft.title}
+                                    onChange={(e) => setDraft(prev => ({ ...prev, title: e.target.value }))}
                                     placeholder="Give it a name (e.g. First Steps!)"
                                     className="w-full h-16 px-8 rounded-3xl bg-neutral-50 border-none font-black text-neutral-800 placeholder:text-neutral-400 focus:ring-4 focus:ring-primary-100 transition-all outline-none"
                                 />
                                 <textarea
+                                    value={draft.description}
+                                    onChange={(e) => setDraft(prev => ({ ...prev, description: e.target.value }))}
                                     placeholder="Tell your doctor what happened..."
                                     rows={4}
                                     className="w-full p-8 rounded-3xl bg-neutral-50 border-none font-bold text-neutral-800 placeholder:text-neutral-400 focus:ring-4 focus:ring-primary-100 transition-all outline-none"
@@ -185,7 +239,8 @@ const MemoryBox = () => {
                             </div>
 
                             <Button
-                                onClick={() => setShowAddModal(false)}
+                                onClick={handlePost}
+                                disabled={!draft.file || uploadProgress !== null}
                                 className="w-full btn-premium h-20 rounded-[2rem] bg-neutral-900 text-white font-black text-xl shadow-2xl hover:bg-black"
                             >
                                 Post to Memory Box
@@ -311,7 +311,7 @@ const Messages = () => {
         users,
         messages: allMessages,
         sendMessage,
-        markMessageRead,
+        markThreadRead,
         deleteMessageForMe,
         deleteMessageForEveryone,
         reactToPrivateMessage,
@@ -345,7 +345,9 @@ const Messages = () => {
     useEffect(() => {
         if (activeTab === 'community' && defaultCommunity) {
             setCommunityUnreadCount(0);
-            localStorage.setItem(`last_seen_community_${defaultCommunity.id}`, Date.now().toString());
+            communityAPI.markRead(defaultCommunity.id).catch(err =>
+                console.warn('Failed to mark community as read:', err)
+            );
         }
     }, [activeTab, defaultCommunity]);
 
@@ -460,16 +462,12 @@ const Messages = () => {
         }
     }, [threads, activeThread]);
 
-    // Mark messages as read when viewing thread
+    // Mark messages as read when viewing thread (one request per conversation)
     useEffect(() => {
         if (currentThread) {
-            currentThread.messages.forEach(m => {
-                if (myIds.includes(m.recipientId) && !m.read) {
-                    markMessageRead(m.id);
-                }
-            });
+            markThreadRead(currentThread.messages, myIds);
         }
-    }, [currentThread, userId, markMessageRead]);
+    }, [currentThread, userId, markThreadRead]);
 
     const handleSend = () => {
         if (!newMessage.trim() || !currentThread) return;
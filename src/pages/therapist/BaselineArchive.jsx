@@ -75,29 +75,37 @@ const BaselineArchive = () => {
         }
     };
 
-    const handleFileChange = (event) => {
+    const handleFileChange = async (event) => {
         const file = event.target.files[0];
         if (!file) return;
+        event.target.value = null;
 
         const child = kids.find(k => k.id === selectedChild);
 
-        addDocument({
+        // Streams the raw file through the resumable upload API, then attaches it
+        const saved = await addDocument({
             childId: selectedChild,
             title: file.name.replace(/\.[^/.]+$/, ""),
             category: 'Baseline',
             format: file.type.split('/')[1] || 'pdf',
             uploadedBy: currentUser?.name || 'Therapist',
             fileSize: (file.size / (1024 * 1024)).toFixed(2) + ' MB',
-            url: URL.createObjectURL(file)
+            file
         });
+        if (!saved.blob_id) {
+            addNotification({
+                type: 'error',
+                title: 'Upload Failed',
+                message: `${file.name} could not be saved. Please try again.`
+            });
+            return;
+        }
 
         addNotification({
             type: 'success',
             title: 'Digital Archive Updated',
             message: `Successfully uploaded ${file.name} to ${child?.name}'s clinical vault.`
         });
-
-        event.target.value = null;
     };
 
     return (
@@ -481,25 +481,21 @@ const ChildDetailModal = ({ child, sessions, skillScores, onClose }) => {
                                     onChange={(e) => {
                                         const file = e.target.files[0];
                                         if (file) {
-                                            const reader = new FileReader();
-                                            reader.onload = (event) => {
-                                                addDocument({
-                                                    childId: child.id,
-                                                    title: file.name.replace(/\.[^/.]+$/, ""),
-                                                    type: 'Other',
-                                                    category: 'Clinical',
-                                                    format: file.type.split('/')[1] || 'pdf',
-                                                    uploadedBy: 'Therapist',
-                                                    fileSize: (file.size / (1024 * 1024)).toFixed(2) + ' MB',
-                                                    url: event.target.result // Persistent DataURL
-                                                });
-                                                addNotification({
-                                                    type: 'success',
-                                                    title: 'Document Archived',
-                                                    message: `${file.name} added to dossier.`
-                                                });
-                                            };
-                                            reader.readAsDataURL(file);
+                                            // Raw file goes up via the resumable upload API
+                                            addDocument({
+                                                childId: child.id,
+                                                title: file.name.replace(/\.[^/.]+$/, ""),
+                                                type: 'Other',
+                                                category: 'Clinical',
+                                                format: file.type.split('/')[1] || 'pdf',
+                                                uploadedBy: 'Therapist',
+                                                fileSize: (file.size / (1024 * 1024)).toFixed(2) + ' MB',
+                                                file
+                                            }).then(() => addNotification({
+                                                type: 'success',
+                                                title: 'Document Archived',
+                                                message: `${file.name} added to dossier.`
+                                            }));
                                         }
 
                                     }}
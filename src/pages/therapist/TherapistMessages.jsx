@@ -299,7 +299,7 @@ const TherapistMessages = () => {
         users,
         messages: allMessages,
         sendMessage,
-        markMessageRead,
+        markThreadRead,
         deleteMessageForMe,
         deleteMessageForEveryone,
         reactToPrivateMessage,
@@ -327,7 +327,9 @@ const TherapistMessages = () => {
     useEffect(() => {
         if (activeTab === 'community' && defaultCommunity) {
             setCommunityUnreadCount(0);
-            localStorage.setItem(`last_seen_community_${defaultCommunity.id}`, Date.now().toString());
+            communityAPI.markRead(defaultCommunity.id).catch(err =>
+                console.warn('Failed to mark community as read:', err)
+            );
         }
     }, [activeTab, defaultCommunity, setCommunityUnreadCount]);
 
@@ -430,16 +432,12 @@ const TherapistMessages = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     }, [currentThread?.messages]);
 
-    // Mark messages as read when viewing thread
+    // Mark messages as read when viewing thread (one request per conversation)
     useEffect(() => {
         if (currentThread) {
-            currentThread.messages.forEach(m => {
-                if (myIds.includes(m.recipientId) && !m.read) {
-                    markMessageRead(m.id);
-                }
-            });
+            markThreadRead(currentThread.messages, myIds);
         }
-    }, [currentThread, therapistId, markMessageRead]);
+    }, [currentThread, therapistId, markThreadRead]);
 
     const handleSend = () => {
         if (!newMessage.trim() || !currentThread) return;